@@ -1,4 +1,5 @@
 """Entry point for the Log Analyzer executable."""
+import multiprocessing
 import sys
 import os
 
@@ -10,4 +11,6 @@ if script_dir not in sys.path:
 from src.log_analyzer import main
 
 if __name__ == '__main__':
+    # Large loads are parsed in worker processes, which re-run the frozen executable
+    multiprocessing.freeze_support()
     main()
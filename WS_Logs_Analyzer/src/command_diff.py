@@ -0,0 +1,433 @@
+"""Run-to-run diff of the instrument command streams of two log sessions.
+
+When a test plan suddenly takes longer, comparing the commands it sent
+in a good run (A) and in the slow run (B) shows where the time went.
+The commands sent to instruments (see command_timing) are extracted
+from both sessions and aligned, and every step is timed as the time
+from its command to the next one. The report lists the commands only
+one run sent and the steps sorted by the time run B lost on them.
+
+The alignment is a Myers diff (shortest edit script, searched from both
+ends in linear space) over the commands interned to ints. Before it
+runs, the common head and tail of a stretch are cut off and a stretch
+of more than twice DIFF_MAX_COST commands is split at commands sent exactly
+once in both runs (patience anchors), so scattered differences in long
+streams stay cheap. A stretch whose edit distance exceeds DIFF_MAX_COST
+is split at the furthest point reached instead of searched to the end.
+Both shortcuts keep the alignment valid, if not always minimal.
+"""
+import heapq
+import queue
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from src import command_timing
+from src import log_filter
+from src import log_store
+
+# Edit distance searched in one stretch before it is split heuristically
+DIFF_MAX_COST = 128
+# Equal runs are compared this many items at a time
+SNAKE_STRIDE = 32
+# Commands, stretches and steps listed in the report
+DIFF_REPORT_LINES = 30
+_MS_PER_DAY = 86400000
+
+# commands: command texts; timestamps/durations: ms, a step lasting until
+# the next command (the last one: until the last entry); rows: LogStore rows.
+CommandStream = namedtuple("CommandStream", ["commands", "timestamps", "durations", "rows"])
+# a/b: index of the step in each stream, None for a command only the other
+# run sent; lost_ms: how much longer run B spent on the step than run A.
+Step = namedtuple("Step", ["lost_ms", "command", "a", "b"])
+# Commands between two aligned runs that only one stream has, a[a_start:a_end] and b[b_start:b_end].
+Stretch = namedtuple("Stretch", ["lost_ms", "a_start", "a_end", "b_start", "b_end"])
+
+
+def command_stream(store, command_pattern=None, rows=None):
+    """The commands sent to instruments in `store` (all rows, or the sorted sequence `rows`).
+
+    Only commands matching the `command_pattern` regex (if any) are
+    kept. Returns a CommandStream.
+    """
+    regex = re.compile(command_pattern) if command_pattern else None
+    commands, stamps, command_rows = [], array('q'), array('q')
+    timestamps = store.timestamps
+    for row in command_timing.traffic_rows(store, rows):
+        match = command_timing.TRAFFIC_PATTERN.match(store.message(row))
+        if match is None or match.group(2) != command_timing.SENT:
+            continue
+        command = match.group(3).strip()
+        if regex is None or regex.search(command):
+            commands.append(command)
+            stamps.append(timestamps[row])
+            command_rows.append(row)
+
+    durations = array('q', (after - before for before, after in zip(stamps, stamps[1:])))
+    if stamps:
+        last_row = len(store) - 1 if rows is None else rows[-1]
+        durations.append(max(0, timestamps[last_row] - stamps[-1]))
+    return CommandStream(commands, stamps, durations, command_rows)
+
+
+# --- Alignment ---
+
+def _snake(a, i, i_end, b, j, j_end):
+    """Length of the run of equal items at the start of a[i:i_end] and b[j:j_end]."""
+    start = i
+    while i + SNAKE_STRIDE <= i_end and j + SNAKE_STRIDE <= j_end and \
+            a[i:i + SNAKE_STRIDE] == b[j:j + SNAKE_STRIDE]:
+        i += SNAKE_STRIDE
+        j += SNAKE_STRIDE
+    while i < i_end and j < j_end and a[i] == b[j]:
+        i += 1
+        j += 1
+    return i - start
+
+
+def _snake_back(a, i_start, i, b, j_start, j):
+    """Length of the run of equal items at the end of a[i_start:i] and b[j_start:j]."""
+    end = i
+    while i - SNAKE_STRIDE >= i_start and j - SNAKE_STRIDE >= j_start and \
+            a[i - SNAKE_STRIDE:i] == b[j - SNAKE_STRIDE:j]:
+        i -= SNAKE_STRIDE
+        j -= SNAKE_STRIDE
+    while i > i_start and j > j_start and a[i - 1] == b[j - 1]:
+        i -= 1
+        j -= 1
+    return end - i
+
+
+def _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi):
+    """(i, j) of items found exactly once in both a[a_lo:a_hi] and b[b_lo:b_hi], in a common order."""
+    a_counts = Counter(a[a_lo:a_hi])
+    b_counts = Counter(b[b_lo:b_hi])
+    unique = {item for item, count in a_counts.items() if count == 1 and b_counts.get(item) == 1}
+    if not unique:
+        return []
+    b_index = {b[j]: j for j in range(b_lo, b_hi) if b[j] in unique}
+    pairs = [(i, b_index[a[i]]) for i in range(a_lo, a_hi) if a[i] in unique]
+
+    # Longest increasing run of the b positions (patience sorting)
+    tails, tail_pairs, previous = [], [], []
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        previous.append(tail_pairs[position - 1] if position else None)
+        if position == len(tails):
+            tails.append(j)
+            tail_pairs.append(index)
+        else:
+            tails[position] = j
+            tail_pairs[position] = index
+    anchors = []
+    index = tail_pairs[-1]
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _split_point(a, a_lo, a_hi, b, b_lo, b_hi, max_cost):
+    """A point (i, j) on a shortest edit path of a[a_lo:a_hi] to b[b_lo:b_hi].
+
+    The ends must differ. Searched from both ends until the paths meet;
+    past `max_cost` edits, the furthest point the forward search reached.
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    max_d = min((n + m + 1) // 2, max_cost)
+    # Furthest x reached on each diagonal k = x - y, at index offset + k
+    offset = max_d + 1
+    forward = [-1] * (2 * offset + 1)
+    backward = [-1] * (2 * offset + 1)
+    forward[offset + 1] = backward[offset + 1] = 0
+    delta = n - m
+    # With an odd delta the forward search meets the backward one, else the reverse
+    front = delta % 2 != 0
+    k1_start = k1_end = k2_start = k2_end = 0
+    best = None
+    for d in range(max_d):
+        best = None
+        for k1 in range(-d + k1_start, d + 1 - k1_end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and forward[k1_offset - 1] < forward[k1_offset + 1]):
+                x1 = forward[k1_offset + 1]
+            else:
+                x1 = forward[k1_offset - 1] + 1
+            y1 = x1 - k1
+            if x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                size = _snake(a, a_lo + x1, a_hi, b, b_lo + y1, b_hi)
+                x1 += size
+                y1 += size
+            forward[k1_offset] = x1
+            if x1 > n:
+                # Ran off the right edge
+                k1_end += 2
+            elif y1 > m:
+                # Ran off the bottom edge
+                k1_start += 2
+            else:
+                if best is None or x1 + y1 > best[0] + best[1]:
+                    best = (x1, y1)
+                if front:
+                    k2_offset = offset + delta - k1
+                    if 0 <= k2_offset < len(backward) and backward[k2_offset] != -1 and x1 >= n - backward[k2_offset]:
+                        return a_lo + x1, b_lo + y1
+
+        for k2 in range(-d + k2_start, d + 1 - k2_end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and backward[k2_offset - 1] < backward[k2_offset + 1]):
+                x2 = backward[k2_offset + 1]
+            else:
+                x2 = backward[k2_offset - 1] + 1
+            y2 = x2 - k2
+            if x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                size = _snake_back(a, a_lo, a_hi - x2, b, b_lo, b_hi - y2)
+                x2 += size
+                y2 += size
+            backward[k2_offset] = x2
+            if x2 > n:
+                k2_end += 2
+            elif y2 > m:
+                k2_start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < len(forward) and forward[k1_offset] != -1:
+                    x1 = forward[k1_offset]
+                    if x1 >= n - x2:
+                        return a_lo + x1, b_lo + x1 - (k1_offset - offset)
+    if best is None:
+        return a_hi, b_lo
+    return a_lo + best[0], b_lo + best[1]
+
+
+def matching_blocks(a, b, max_cost=DIFF_MAX_COST):
+    """(i, j, size) of the runs of equal items a[i:i + size] == b[j:j + size] aligned between `a` and `b`.
+
+    `a` and `b` are lists of hashable items, best ints. Blocks are in
+    order and not adjacent. The alignment is minimal (a longest common
+    subsequence) when `a` and `b` have at most 2 * `max_cost` items together.
+    """
+    blocks = []
+    # Parts of a stretch without anchors are not searched for them again
+    stack = [(0, len(a), 0, len(b), True)]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi, find_anchors = stack.pop()
+        size = _snake(a, a_lo, a_hi, b, b_lo, b_hi)
+        if size:
+            blocks.append((a_lo, b_lo, size))
+            a_lo += size
+            b_lo += size
+        size = _snake_back(a, a_lo, a_hi, b, b_lo, b_hi)
+        if size:
+            a_hi -= size
+            b_hi -= size
+            blocks.append((a_hi, b_hi, size))
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+
+        anchors = []
+        if find_anchors and a_hi - a_lo + b_hi - b_lo > 2 * max_cost:
+            anchors = _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchors:
+            # Each stretch after an anchor starts with it, matched by its head
+            bounds = [(a_lo, b_lo)] + anchors + [(a_hi, b_hi)]
+            stack.extend((i, i_end, j, j_end, True) for (i, j), (i_end, j_end) in zip(bounds, bounds[1:]))
+            continue
+        i, j = _split_point(a, a_lo, a_hi, b, b_lo, b_hi, max_cost)
+        if (i, j) == (a_lo, b_lo) or (i, j) == (a_hi, b_hi):
+            # No progress: remove the stretch of `a` and insert that of `b`
+            i, j = a_hi, b_lo
+        stack.append((i, a_hi, j, b_hi, False))
+        stack.append((a_lo, i, b_lo, j, False))
+
+    blocks.sort()
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+            merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+        else:
+            merged.append((i, j, size))
+    return merged
+
+
+# --- Diff ---
+
+class CommandDiff:
+    """The command streams `a` and `b` of two runs, aligned; see matching_blocks()."""
+
+    def __init__(self, a, b, max_cost=DIFF_MAX_COST):
+        self.a = a
+        self.b = b
+        codes = {}
+        a_codes = [codes.setdefault(command, len(codes)) for command in a.commands]
+        b_codes = [codes.setdefault(command, len(codes)) for command in b.commands]
+        self.blocks = matching_blocks(a_codes, b_codes, max_cost)
+
+    @property
+    def aligned(self):
+        return sum(size for _, _, size in self.blocks)
+
+    def stretches(self):
+        """The Stretch tuples between the aligned runs, in order."""
+        i = j = 0
+        for a_start, b_start, size in self.blocks + [(len(self.a.commands), len(self.b.commands), 0)]:
+            if i < a_start or j < b_start:
+                lost = sum(self.b.durations[j:b_start]) - sum(self.a.durations[i:a_start])
+                yield Stretch(lost, i, a_start, j, b_start)
+            i, j = a_start + size, b_start + size
+
+    def steps(self):
+        """Every step of both runs as a Step, aligned steps once."""
+        a_durations, b_durations = self.a.durations, self.b.durations
+        for stretch in self.stretches():
+            for i in range(stretch.a_start, stretch.a_end):
+                yield Step(-a_durations[i], self.a.commands[i], i, None)
+            for j in range(stretch.b_start, stretch.b_end):
+                yield Step(b_durations[j], self.b.commands[j], None, j)
+        for i, j, size in self.blocks:
+            for offset in range(size):
+                yield Step(b_durations[j + offset] - a_durations[i + offset], self.a.commands[i + offset],
+                           i + offset, j + offset)
+
+    def by_command(self):
+        """[header, lost ms, aligned, only in A, only in B] per command header, most time lost first."""
+        totals = {}
+        for step in self.steps():
+            header = command_timing.command_header(step.command)
+            entry = totals.get(header)
+            if entry is None:
+                entry = totals[header] = [header, 0, 0, 0, 0]
+            entry[1] += step.lost_ms
+            if step.a is None:
+                entry[4] += 1
+            elif step.b is None:
+                entry[3] += 1
+            else:
+                entry[2] += 1
+        return sorted(totals.values(), key=lambda entry: (-entry[1], entry[0]))
+
+    def report(self, limit=DIFF_REPORT_LINES):
+        """The diff as a list of text lines; `limit` commands, stretches and steps are listed."""
+        a, b = self.a, self.b
+        a_total, b_total = sum(a.durations), sum(b.durations)
+        aligned = self.aligned
+        only_a = len(a.commands) - aligned
+        only_b = len(b.commands) - aligned
+        change = f" ({(b_total - a_total) * 100 / a_total:+.1f}%)" if a_total else ""
+        lines = [
+            f"Run A: {len(a.commands)} commands in {a_total / 1000:.1f} s",
+            f"Run B: {len(b.commands)} commands in {b_total / 1000:.1f} s, "
+            f"{(b_total - a_total) / 1000:+.1f} s{change}",
+            f"Aligned: {aligned}, only in A: {only_a}, only in B: {only_b}",
+            "",
+        ]
+
+        lines.append(f"{'Command':<45} {'Aligned':>8} {'Only A':>7} {'Only B':>7} {'Lost ms':>10}")
+        lines.append("-" * 120)
+        for header, lost, both, removed, inserted in self.by_command()[:limit]:
+            lines.append(f"{header:<45} {both:>8} {removed:>7} {inserted:>7} {lost:>+10}")
+
+        stretches = heapq.nlargest(limit, self.stretches(), key=lambda s: abs(s.lost_ms))
+        if stretches:
+            lines.append("")
+            lines.append(f"Largest {len(stretches)} differing stretches:")
+            for stretch in stretches:
+                lines.append(f"  {stretch.lost_ms:>+9} ms  "
+                             f"A {stretch.a_end - stretch.a_start:>6} from {self._when(a, stretch.a_start, stretch.a_end)}  "
+                             f"B {stretch.b_end - stretch.b_start:>6} from {self._when(b, stretch.b_start, stretch.b_end)}  "
+                             f"{self._first_command(stretch)}")
+
+        steps = heapq.nlargest(limit, self.steps(), key=lambda step: step.lost_ms)
+        if steps:
+            lines.append("")
+            lines.append("Steps losing the most time:")
+            for step in steps:
+                a_when = log_store.format_timestamp(a.timestamps[step.a]) if step.a is not None else "only in B"
+                b_when = log_store.format_timestamp(b.timestamps[step.b]) if step.b is not None else "only in A"
+                lines.append(f"  {step.lost_ms:>+9} ms  A {a_when:<23}  B {b_when:<23}  {step.command}")
+        return lines
+
+    @staticmethod
+    def _when(stream, start, end):
+        return log_store.format_timestamp(stream.timestamps[start]) if start < end else f"{'-':<23}"
+
+    def _first_command(self, stretch):
+        if stretch.b_start < stretch.b_end:
+            return self.b.commands[stretch.b_start]
+        return self.a.commands[stretch.a_start]
+
+
+def diff_stores(a_store, b_store, command_pattern=None, a_rows=None, b_rows=None, max_cost=DIFF_MAX_COST):
+    """Align the command streams of `a_store` and `b_store` and return the CommandDiff.
+
+    `command_pattern` and the row subsets are as for command_stream().
+    """
+    return CommandDiff(command_stream(a_store, command_pattern, a_rows),
+                       command_stream(b_store, command_pattern, b_rows), max_cost)
+
+
+def _spec_for_run(spec, reference, store):
+    """`spec`, whose times are on the date of the `reference` timestamp, for the run in `store`.
+
+    The time bounds move by whole days to the date of the first entry of
+    `store`, so a time of day selects the same part of both runs. A run
+    loaded on its own has no stations, so the station filter is dropped.
+    """
+    shift = 0
+    if reference is not None and len(store):
+        shift = (store.timestamps[0] // _MS_PER_DAY - reference // _MS_PER_DAY) * _MS_PER_DAY
+    return spec._replace(start=None if spec.start is None else spec.start + shift,
+                         end=None if spec.end is None else spec.end + shift, stations=None)
+
+
+class RunComparer(threading.Thread):
+    """Loads a reference run and diffs its commands against another run on a worker thread.
+
+    The logs of `paths` are run A and the CommandStream `current` run B;
+    `current` is extracted beforehand, on the thread owning its store.
+    When `current` covers only the rows of B matching the FilterSpec
+    `spec`, run A is reduced the same way; `reference` is a timestamp of
+    run B, and the time bounds of `spec` move by whole days from its date
+    to the date of run A (see _spec_for_run()).
+    Events are queued on `events` as (kind, payload) tuples:
+      ("done", CommandDiff)
+      ("error", exception)
+    """
+
+    def __init__(self, paths, current, command_pattern=None, cache=None, spec=None, reference=None):
+        super().__init__(daemon=True)
+        self.paths = paths
+        self.current = current
+        self.command_pattern = command_pattern
+        self.cache = cache
+        self.spec = spec
+        self.reference = reference
+        self.events = queue.Queue()
+
+    def run(self):
+        try:
+            store = log_store.LogStore.open(self.paths, cache=self.cache)
+            try:
+                rows = None
+                if self.spec is not None:
+                    rows = log_filter.LogFilter(store).rows(_spec_for_run(self.spec, self.reference, store))
+                reference = command_stream(store, self.command_pattern, rows)
+            finally:
+                store.close()
+            diff = CommandDiff(reference, self.current)
+        except Exception as e:
+            self.events.put(("error", e))
+        else:
+            self.events.put(("done", diff))
+
+    def poll(self):
+        """Return the events queued since the last call, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
@@ -0,0 +1,209 @@
+"""SCPI command latency analysis of Ieee488Connection traffic.
+
+Instrument traffic is logged by the `Ieee488Connection` source as
+`ADDRESS <-- COMMAND` for data sent to an instrument and
+`ADDRESS --> RESPONSE` for data read back. Each command is paired with
+the next response on the same address; the time between the two is the
+latency of the call. A command that is followed by another command on
+the same address before any response (a plain write) is counted as
+unanswered and has no latency.
+
+Latencies are grouped by command header (the command without its
+arguments) and summarised with percentiles, a fixed-bucket histogram
+and the slowest calls overall, all collected in one pass over the rows.
+"""
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from itertools import compress
+
+from src.log_store import format_timestamp
+
+TRAFFIC_SOURCE = "Ieee488Connection"
+TRAFFIC_PATTERN = re.compile(r"^(\S+) (<--|-->) ?(.*)$", re.DOTALL)
+SENT = "<--"
+
+# Upper bucket edges in milliseconds; the last bucket holds everything slower.
+HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+PERCENTILES = (50, 90, 99)
+SLOWEST_CALLS = 20
+
+# row and response_row are LogStore rows of the command and of its response.
+Call = namedtuple("Call", ["latency_ms", "timestamp", "address", "command", "row", "response_row"])
+
+
+def command_header(command):
+    """The command without its arguments, e.g. 'CONF:FREQ' for 'CONF:FREQ 1e9'."""
+    return command.split(None, 1)[0] if command.strip() else command
+
+
+def traffic_rows(store, rows=None):
+    """The Ieee488Connection rows of `store` (of all rows, or of the sorted `rows`), in order."""
+    code = store.source_table.code(TRAFFIC_SOURCE)
+    if code is None:
+        return iter(())
+    mask = store.code_mask(store.sources, store.source_table, [code])
+    if rows is None:
+        return compress(range(len(mask)), mask)
+    return (row for row in rows if mask[row])
+
+
+class CommandStats:
+    """Latency samples and histogram of one command header."""
+
+    def __init__(self, command):
+        self.command = command
+        self.latencies = array('q')
+        self.histogram = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+        self.unanswered = 0
+        self._sorted = True
+
+    def add(self, latency_ms):
+        if self.latencies and latency_ms < self.latencies[-1]:
+            self._sorted = False
+        self.latencies.append(latency_ms)
+        self.histogram[bisect_left(HISTOGRAM_EDGES_MS, latency_ms)] += 1
+
+    @property
+    def count(self):
+        return len(self.latencies)
+
+    @property
+    def total_ms(self):
+        return sum(self.latencies)
+
+    def percentile(self, percent):
+        """Nearest-rank percentile of the latencies, in milliseconds."""
+        if not self.latencies:
+            return None
+        if not self._sorted:
+            self.latencies = array('q', sorted(self.latencies))
+            self._sorted = True
+        rank = max(1, -(-percent * len(self.latencies) // 100))
+        return self.latencies[rank - 1]
+
+
+class CommandTimingAnalyzer:
+    """Pairs commands with responses per address and collects latency statistics.
+
+    Feed records in time order with `add()`, or a whole LogStore with
+    `add_store()`; `stats` maps command headers to CommandStats.
+    """
+
+    def __init__(self, command_pattern=None, slowest=SLOWEST_CALLS):
+        """Only commands matching the `command_pattern` regex (if any) are counted."""
+        self.command_regex = re.compile(command_pattern) if command_pattern else None
+        self.slowest_count = slowest
+        self.stats = {}
+        self.traffic_lines = 0
+        self._pending = {}
+        self._slowest = []
+
+    def add(self, timestamp, message, row=None):
+        """Process one Ieee488Connection message logged at `timestamp` (ms)."""
+        match = TRAFFIC_PATTERN.match(message)
+        if match is None:
+            return
+        self.traffic_lines += 1
+        address, direction, payload = match.groups()
+
+        if direction == SENT:
+            previous = self._pending.get(address)
+            if previous is not None:
+                self._stats_for(previous[1]).unanswered += 1
+            command = payload.strip()
+            if self.command_regex is None or self.command_regex.search(command):
+                self._pending[address] = (timestamp, command, row)
+            else:
+                self._pending.pop(address, None)
+            return
+
+        pending = self._pending.pop(address, None)
+        if pending is None:
+            return
+        sent_at, command, command_row = pending
+        latency = timestamp - sent_at
+        self._stats_for(command).add(latency)
+        if self.slowest_count:
+            call = Call(latency, sent_at, address, command, command_row, row)
+            # Min-heap of the slowest calls; on equal latency the earlier call ranks higher
+            entry = (latency, -sent_at, len(self._slowest), call)
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif entry[:2] > self._slowest[0][:2]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _stats_for(self, command):
+        header = command_header(command)
+        stats = self.stats.get(header)
+        if stats is None:
+            stats = self.stats[header] = CommandStats(header)
+        return stats
+
+    def add_store(self, store, rows=None):
+        """Process the Ieee488Connection rows of `store` (all rows, or the sorted `rows`)."""
+        timestamps = store.timestamps
+        for row in traffic_rows(store, rows):
+            self.add(timestamps[row], store.message(row), row)
+
+    def finish(self):
+        """Count the commands still waiting for a response as unanswered."""
+        for _, command, _ in self._pending.values():
+            self._stats_for(command).unanswered += 1
+        self._pending.clear()
+
+    def slowest(self):
+        """The slowest calls, slowest first."""
+        return [entry[3] for entry in sorted(self._slowest, key=lambda e: e[:2], reverse=True)]
+
+    def by_total_time(self):
+        """CommandStats sorted by the total time spent waiting for them."""
+        return sorted(self.stats.values(), key=lambda s: (-s.total_ms, s.command))
+
+    def report(self):
+        """The analysis as a list of text lines."""
+        lines = []
+        answered = sum(s.count for s in self.stats.values())
+        unanswered = sum(s.unanswered for s in self.stats.values())
+        lines.append(f"Instrument traffic lines: {self.traffic_lines}")
+        lines.append(f"Commands with a response: {answered}, without: {unanswered}")
+        lines.append(f"Distinct commands: {len(self.stats)}")
+        lines.append("")
+
+        percentile_headers = "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+        lines.append(f"{'Command':<45} {'Count':>7} {'Total ms':>10} {'Max ms':>8}{percentile_headers}")
+        lines.append("-" * 120)
+        for stats in self.by_total_time():
+            if not stats.count:
+                lines.append(f"{stats.command:<45} {0:>7} {'-':>10} {'-':>8}   ({stats.unanswered} without response)")
+                continue
+            percentiles = "".join(f"{stats.percentile(p):>9}" for p in PERCENTILES)
+            lines.append(f"{stats.command:<45} {stats.count:>7} {stats.total_ms:>10} "
+                         f"{max(stats.latencies):>8}{percentiles}")
+
+        lines.append("")
+        lines.append("Latency histograms (ms):")
+        labels = [f"<={edge}" for edge in HISTOGRAM_EDGES_MS] + [f">{HISTOGRAM_EDGES_MS[-1]}"]
+        for stats in self.by_total_time():
+            if stats.count:
+                buckets = ", ".join(f"{label}: {n}" for label, n in zip(labels, stats.histogram) if n)
+                lines.append(f"  {stats.command}: {buckets}")
+
+        slowest = self.slowest()
+        if slowest:
+            lines.append("")
+            lines.append(f"Slowest {len(slowest)} calls:")
+            for call in slowest:
+                lines.append(f"  {call.latency_ms:>8} ms  {format_timestamp(call.timestamp)}  "
+                             f"{call.address}  {call.command}")
+        return lines
+
+
+def analyze_store(store, command_pattern=None, slowest=SLOWEST_CALLS, rows=None):
+    """Run a CommandTimingAnalyzer over `store` and return it."""
+    analyzer = CommandTimingAnalyzer(command_pattern, slowest)
+    analyzer.add_store(store, rows)
+    analyzer.finish()
+    return analyzer
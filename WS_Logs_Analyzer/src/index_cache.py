@@ -0,0 +1,149 @@
+"""On-disk cache of the parsed columns of log files.
+
+Rotated `application.log.N` files never change, so the columns parsed
+from them are saved once and read back with a few `array.fromfile`
+calls the next time the file is opened. An entry is keyed by the file
+path and only used while the file's size and modification time are
+unchanged.
+
+Entries live in a per-user cache directory rather than next to the logs,
+as the Wave Studio log directory is usually not writable. The least
+recently used entries are removed once the cache exceeds its size limit.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from array import array
+
+from src.log_store import remap_codes
+
+CACHE_VERSION = 4
+MAGIC = b"WSLOGIDX\n"
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+
+def default_cache_dir():
+    """The per-user directory holding cached indexes."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "WS_Logs_Analyzer", "index_cache")
+
+
+class IndexCache:
+    """Saves and loads the EntryColumns of log files, keyed by path, size and mtime."""
+
+    def __init__(self, directory=None, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key + ".idx")
+
+    @staticmethod
+    def _key(path, size, mtime_ns):
+        return {
+            "version": CACHE_VERSION,
+            "path": os.path.abspath(path),
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "byteorder": sys.byteorder,
+        }
+
+    def _read_header(self, f, path, size, mtime_ns):
+        """The header of the open entry `f` if it matches the file, else None."""
+        if f.readline() != MAGIC:
+            return None
+        header = json.loads(f.readline())
+        if any(header.get(name) != value for name, value in self._key(path, size, mtime_ns).items()):
+            return None
+        return header
+
+    def contains(self, path):
+        """Whether `path`, as it is now, has an entry; only its header is read."""
+        try:
+            stat_result = os.stat(path)
+            with open(self._entry_path(path), 'rb') as f:
+                return self._read_header(f, path, stat_result.st_size, stat_result.st_mtime_ns) is not None
+        except (OSError, ValueError):
+            return False
+
+    def load(self, path, size, mtime_ns, columns, levels, sources):
+        """Fill the empty EntryColumns `columns` from the cache; return False on a miss.
+
+        Cached level and source codes are re-interned into the `levels`
+        and `sources` tables.
+        """
+        entry_path = self._entry_path(path)
+        try:
+            with open(entry_path, 'rb') as f:
+                header = self._read_header(f, path, size, mtime_ns)
+                if header is None:
+                    return False
+                count = header["count"]
+                loaded = {}
+                for name in columns._COLUMNS:
+                    column = array(getattr(columns, name).typecode)
+                    column.fromfile(f, count)
+                    loaded[name] = column
+        except (OSError, ValueError, KeyError, EOFError):
+            return False
+
+        level_map = [levels.intern(name.encode('utf-8')) for name in header["levels"]]
+        source_map = [sources.intern(name.encode('utf-8')) for name in header["sources"]]
+        loaded["levels"] = remap_codes(loaded["levels"], level_map)
+        loaded["sources"] = remap_codes(loaded["sources"], source_map)
+        for name, column in loaded.items():
+            setattr(columns, name, column)
+        try:
+            # Mark the entry as recently used
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return True
+
+    def save(self, path, size, mtime_ns, columns, levels, sources):
+        """Store the EntryColumns `columns` of `path`; failures only cost the next parse."""
+        header = self._key(path, size, mtime_ns)
+        header["count"] = len(columns)
+        header["levels"] = levels.names
+        header["sources"] = sources.names
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(MAGIC)
+                    f.write(json.dumps(header).encode('utf-8') + b"\n")
+                    for name in columns._COLUMNS:
+                        getattr(columns, name).tofile(f)
+                # Readers in other processes see the old entry or the new one, never a partial one
+                os.replace(tmp_path, self._entry_path(path))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.prune()
+        except OSError:
+            pass
+
+    def prune(self):
+        """Remove the least recently used entries while the cache exceeds `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".idx"):
+                try:
+                    stat_result = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat_result.st_mtime, stat_result.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+            except OSError:
+                pass
+
@@ -1,20 +1,44 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, scrolledtext, messagebox
+from tkinter import ttk, filedialog, messagebox
 import os
 import re
-from collections import defaultdict
-
-# --- Pre-compiled Regex for Performance ---
-HIGHLIGHT_PATTERNS = {
-    "error": re.compile(r'\b(ERROR|EXCEPTION|CRITICAL|FAILED)\b', re.IGNORECASE),
-    "warning": re.compile(r'\b(WARNING|WARN|DEPRECATED)\b', re.IGNORECASE),
-    "info": re.compile(r'\b(COMMAND|EXECUTE|INVOKE|STEP)\b', re.IGNORECASE),
-    "loglevel_engine": re.compile(r'\bEngine\b'),
-    "loglevel_debug": re.compile(r'\bDebug\b'),
-    "loglevel_info": re.compile(r'\bInfo\b'),
-    "loglevel_trace": re.compile(r'\bTrace\b'),
-    # Error level is already covered by the 'error' tag pattern
+from bisect import bisect_left
+
+from src import command_diff
+from src import command_timing
+from src import index_cache
+from src import log_export
+from src import log_filter
+from src import log_highlight
+from src import log_loader
+from src import log_monitor
+from src import log_query
+from src import log_store
+from src import log_timeline
+from src import perf_trace
+from src.log_view import VirtualLogView
+
+# Interval at which the Tk main loop drains events from the background loader
+LOADER_POLL_MS = 100
+# Typing pause before the search term is applied
+SEARCH_DEBOUNCE_MS = 250
+# Station filter choice that keeps the rows of every station
+ALL_STATIONS = "All"
+# Log followed by the Real-Time Monitor tab unless another path is entered
+DEFAULT_MONITOR_PATH = r"C:\ProgramData\MVG\Wave Studio\application.log"
+MONITOR_MIN_INTERVAL = 0.5
+MONITOR_MAX_INTERVAL = 10.0
+# Timeline panel: canvas height, legend row height and the number of series drawn separately
+TIMELINE_HEIGHT = 90
+TIMELINE_LEGEND_HEIGHT = 14
+TIMELINE_SERIES = 8
+# Same colours as the log level tags of the viewer
+LEVEL_COLORS = {
+    "TRACE": "#DDA0DD", "ENGINE": "#FFD700", "DEBUG": "#87CEEB", "INFO": "#90EE90",
+    "WARNING": "orange", "WARN": "orange", "ERROR": "#FF6B6B", "CRITICAL": "red",
 }
+SERIES_COLORS = ["#4E79A7", "#F28E2B", "#E15759", "#76B7B2", "#59A14F", "#EDC948", "#B07AA1", "#FF9DA7"]
+OTHER_SERIES_COLOR = "#BAB0AC"
 
 
 class LogAnalyzerApp:
@@ -29,12 +53,30 @@ class LogAnalyzerApp:
 
         # --- State Variables ---
         self.log_dir = r"C:\workspace\WS_Logs_Analyzer"
-        self.all_log_lines = []
+        self.log_store = None
+        self.log_filter = None
+        self.loader = None
+        self.exporter = None
+        self.comparer = None
+        self._loaded_label = ""
+        self._pending_filter = None
         self.current_file = ""
         self.file_size = 0
         self.log_selection_window = None
         self.level_filter_vars = {}
         self.source_engine_only_var = tk.BooleanVar(value=False)
+        self.log_tail = None
+        self.live_file = None
+        self._live_file_index = None
+        self._monitor_job = None
+        self.monitor_rows = []
+        self.timeline = None
+        self._timeline_series = []
+        # Stage timings of loads and filters; WS_LOGS_TRACE names an optional trace file
+        self.tracer = perf_trace.Tracer(os.environ.get(perf_trace.TRACE_ENV))
+        self._timings = {}
+        # Syntax highlighting spans of the rows scrolled into view, cached per row
+        self.highlighter = log_highlight.Highlighter()
 
         # --- UI Setup ---
         self._setup_widgets()
@@ -54,6 +96,26 @@ class LogAnalyzerApp:
         self.notebook.add(self.viewer_frame, text="Log Viewer")
         self._setup_viewer_tab()
 
+        # Tab 2: Command Timing
+        self.timing_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.timing_frame, text="Command Timing")
+        self._setup_timing_tab()
+
+        # Tab 3: Real-Time Monitor
+        self.monitor_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.monitor_frame, text="Real-Time Monitor")
+        self._setup_monitor_tab()
+
+        # --- Status Bar (timings of the last load and filter) ---
+        status_frame = ttk.Frame(main_frame)
+        status_frame.pack(fill="x")
+        self.status_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.status_var, anchor="w", relief="sunken").pack(
+            side="left", fill="x", expand=True)
+        self.profile_next_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(status_frame, text="Profile next operation", variable=self.profile_next_var,
+                        command=self.toggle_profiling).pack(side="left", padx=(10, 0))
+
     def _setup_viewer_tab(self):
         """Setup the main log viewer tab."""
         frm = ttk.Frame(self.viewer_frame, padding="10")
@@ -66,10 +128,19 @@ class LogAnalyzerApp:
         load_button = ttk.Button(controls_frame, text="Browse for Logs...", command=self.open_log_browser)
         load_button.pack(side="left", padx=(0, 10))
 
+        export_button = ttk.Button(controls_frame, text="Export...", command=self.export_results)
+        export_button.pack(side="left", padx=(0, 10))
+
         self.file_label_var = tk.StringVar(value="No file loaded.")
         file_label = ttk.Label(controls_frame, textvariable=self.file_label_var, anchor="w", relief="sunken", width=40)
         file_label.pack(side="left", fill="x", expand=True)
 
+        # Shown only while a background load is running
+        self.cancel_load_button = ttk.Button(controls_frame, text="Cancel", command=self.cancel_loading)
+        self.load_progress = ttk.Progressbar(controls_frame, mode="determinate", maximum=100, length=200)
+        # Shown only while an export is running
+        self.cancel_export_button = ttk.Button(controls_frame, text="Cancel Export", command=self.cancel_export)
+
         # --- Filter Controls ---
         filter_frame = ttk.Frame(frm)
         filter_frame.pack(fill="x", pady=(0, 10))
@@ -94,6 +165,11 @@ class LogAnalyzerApp:
         ttk.Checkbutton(filter_frame, text="Source 'Engine' Only", variable=self.source_engine_only_var,
                        command=self.apply_filter).pack(side="left", padx=(10, 0))
 
+        # Multi-line entries (stack traces) show their first line; double-click one to toggle it
+        self.expand_records_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Expand Multi-line", variable=self.expand_records_var,
+                       command=self.toggle_all_records).pack(side="left", padx=(10, 0))
+
         # --- Log Level Filter ---
         level_filter_frame = ttk.Frame(frm)
         level_filter_frame.pack(fill="x", pady=(0, 10))
@@ -107,17 +183,75 @@ class LogAnalyzerApp:
             cb.pack(side="left", padx=5)
             self.level_filter_vars[level] = var
 
-        # Option to force highlighting even for large result sets
-        # (removed Always highlight checkbox to avoid accidental heavy highlighting)
+        # Station of merged logs of several bench PCs; filled when a store is loaded
+        ttk.Label(level_filter_frame, text="Station:").pack(side="left", padx=(20, 5))
+        self.station_var = tk.StringVar(value=ALL_STATIONS)
+        self.station_combo = ttk.Combobox(level_filter_frame, textvariable=self.station_var, state="readonly",
+                                          values=[ALL_STATIONS], width=20)
+        self.station_combo.pack(side="left")
+        self.station_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filter())
+
+        # --- Time Range Filter ---
+        # Times are "HH:MM[:SS[,mmm]]" on the date of the first entry, or full "YYYY-MM-DD HH:MM:SS,mmm"
+        time_frame = ttk.Frame(frm)
+        time_frame.pack(fill="x", pady=(0, 10))
+
+        ttk.Label(time_frame, text="From:").pack(side="left", padx=(0, 5))
+        self.time_from_var = tk.StringVar()
+        from_entry = ttk.Entry(time_frame, textvariable=self.time_from_var, width=24)
+        from_entry.pack(side="left", padx=(0, 10))
+        ttk.Label(time_frame, text="To:").pack(side="left", padx=(0, 5))
+        self.time_to_var = tk.StringVar()
+        to_entry = ttk.Entry(time_frame, textvariable=self.time_to_var, width=24)
+        to_entry.pack(side="left", padx=(0, 10))
+        for entry in (from_entry, to_entry):
+            entry.bind("<Return>", lambda e: self.apply_filter())
+        ttk.Button(time_frame, text="Apply", command=self.apply_filter).pack(side="left", padx=(0, 5))
+        ttk.Button(time_frame, text="All Times", command=self.clear_time_range).pack(side="left", padx=(0, 20))
+
+        ttk.Label(time_frame, text="Jump to:").pack(side="left", padx=(0, 5))
+        self.jump_time_var = tk.StringVar()
+        jump_entry = ttk.Entry(time_frame, textvariable=self.jump_time_var, width=24)
+        jump_entry.pack(side="left", padx=(0, 5))
+        jump_entry.bind("<Return>", lambda e: self.jump_to_time())
+        ttk.Button(time_frame, text="Go", command=self.jump_to_time).pack(side="left", padx=(0, 10))
+
+        self.time_range_var = tk.StringVar()
+        ttk.Label(time_frame, textvariable=self.time_range_var, anchor="w").pack(side="left", fill="x", expand=True)
+
+        # --- Timeline (entries per time bucket; click a bar to show only its time range) ---
+        timeline_frame = ttk.Frame(frm)
+        timeline_frame.pack(fill="x", pady=(0, 10))
+
+        timeline_header = ttk.Frame(timeline_frame)
+        timeline_header.pack(fill="x")
+        ttk.Label(timeline_header, text="Timeline by:").pack(side="left", padx=(0, 5))
+        self.timeline_group_var = tk.StringVar(value="Level")
+        timeline_group = ttk.Combobox(timeline_header, textvariable=self.timeline_group_var, state="readonly",
+                                      values=list(log_timeline.COLUMNS), width=8)
+        timeline_group.pack(side="left", padx=(0, 10))
+        timeline_group.bind("<<ComboboxSelected>>", lambda e: self.update_timeline())
+        self.timeline_info_var = tk.StringVar()
+        ttk.Label(timeline_header, textvariable=self.timeline_info_var, anchor="w").pack(side="left", fill="x", expand=True)
+
+        self.timeline_canvas = tk.Canvas(timeline_frame, height=TIMELINE_HEIGHT, background="white",
+                                         highlightthickness=0)
+        self.timeline_canvas.pack(fill="x")
+        self.timeline_canvas.bind("<Configure>", lambda e: self.draw_timeline())
+        self.timeline_canvas.bind("<Button-1>", self.on_timeline_click)
+        self.timeline_canvas.bind("<Motion>", self.on_timeline_motion)
 
         # --- Log Display Area ---
-        self.log_text = scrolledtext.ScrolledText(
-            frm,
-            wrap=tk.NONE,
-            font=("Courier New", 9),
-            state="disabled"
-        )
-        self.log_text.pack(fill="both", expand=True)
+        # Only the rows in the viewport are rendered, whatever the result size
+        self.log_view = VirtualLogView(frm, font=("Courier New", 9))
+        self.log_view.pack(fill="both", expand=True)
+        self.log_text = self.log_view.text
+        self.log_view.on_row_activate = self.toggle_record
+        self.display_rows = []
+        # FilterSpec the displayed rows were selected with
+        self.display_spec = None
+        # Store rows shown the other way than "Expand Multi-line" says
+        self.toggled_records = set()
 
         # Configure tags for highlighting
         self.log_text.tag_configure("highlight", background="yellow", foreground="black", font=("Courier New", 9, "bold"))
@@ -130,299 +264,889 @@ class LogAnalyzerApp:
         self.log_text.tag_configure("loglevel_info", background="#90EE90", foreground="black", font=("Courier New", 9, "bold"))    # Light Green
         self.log_text.tag_configure("loglevel_trace", background="#DDA0DD", foreground="black", font=("Courier New", 9, "bold"))   # Plum
         self.log_text.tag_configure("loglevel_error", background="#FF6B6B", foreground="white", font=("Courier New", 9, "bold"))   # Red
+        # Continuation lines of multi-line entries
+        self.log_text.tag_configure("continuation", foreground="#555555")
+        self.log_text.tag_configure("collapsed", foreground="#1E5AA8")
+
+    def _setup_timing_tab(self):
+        """Setup the command timing tab."""
+        frm = ttk.Frame(self.timing_frame, padding="10")
+        frm.pack(fill="both", expand=True)
+
+        # --- Analysis Controls ---
+        controls_frame = ttk.Frame(frm)
+        controls_frame.pack(fill="x", pady=(0, 10))
+
+        ttk.Label(controls_frame, text="Command Pattern:").pack(side="left", padx=(0, 5))
+        self.command_pattern_var = tk.StringVar()
+        ttk.Entry(controls_frame, textvariable=self.command_pattern_var, width=30).pack(side="left", padx=(0, 10))
+
+        ttk.Label(controls_frame, text="Slowest:").pack(side="left", padx=(0, 5))
+        self.slowest_calls_var = tk.IntVar(value=command_timing.SLOWEST_CALLS)
+        ttk.Spinbox(controls_frame, from_=0, to=1000, textvariable=self.slowest_calls_var, width=6).pack(
+            side="left", padx=(0, 10))
+
+        self.timing_filtered_only_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(controls_frame, text="Filtered rows only", variable=self.timing_filtered_only_var).pack(
+            side="left", padx=(0, 10))
+
+        ttk.Button(controls_frame, text="Analyze Timings", command=self.analyze_timings).pack(side="left", padx=(0, 5))
+        # Diff of the command stream against another run of the test plan
+        ttk.Button(controls_frame, text="Compare Runs...", command=self.compare_runs).pack(side="left", padx=(0, 5))
+        ttk.Button(controls_frame, text="Export Results", command=self.export_timing_results).pack(side="left")
+
+        # --- Results ---
+        results_frame = ttk.Frame(frm)
+        results_frame.pack(fill="both", expand=True)
+        self.timing_text = tk.Text(results_frame, wrap=tk.NONE, font=("Courier New", 9), state="disabled")
+        timing_scroll = ttk.Scrollbar(results_frame, orient="vertical", command=self.timing_text.yview)
+        self.timing_text.configure(yscrollcommand=timing_scroll.set)
+        self.timing_text.pack(side="left", fill="both", expand=True)
+        timing_scroll.pack(side="right", fill="y")
+
+    def analyze_timings(self):
+        """Pair instrument commands with their responses and show the latency statistics."""
+        if self.log_store is None:
+            messagebox.showinfo("No Logs", "Load log files first.")
+            return
+        try:
+            slowest = max(0, int(self.slowest_calls_var.get()))
+        except (tk.TclError, ValueError):
+            slowest = command_timing.SLOWEST_CALLS
+        rows = self.display_rows if self.timing_filtered_only_var.get() else None
+        try:
+            analyzer = command_timing.analyze_store(
+                self.log_store, self.command_pattern_var.get() or None, slowest, rows)
+        except re.error as e:
+            messagebox.showerror("Invalid Pattern", f"Invalid command pattern: {e}")
+            return
+
+        self._show_timing_results(analyzer.report())
+
+    def compare_runs(self):
+        """Diff the instrument commands of the loaded logs (run B) against those of another run (A)."""
+        if self.log_store is None:
+            messagebox.showinfo("No Logs", "Load log files first.")
+            return
+        if self.comparer is not None:
+            messagebox.showinfo("Comparison Running", "Wait for the running comparison to finish.")
+            return
+        dir_path = self._ask_log_directory("Select Log Directory of the Run to Compare With")
+        if not dir_path:
+            return
+        pattern = self.command_pattern_var.get() or None
+        # Both runs are reduced by the same filter and command pattern
+        spec = self.display_spec if self.timing_filtered_only_var.get() else None
+        rows = self.display_rows if spec is not None else None
+        try:
+            current = command_diff.command_stream(self.log_store, pattern, rows)
+        except re.error as e:
+            messagebox.showerror("Invalid Pattern", f"Invalid command pattern: {e}")
+            return
+
+        paths = [os.path.join(dir_path, name) for name in log_store.find_log_files(dir_path)]
+        reference = self.log_store.timestamps[0] if len(self.log_store) else None
+        self.comparer = command_diff.RunComparer(paths, current, pattern, cache=index_cache.IndexCache(),
+                                                 spec=spec, reference=reference)
+        self.comparer.start()
+        self._show_timing_results([f"Comparing with the run in {dir_path}..."])
+        self.root.after(LOADER_POLL_MS, self._poll_comparer, self.comparer)
+
+    def _poll_comparer(self, comparer):
+        """Show the run comparison on the Tk main thread once it is done."""
+        events = comparer.poll()
+        if not events:
+            self.root.after(LOADER_POLL_MS, self._poll_comparer, comparer)
+            return
+        self.comparer = None
+        kind, payload = events[0]
+        if kind == "done":
+            lines = [f"A: {os.path.dirname(comparer.paths[0])}", "B: the loaded logs", ""] + payload.report()
+            self._show_timing_results(lines)
+        else:
+            self._show_timing_results([])
+            messagebox.showerror("Error", f"Failed to compare runs: {payload}")
+
+    def _show_timing_results(self, lines):
+        self.timing_text.config(state="normal")
+        self.timing_text.delete("1.0", tk.END)
+        self.timing_text.insert(tk.END, "\n".join(lines) + "\n")
+        self.timing_text.config(state="disabled")
+
+    def export_timing_results(self):
+        """Save the timing analysis shown in the tab to a text file."""
+        results = self.timing_text.get("1.0", tk.END).strip()
+        if not results:
+            messagebox.showinfo("No Results", "Run the timing analysis first.")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Timing Analysis", defaultextension=".txt",
+            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(results + "\n")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export results: {e}")
+
+    def _setup_monitor_tab(self):
+        """Setup the real-time monitor tab."""
+        frm = ttk.Frame(self.monitor_frame, padding="10")
+        frm.pack(fill="both", expand=True)
+
+        # --- Path and Refresh Controls ---
+        path_frame = ttk.Frame(frm)
+        path_frame.pack(fill="x", pady=(0, 10))
+
+        ttk.Label(path_frame, text="Log file:").pack(side="left", padx=(0, 5))
+        self.monitor_path_var = tk.StringVar(value=DEFAULT_MONITOR_PATH)
+        ttk.Entry(path_frame, textvariable=self.monitor_path_var).pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ttk.Button(path_frame, text="Browse...", command=self.browse_monitor_file).pack(side="left")
+
+        control_frame = ttk.Frame(frm)
+        control_frame.pack(fill="x", pady=(0, 10))
+
+        ttk.Label(control_frame, text="Refresh (s):").pack(side="left", padx=(0, 5))
+        self.monitor_interval_var = tk.DoubleVar(value=1.0)
+        ttk.Spinbox(control_frame, from_=MONITOR_MIN_INTERVAL, to=MONITOR_MAX_INTERVAL, increment=0.5,
+                    textvariable=self.monitor_interval_var, width=6).pack(side="left", padx=(0, 10))
+
+        self.monitor_button = ttk.Button(control_frame, text="Start Monitoring", command=self.toggle_monitoring)
+        self.monitor_button.pack(side="left", padx=(0, 10))
+
+        self.monitor_status_var = tk.StringVar(value="Monitoring stopped.")
+        ttk.Label(control_frame, textvariable=self.monitor_status_var, anchor="w", relief="sunken").pack(
+            side="left", fill="x", expand=True)
+
+        # --- New Lines ---
+        self.monitor_view = VirtualLogView(frm, font=("Courier New", 9))
+        self.monitor_view.pack(fill="both", expand=True)
+        self.monitor_view.text.tag_configure("new", background="#90EE90", foreground="black")
+
+    def browse_monitor_file(self):
+        """Select the log file to monitor."""
+        current = self.monitor_path_var.get()
+        initial_dir = os.path.dirname(current) if os.path.isdir(os.path.dirname(current)) else os.getcwd()
+        path = filedialog.askopenfilename(initialdir=initial_dir, title="Select Log File to Monitor")
+        if path:
+            self.monitor_path_var.set(path)
+
+    def toggle_monitoring(self):
+        """Start or stop following the monitored log file."""
+        if self.log_tail is not None:
+            self.stop_monitoring()
+        else:
+            self.start_monitoring()
+
+    def start_monitoring(self):
+        """Follow the log file from its current end, or from the end of the loaded copy."""
+        path = os.path.abspath(self.monitor_path_var.get())
+        offset = None
+        copy_index = self._loaded_copy(path)
+        if copy_index is not None:
+            # Continue right after a loaded copy of the same file
+            offset = self.log_store.files[copy_index].size
+        try:
+            self.log_tail = log_monitor.LogTail(path, offset)
+        except OSError as e:
+            messagebox.showerror("Error", f"Cannot monitor '{path}': {e}")
+            return
+
+        self.monitor_rows = []
+        self.monitor_view.set_rows(0, self._render_monitor_row)
+        self.monitor_button.config(text="Stop Monitoring")
+        self.monitor_status_var.set(f"Monitoring {path}")
+        self._poll_monitor()
+
+    def _loaded_copy(self, path):
+        """Index of the loaded LogFile of `path` in the store, or None."""
+        if self.log_store is None:
+            return None
+        copy_index = None
+        for index, f in enumerate(self.log_store.files):
+            if os.path.abspath(f.path) == os.path.abspath(path) and isinstance(f, log_store.LogFile):
+                copy_index = index
+        return copy_index
+
+    def _resync_tail(self):
+        """Continue the followed file right after the copy loaded into the new store, if any.
+
+        The copy was mapped at another size than the tail had read up to:
+        lines before its end would be appended twice, lines after it lost.
+        """
+        tail = self.log_tail
+        copy_index = self._loaded_copy(tail.path)
+        if copy_index is None:
+            return
+        try:
+            self.log_tail = log_monitor.LogTail(tail.path, self.log_store.files[copy_index].size)
+        except OSError as e:
+            self.monitor_status_var.set(f"Cannot read {tail.path}: {e}")
+            return
+        self.log_tail.rotations = tail.rotations
+
+    def stop_monitoring(self):
+        """Stop following the log file; lines already appended stay loaded."""
+        if self._monitor_job is not None:
+            self.root.after_cancel(self._monitor_job)
+            self._monitor_job = None
+        self.log_tail = None
+        self.monitor_button.config(text="Start Monitoring")
+        self.monitor_status_var.set(f"Monitoring stopped ({len(self.monitor_rows)} new lines).")
+
+    def _monitor_interval_ms(self):
+        try:
+            interval = float(self.monitor_interval_var.get())
+        except (tk.TclError, ValueError):
+            interval = 1.0
+        return int(1000 * min(MONITOR_MAX_INTERVAL, max(MONITOR_MIN_INTERVAL, interval)))
+
+    def _poll_monitor(self):
+        """Read the lines appended since the last poll and schedule the next one."""
+        self._monitor_job = None
+        if self.loader is not None:
+            # The store is about to be replaced: its copy of the followed file
+            # sets where the tail continues (see _set_log_store)
+            self._monitor_job = self.root.after(self._monitor_interval_ms(), self._poll_monitor)
+            return
+        tail = self.log_tail
+        try:
+            data = tail.poll()
+        except OSError as e:
+            self.monitor_status_var.set(f"Cannot read {tail.path}: {e}")
+        else:
+            if data:
+                self._append_live_data(data)
+            rotated = f", {tail.rotations} rotations" if tail.rotations else ""
+            self.monitor_status_var.set(f"Monitoring {tail.path} ({len(self.monitor_rows)} new lines{rotated})")
+        self._monitor_job = self.root.after(self._monitor_interval_ms(), self._poll_monitor)
+
+    def _append_live_data(self, data):
+        """Parse appended lines into the loaded store and extend every view incrementally."""
+        if self.log_store is None:
+            self._set_log_store(log_store.LogStore([], log_store.StringTable(), log_store.StringTable()))
+        store = self.log_store
+        if self.live_file is None:
+            copy_index = self._loaded_copy(self.log_tail.path)
+            self.live_file = log_store.LiveLogFile(self.log_tail.path)
+            self._live_file_index = store.add_file(self.live_file)
+            if copy_index is not None:
+                # Lines continuing the last loaded entry are attached to it
+                store.move_last_entry(copy_index, self._live_file_index)
+
+        first_row = len(store)
+        continued_end, entries = self.live_file.append(data, store.level_table, store.source_table)
+        changed_row = None
+        if continued_end is not None:
+            # A stack trace or other continuation of the last live entry
+            changed_row = store.extend_last_entry(self._live_file_index, continued_end)
+        order = store.append_entries(self._live_file_index, entries)
+        if order is None:
+            # Only the new rows are filtered; the displayed result grows in place
+            self.log_filter.extend(first_row, changed_row)
+            self.monitor_rows.extend(range(first_row, len(store)))
+        else:
+            self._renumber_rows(order, first_row)
+        follow = self.log_view.at_end
+        self.log_view.set_rows(len(self.display_rows), self._render_row, keep_position=True)
+        if follow:
+            self.log_view.scroll_to(len(self.display_rows))
+
+        self.monitor_view.set_rows(len(self.monitor_rows), self._render_monitor_row, keep_position=True)
+        self.monitor_view.scroll_to(len(self.monitor_rows))
+
+    def _renumber_rows(self, order, first_row):
+        """Follow a merge of live rows older than loaded ones, which renumbered the rows.
+
+        `order` lists the former row of every row (see append_entries);
+        rows from `first_row` on were just appended.
+        """
+        new_row = [0] * len(order)
+        for row, former in enumerate(order):
+            new_row[former] = row
+        self.monitor_rows = [new_row[row] for row in self.monitor_rows]
+        self.toggled_records = {new_row[row] for row in self.toggled_records}
+        self.monitor_rows.extend(new_row[row] for row in range(first_row, len(order)))
+        self.monitor_rows.sort()
+        if self.exporter is not None:
+            # The export reads rows by their former numbers
+            self.exporter.cancel()
+        # The search index describes the former rows, so it is dropped
+        self.log_filter = log_filter.LogFilter(self.log_store)
+        self.highlighter.clear()
+        self.update_timeline()
+        self.apply_filter()
+
+    def _render_monitor_row(self, index):
+        """New lines are shown highlighted."""
+        return [(self.log_store.format_row(self.monitor_rows[index]), "new")]
 
     def apply_filter(self):
         """Filter and highlight log lines based on the search term and selected levels."""
-        filter_term = self.filter_var.get()
-
-        # Start with all lines
-        working_lines = self.all_log_lines
-
-        # --- Level Filtering ---
-        if hasattr(self, 'level_filter_vars') and self.level_filter_vars:
-            selected_levels = [level for level, var in self.level_filter_vars.items() if var.get()]
-            
-            if selected_levels:
-                level_pattern = r'\b(' + '|'.join(re.escape(level) for level in selected_levels) + r')\b'
-                level_regex = re.compile(level_pattern, re.IGNORECASE)
-                
-                level_filtered_lines = []
-                for line in working_lines:
-                    parts = line.split(" - ")
-                    if len(parts) >= 2:
-                        line_level = parts[1].strip()
-                        if level_regex.search(line_level):
-                            level_filtered_lines.append(line)
-                working_lines = level_filtered_lines
-            else:
-                # No levels selected, show nothing.
-                working_lines = []
-
-        # --- Source 'Engine' Filtering ---
-        if self.source_engine_only_var.get():
-            engine_filtered_lines = []
-            for line in working_lines:
-                parts = line.split(" - ")
-                if len(parts) >= 3:
-                    source = parts[2].strip()
-                    if source == "Engine":
-                        engine_filtered_lines.append(line)
-            working_lines = engine_filtered_lines
-
-        # --- Text Filtering ---
-        if filter_term:
-            case_sensitive = self.case_sensitive_var.get()
-
-            if case_sensitive:
-                text_filtered_lines = [line for line in working_lines if filter_term in line]
-            else:
-                text_filtered_lines = [line for line in working_lines if filter_term.lower() in line.lower()]
-            working_lines = text_filtered_lines
-        
-        self.display_logs(working_lines, highlight_term=filter_term, is_regex=False)
+        if self._pending_filter is not None:
+            self.root.after_cancel(self._pending_filter)
+            self._pending_filter = None
+
+        with self.tracer.operation("Filter") as operation:
+            filter_term = self.filter_var.get()
+            selected_levels = tuple(level for level, var in self.level_filter_vars.items() if var.get())
+            start, end = self._time_range()
+            station = self.station_var.get()
+            spec = log_filter.FilterSpec(
+                levels=selected_levels,
+                engine_only=self.source_engine_only_var.get(),
+                case_sensitive=self.case_sensitive_var.get(),
+                start=start,
+                end=end,
+                stations=None if station == ALL_STATIONS else (station,),
+            )
+            # The search box takes plain text or a query such as: level:ERROR source:X "FETCh" -"RRC?"
+            reference = self.log_store.timestamps[0] if self.log_store is not None and len(self.log_store) else None
+            all_stations = self.log_store.station_table.names[1:] if self.log_store is not None else ()
+            try:
+                spec = log_query.apply_query(filter_term, spec, reference, all_stations=all_stations)
+            except ValueError as e:
+                # Usually a query still being typed; keep the current result
+                self.status_var.set(f"Query: {e}")
+                return
+
+            # Results are cached per filter state; extending a term narrows the previous result
+            working_rows = self.log_filter.rows(spec) if self.log_filter else []
+            self.display_spec = spec
+
+            terms = log_query.highlight_terms(spec)
+            pattern = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+            self.display_logs(working_rows, highlight_term=pattern, is_regex=True)
+        self._show_timing(operation)
+
+    def toggle_profiling(self):
+        """Arm or disarm cProfile for the next load, index or filter operation."""
+        if self.profile_next_var.get():
+            self.tracer.profile_next()
+            self.status_var.set(f"The next operation is profiled into {perf_trace.default_profile_dir()}")
+        else:
+            self.tracer.cancel_profile()
+            self._show_timing(None)
+
+    def _show_timing(self, operation):
+        """Show the stage timings of `operation` next to the latest ones of the other operations."""
+        profile_path = None
+        if operation is not None:
+            self._timings[operation.name] = operation.summary()
+            profile_path = operation.profile_path
+        text = " | ".join(self._timings.values())
+        if profile_path is not None:
+            self.profile_next_var.set(False)
+            text = f"Profile saved to {profile_path} | {text}"
+        elif self.tracer.profile_pending:
+            return
+        self.status_var.set(text)
 
     def open_log_browser(self):
         """Open a dialog to select a directory and then show a log selection window."""
+        dir_path = self._ask_log_directory("Select Directory Containing Logs")
+        if dir_path:
+            self._create_log_selection_window([dir_path])
+
+    def _ask_log_directory(self, title):
+        """Ask for a directory holding application.log* files; None if cancelled or without logs."""
         default_log_dir = r"C:\ProgramData\MVG\Wave Studio"
         initial_dir = default_log_dir if os.path.isdir(default_log_dir) else (self.log_dir if os.path.isdir(self.log_dir) else os.getcwd())
         
         dir_path = filedialog.askdirectory(
             initialdir=initial_dir,
-            title="Select Directory Containing Logs"
+            title=title
         )
         
         if not dir_path:
-            return
+            return None
 
-        log_files = [f for f in os.listdir(dir_path) if os.path.isfile(os.path.join(dir_path, f)) and re.match(r"^application\.log(\.\d+)?$", f)]
-        log_files.sort(key=lambda f: int(f.split('.')[-1]) if f.split('.')[-1].isdigit() else -1) # Sort numerically
-
-        if not log_files:
+        if not log_store.find_log_files(dir_path):
             messagebox.showinfo("No Logs Found", f"No 'application.log' or 'application.log.X' files found in '{dir_path}'.")
-            return
+            return None
+        return dir_path
 
-        self._create_log_selection_window(dir_path, log_files)
+    def _create_log_selection_window(self, dir_paths):
+        """Creates a Toplevel window for selecting which log files of `dir_paths` to load.
 
-    def _create_log_selection_window(self, dir_path, log_files):
-        """Creates a Toplevel window for selecting which log files to load."""
+        Every directory is one station; "Add Station..." adds the logs of
+        another bench PC, and the files of all stations are merged by time.
+        """
         if self.log_selection_window and self.log_selection_window.winfo_exists():
             self.log_selection_window.destroy()
 
         self.log_selection_window = tk.Toplevel(self.root)
         self.log_selection_window.title("Select Logs to Load")
-        self.log_selection_window.geometry("400x500")
+        self.log_selection_window.geometry("450x550")
+        self.build_index_var = tk.BooleanVar(value=False)
+        self.use_cache_var = tk.BooleanVar(value=True)
+        self.selection_dirs = []
+        self.log_file_vars = {}
 
         frm = ttk.Frame(self.log_selection_window, padding=10)
         frm.pack(fill="both", expand=True)
 
-        ttk.Label(frm, text=f"Found logs in: {dir_path}", wraplength=380).pack(fill="x", pady=(0, 10))
+        # --- File list with checkboxes, one group per station directory ---
+        self.log_list_frame = ttk.Frame(frm)
+        self.log_list_frame.pack(fill="both", expand=True, pady=5)
+        for dir_path in dir_paths:
+            self._add_selection_dir(dir_path)
 
-        # --- File list with checkboxes ---
-        list_frame = ttk.Frame(frm)
-        list_frame.pack(fill="both", expand=True, pady=5)
-        
-        self.log_file_vars = {}
-        for i, log_file in enumerate(log_files):
-            # Default to selecting only the first log file (application.log)
-            is_selected = (i == 0)
-            var = tk.BooleanVar(value=is_selected)
-            cb = ttk.Checkbutton(list_frame, text=log_file, variable=var)
-            cb.pack(anchor="w")
-            self.log_file_vars[log_file] = var
+        ttk.Button(frm, text="Add Station...", command=self.add_station_directory).pack(anchor="w", pady=(10, 0))
+
+        # Token index: much faster searches on large logs, at extra memory and load time
+        ttk.Checkbutton(frm, text="Build search index (faster search, more memory)",
+                        variable=self.build_index_var).pack(anchor="w", pady=(10, 0))
+        # Parsed columns of unchanged (rotated) files are reused from the on-disk cache
+        ttk.Checkbutton(frm, text="Use index cache (faster reopening)",
+                        variable=self.use_cache_var).pack(anchor="w")
 
         # --- Control buttons ---
         btn_frame = ttk.Frame(frm)
         btn_frame.pack(fill="x", pady=(10, 0))
 
-        load_btn = ttk.Button(btn_frame, text="Load Selected Logs", 
-                              command=lambda: self.load_selected_logs(dir_path))
+        load_btn = ttk.Button(btn_frame, text="Load Selected Logs", command=self.load_selected_logs)
         load_btn.pack(side="right")
 
         cancel_btn = ttk.Button(btn_frame, text="Cancel", command=self.log_selection_window.destroy)
         cancel_btn.pack(side="right", padx=(0, 10))
 
-    def load_selected_logs(self, dir_path):
-        """Concatenates and loads the logs selected in the browser window."""
-        selected_files = [os.path.join(dir_path, f) for f, var in self.log_file_vars.items() if var.get()]
+    def _add_selection_dir(self, dir_path):
+        """List the log files of `dir_path` in the selection window."""
+        if dir_path in self.selection_dirs:
+            return
+        self.selection_dirs.append(dir_path)
+        group = ttk.LabelFrame(self.log_list_frame, text=f"Found logs in: {dir_path}", padding=5)
+        group.pack(fill="x", pady=(0, 5))
+        for i, log_file in enumerate(log_store.find_log_files(dir_path)):
+            # Default to selecting only the first log file (application.log)
+            is_selected = (i == 0)
+            var = tk.BooleanVar(value=is_selected)
+            cb = ttk.Checkbutton(group, text=log_file, variable=var)
+            cb.pack(anchor="w")
+            self.log_file_vars[(dir_path, log_file)] = var
+
+    def add_station_directory(self):
+        """Add the logs of another station (bench PC) to the selection window."""
+        dir_path = self._ask_log_directory("Select Log Directory of Another Station")
+        if dir_path:
+            self._add_selection_dir(dir_path)
+            self.log_selection_window.lift()
 
-        if not selected_files:
+    def load_selected_logs(self):
+        """Starts loading the logs selected in the browser window in the background."""
+        selected = [(dir_path, f) for (dir_path, f), var in self.log_file_vars.items() if var.get()]
+
+        if not selected:
             messagebox.showwarning("No Selection", "Please select at least one log file to load.")
             return
 
-        try:
-            combined_content = self._concatenate_and_sort_logs(selected_files)
-            self.all_log_lines = combined_content.splitlines(True) # Keep newlines
-            
-            total_size = sum(os.path.getsize(f) for f in selected_files)
-            file_count = len(selected_files)
-            self.file_label_var.set(f"Loaded {file_count} files ({total_size/1024:.1f} KB, {len(self.all_log_lines)} lines)")
-            
-            self.apply_filter()
-            
-            if self.log_selection_window:
-                self.log_selection_window.destroy()
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load or process logs: {e}")
-            self.all_log_lines = []
+        if self.log_selection_window:
+            self.log_selection_window.destroy()
 
-    def on_filter_change(self, *args):
-        """Callback function that triggers filtering when the user types."""
+        selected_files = [os.path.join(dir_path, f) for dir_path, f in selected]
+        stations = None
+        dir_paths = [dir_path for dir_path in self.selection_dirs if any(d == dir_path for d, _ in selected)]
+        if len(dir_paths) > 1:
+            # Several stations: every row is tagged with the station it came from
+            names = dict(zip(dir_paths, log_store.station_names(dir_paths)))
+            stations = [names[dir_path] for dir_path, _ in selected]
+        self._start_loading(selected_files, build_index=self.build_index_var.get(),
+                            use_cache=self.use_cache_var.get(), stations=stations)
+
+    def _start_loading(self, file_paths, build_index=False, use_cache=True, stations=None):
+        """Read, parse and merge `file_paths` (of `stations`, if given) on a worker thread, keeping the UI responsive."""
+        if self.loader is not None:
+            # The previous worker keeps being polled so its stores get closed.
+            self.loader.cancel()
+
+        self._set_log_store(None)
+        cache = index_cache.IndexCache() if use_cache else None
+        self.loader = log_loader.LogLoader(file_paths, build_index=build_index, cache=cache, tracer=self.tracer,
+                                           stations=stations)
+        self.loader.start()
+
+        self.file_label_var.set(f"Loading {len(file_paths)} files...")
+        self.load_progress["value"] = 0
+        self.cancel_load_button.pack(side="right", padx=(10, 0))
+        self.load_progress.pack(side="right", padx=(10, 0))
+        self.root.after(LOADER_POLL_MS, self._poll_loader, self.loader)
+
+    def cancel_loading(self):
+        """Abort the running background load."""
+        if self.loader is not None:
+            self.loader.cancel()
+            self.file_label_var.set("Cancelling...")
+
+    def _poll_loader(self, loader):
+        """Drain the loader's events on the Tk main thread."""
+        is_current = loader is self.loader
+        finished = False
+
+        for kind, payload in loader.poll():
+            if loader.is_finished_by(kind):
+                finished = True
+
+            if not is_current:
+                # Superseded load: only release what it produced
+                if kind in ("partial", "done"):
+                    payload.close()
+            elif kind == "progress":
+                bytes_read, total_bytes, lines = payload
+                if total_bytes:
+                    self.load_progress["value"] = 100.0 * bytes_read / total_bytes
+                if not loader.cancelled:
+                    self.file_label_var.set(
+                        f"Loading... {bytes_read/1024:.1f} / {total_bytes/1024:.1f} KB, {lines} lines indexed"
+                    )
+            elif kind == "partial":
+                # Show the first entries while the rest is still being read
+                self._set_log_store(payload)
+            elif kind == "done":
+                self._set_log_store(payload)
+                file_count = len(loader.file_paths)
+                self._loaded_label = f"Loaded {file_count} files ({payload.total_size/1024:.1f} KB, {len(payload)} lines)"
+                if payload.has_stations:
+                    self._loaded_label += f" from {len(payload.station_table) - 1} stations"
+                self.file_label_var.set(self._loaded_label)
+                self._show_timing(loader.operation)
+                self.load_progress["value"] = 0
+            elif kind == "indexing":
+                rows_indexed, total_rows = payload
+                self.load_progress["value"] = 100.0 * rows_indexed / max(1, total_rows)
+                if not loader.cancelled:
+                    self.file_label_var.set(f"{self._loaded_label} - indexing {rows_indexed}/{total_rows}")
+            elif kind == "index":
+                if loader.index_operation is not None:
+                    self._show_timing(loader.index_operation)
+                # Rows renumbered by a live merge no longer match the index
+                if payload is not None and self.log_filter is not None and payload.covers(self.log_store):
+                    self.log_filter.index = payload
+                    self.file_label_var.set(f"{self._loaded_label}, search index ready")
+                else:
+                    self.file_label_var.set(self._loaded_label)
+            elif kind == "cancelled":
+                self._set_log_store(None)
+                self.file_label_var.set("Load cancelled.")
+            elif kind == "error":
+                self._set_log_store(None)
+                self.file_label_var.set("No file loaded.")
+                messagebox.showerror("Error", f"Failed to load or process logs: {payload}")
+
+        if not finished:
+            self.root.after(LOADER_POLL_MS, self._poll_loader, loader)
+        elif is_current:
+            self.loader = None
+            self.load_progress.pack_forget()
+            self.cancel_load_button.pack_forget()
+
+    def export_results(self):
+        """Write the rows currently shown to a file on a worker thread."""
+        if self.log_store is None or not self.display_rows:
+            messagebox.showinfo("Nothing to Export", "No log lines match the current filters.")
+            return
+        if self.exporter is not None:
+            messagebox.showinfo("Export Running", "Wait for the running export to finish or cancel it.")
+            return
+        path = filedialog.asksaveasfilename(
+            title="Export Filtered Logs", defaultextension=".log",
+            filetypes=[("Raw log lines", "*.log"), ("Aligned columns", "*.txt"),
+                       ("CSV", "*.csv"), ("JSON lines", "*.jsonl")],
+        )
+        if not path:
+            return
+
+        self.exporter = log_export.LogExporter(self.log_store, self.display_rows, path)
+        self.exporter.start()
+        self.cancel_export_button.pack(side="right", padx=(10, 0))
+        self.root.after(LOADER_POLL_MS, self._poll_exporter, self.exporter)
+
+    def cancel_export(self):
+        """Abort the running export; the partial file is removed."""
+        if self.exporter is not None:
+            self.exporter.cancel()
+
+    def _poll_exporter(self, exporter):
+        """Show the export progress and outcome on the Tk main thread."""
+        finished = False
+        for kind, payload in exporter.poll():
+            if kind == "progress":
+                done, total = payload
+                self.file_label_var.set(f"Exporting {done}/{total} lines to {os.path.basename(exporter.path)}...")
+            elif kind == "done":
+                finished = True
+                self.file_label_var.set(f"Exported {payload} lines ({exporter.export_format}) to {exporter.path}")
+            elif kind == "cancelled":
+                finished = True
+                self.file_label_var.set("Export cancelled.")
+            elif kind == "error":
+                finished = True
+                self.file_label_var.set(self._loaded_label or "No file loaded.")
+                messagebox.showerror("Error", f"Failed to export logs: {payload}")
+
+        if not finished:
+            self.root.after(LOADER_POLL_MS, self._poll_exporter, exporter)
+        else:
+            self.exporter = None
+            self.cancel_export_button.pack_forget()
+
+    def _set_log_store(self, store):
+        """Replace the displayed store, closing the previous one, and re-apply filters."""
+        if self.exporter is not None and self.exporter.store is not store:
+            # The export reads from the store about to be closed
+            self.exporter.cancel()
+        if self.log_store is not None and self.log_store is not store:
+            self.log_store.close()
+        self.log_store = store
+        self.log_filter = log_filter.LogFilter(store) if store is not None else None
+        self.highlighter.clear()
+        self.toggled_records = set()
+        # Live lines are appended to the new store from now on
+        self.live_file = None
+        self._live_file_index = None
+        self.monitor_rows = []
+        self.monitor_view.set_rows(0, self._render_monitor_row)
+        if self.log_tail is not None:
+            self._resync_tail()
+        stations = store.station_table.names[1:] if store is not None and store.has_stations else []
+        self.station_combo.configure(values=[ALL_STATIONS] + stations)
+        if self.station_var.get() not in stations:
+            self.station_var.set(ALL_STATIONS)
+        self.update_timeline()
         self.apply_filter()
 
-    def clear_filter(self):
-        """Clear the filter entry and re-apply filters."""
-        self.filter_var.set("")
+    def _parse_time(self, text):
+        """Timestamp (ms) of a user-entered time; times of day are on the date of the first entry."""
+        reference = self.log_store.timestamps[0] if self.log_store is not None and len(self.log_store) else None
+        return log_store.parse_time(text, reference)
+
+    def _time_range(self):
+        """The From/To range as (start, end) timestamps, None where empty or invalid."""
+        bounds = []
+        errors = []
+        for var in (self.time_from_var, self.time_to_var):
+            text = var.get().strip()
+            value = None
+            if text:
+                try:
+                    value = self._parse_time(text)
+                except ValueError as e:
+                    errors.append(str(e))
+            bounds.append(value)
+        self._show_time_range(errors[0] if errors else None)
+        return tuple(bounds)
+
+    def _show_time_range(self, error=None):
+        if error:
+            self.time_range_var.set(error)
+        elif self.log_store is not None and len(self.log_store):
+            first = log_store.format_timestamp(self.log_store.timestamps[0])
+            last = log_store.format_timestamp(self.log_store.timestamps[-1])
+            self.time_range_var.set(f"Logs span {first} - {last}")
+        else:
+            self.time_range_var.set("")
+
+    def clear_time_range(self):
+        """Show entries of every time again."""
+        self.time_from_var.set("")
+        self.time_to_var.set("")
         self.apply_filter()
 
-    def _concatenate_and_sort_logs(self, file_paths):
-        """
-        Reads multiple log files, concatenates their content, and sorts it chronologically.
-        """
-        all_lines = []
-        timestamp_pattern = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}")
+    def jump_to_time(self):
+        """Scroll to the first displayed entry at or after the entered time."""
+        if self.log_store is None or not self.display_rows:
+            return
+        try:
+            timestamp = self._parse_time(self.jump_time_var.get())
+        except ValueError as e:
+            messagebox.showerror("Invalid Time", str(e))
+            return
+        # Rows are in timestamp order and displayed rows are sorted row ids: two binary searches
+        row = bisect_left(self.log_store.timestamps, timestamp)
+        self.log_view.scroll_to(bisect_left(self.display_rows, row))
+
+    def update_timeline(self):
+        """Recount the loaded entries per time bucket and redraw the timeline."""
+        if self.log_store is None or not len(self.log_store):
+            self.timeline = None
+            self._timeline_series = []
+            self.timeline_info_var.set("")
+            self.draw_timeline()
+            return
 
-        for path in file_paths:
-            try:
-                with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        # Only include lines that appear to be valid log entries
-                        if timestamp_pattern.match(line):
-                            all_lines.append(line)
-            except IOError as e:
-                messagebox.showerror("File Error", f"Error reading file {path}: {e}")
-                return ""
+        group_by = self.timeline_group_var.get()
+        self.timeline = timeline = log_timeline.build_timeline(self.log_store, group_by)
+        totals = timeline.totals()
+        # The most frequent codes get their own colour, the rest is stacked as "Other"
+        ranked = [code for code in sorted(range(len(totals)), key=lambda c: -totals[c]) if totals[code]]
+        series = []
+        for i, code in enumerate(ranked[:TIMELINE_SERIES]):
+            name = timeline.names[code] or "(none)"
+            if group_by == "Level":
+                color = LEVEL_COLORS.get(name.upper(), SERIES_COLORS[i % len(SERIES_COLORS)])
+            else:
+                color = SERIES_COLORS[i % len(SERIES_COLORS)]
+            series.append(([code], color, name))
+        if len(ranked) > TIMELINE_SERIES:
+            series.append((ranked[TIMELINE_SERIES:], OTHER_SERIES_COLOR, "Other"))
+        self._timeline_series = series
+        self.timeline_info_var.set(f"{len(timeline)} buckets of {log_timeline.format_duration(timeline.bucket_ms)}"
+                                    " - click a bar to show its time range")
+        self.draw_timeline()
+
+    def draw_timeline(self):
+        """Draw the timeline as stacked bars, one per bucket."""
+        canvas = self.timeline_canvas
+        canvas.delete("all")
+        timeline = self.timeline
+        if timeline is None or not len(timeline):
+            return
 
-        # The timestamp format (YYYY-MM-DD HH:MM:SS,ms) is naturally sortable as a string.
-        all_lines.sort()
+        width = max(1, canvas.winfo_width())
+        plot_height = TIMELINE_HEIGHT - TIMELINE_LEGEND_HEIGHT
+        peak = timeline.max_bucket_total() or 1
+        bar_width = width / len(timeline)
+        for bucket, counts in enumerate(timeline.counts):
+            x0 = bucket * bar_width
+            x1 = max(x0 + 1, (bucket + 1) * bar_width - 1)
+            y = TIMELINE_HEIGHT
+            for codes, color, _ in self._timeline_series:
+                count = sum(counts[code] for code in codes)
+                if count:
+                    bar = max(1, count * plot_height / peak)
+                    canvas.create_rectangle(x0, y - bar, x1, y, fill=color, width=0)
+                    y -= bar
+
+        # Legend
+        x = 4
+        for _, color, label in self._timeline_series:
+            canvas.create_rectangle(x, 3, x + 9, 12, fill=color, width=0)
+            text = canvas.create_text(x + 12, 7, text=label, anchor="w", font=("Segoe UI", 8))
+            x = canvas.bbox(text)[2] + 10
+
+    def _timeline_bucket(self, event):
+        if self.timeline is None or not len(self.timeline):
+            return None
+        width = max(1, self.timeline_canvas.winfo_width())
+        return min(len(self.timeline) - 1, max(0, int(event.x * len(self.timeline) / width)))
+
+    def on_timeline_motion(self, event):
+        """Show the time range and counts of the bucket under the mouse."""
+        bucket = self._timeline_bucket(event)
+        if bucket is None:
+            return
+        start, end = self.timeline.bucket_range(bucket)
+        counts = self.timeline.counts[bucket]
+        parts = [f"{label} {sum(counts[code] for code in codes)}" for codes, _, label in self._timeline_series]
+        self.timeline_info_var.set(
+            f"{log_store.format_timestamp(start)} - {log_store.format_timestamp(end)[11:]}: {', '.join(parts)}")
+
+    def on_timeline_click(self, event):
+        """Restrict the viewer to the time range of the clicked bucket."""
+        bucket = self._timeline_bucket(event)
+        if bucket is None:
+            return
+        start, end = self.timeline.bucket_range(bucket)
+        self.time_from_var.set(log_store.format_timestamp(start))
+        self.time_to_var.set(log_store.format_timestamp(end))
+        self.apply_filter()
 
-        return "".join(all_lines)
+    def on_filter_change(self, *args):
+        """Callback function that triggers filtering once the user pauses typing."""
+        if self._pending_filter is not None:
+            self.root.after_cancel(self._pending_filter)
+        self._pending_filter = self.root.after(SEARCH_DEBOUNCE_MS, self.apply_filter)
 
-    def display_logs(self, lines_to_display, highlight_term=None, is_regex=False):
+    def clear_filter(self):
+        """Clear the filter entry and re-apply filters."""
+        self.filter_var.set("")
+        self.apply_filter()
+
+    def display_logs(self, rows_to_display, highlight_term=None, is_regex=False):
         """
-        Updates the text widget with the given lines and optionally highlights a term.
-        For very large results, skip highlighting to prevent hang.
+        Shows the given store rows in the virtual view and optionally highlights a term.
+        Rows are formatted and highlighted only when they scroll into the viewport.
         Formats columns clearly with alignment, or shows command-only if enabled.
         """
-        self.log_text.config(state="normal")
-        self.log_text.delete("1.0", tk.END)
-        # Clear all tags before re-populating
-        for tag in self.log_text.tag_names():
-            self.log_text.tag_remove(tag, "1.0", tk.END)
+        self.display_rows = rows_to_display
 
         # Determine formatting and prepare search term regex if needed
         if self.command_only_var.get():
-            line_formatter = self._extract_command
-            # Insert header for command-only view
-            self.log_text.insert(tk.END, "Command / Message\n", ("header",))
-            self.log_text.insert(tk.END, ("-" * 120) + "\n", ("header",))
+            self._line_formatter = self._extract_command
+            # Header for command-only view
+            self.log_view.set_header(["Command / Message", "-" * 120])
         else:
-            line_formatter = self._format_log_line
-            # Insert header for full log view
-            header = f"{'DateTime':<24} {'Level':<10} {'Source':<25} {'Message'}\n"
-            self.log_text.insert(tk.END, header, ("header",))
-            self.log_text.insert(tk.END, ("-" * 120) + "\n", ("header",))
+            self._line_formatter = self._format_log_line
+            # Header for full log view
+            if self.log_store is not None:
+                header = self.log_store.format_header()
+            else:
+                header = f"{'DateTime':<24} {'Level':<10} {'Source':<25} {'Message'}"
+            self.log_view.set_header([header, "-" * 120])
 
-        search_term_regex = None
+        self.highlighter.search = None
         if highlight_term:
             try:
                 # For plain text search, escape special characters
                 pattern = highlight_term if is_regex else re.escape(highlight_term)
-                search_term_regex = re.compile(pattern, re.IGNORECASE)
+                self.highlighter.search = re.compile(pattern, re.IGNORECASE)
             except re.error:
-                search_term_regex = None # Ignore invalid regex
-
-        # --- Highlighting Logic ---
-        # Process and insert line by line, applying tags during insertion
-        for line in lines_to_display:
-            formatted_line = line_formatter(line)
-            
-            # Collect all matches for this line (syntax and search term)
-            matches = defaultdict(list)
-            
-            # Syntax highlighting matches
-            if not self.command_only_var.get():
-                for tag, pattern in HIGHLIGHT_PATTERNS.items():
-                    for match in pattern.finditer(formatted_line):
-                        matches[tag].append(match.span())
-
-            # User search term matches
-            if search_term_regex:
-                for match in search_term_regex.finditer(formatted_line):
-                    matches["highlight"].append(match.span())
-
-            # If no matches, insert the whole line at once (fast path)
-            if not matches:
-                self.log_text.insert(tk.END, formatted_line + '\n')
-                continue
-
-            # If there are matches, insert the line in tagged segments
-            last_end = 0
-            all_spans = sorted([(start, end, tag) for tag, spans in matches.items() for start, end in spans])
-
-            for start, end, tag in all_spans:
-                if start >= last_end:
-                    # Insert text before the current match
-                    if start > last_end:
-                        self.log_text.insert(tk.END, formatted_line[last_end:start])
-                    # Insert the matched text with its tag
-                    self.log_text.insert(tk.END, formatted_line[start:end], (tag,))
-                    last_end = end
-            
-            # Insert any remaining text after the last match
-            if last_end < len(formatted_line):
-                self.log_text.insert(tk.END, formatted_line[last_end:])
-            
-            self.log_text.insert(tk.END, '\n')
-
-        self.log_text.config(state="disabled")
-
-    def _extract_command(self, line):
-        """Extract only the command/message part from a log line.
+                pass # Ignore invalid regex
+
+        self.log_view.set_rows(len(rows_to_display), self._render_row)
+
+    def _render_row(self, index):
+        """Format and highlight one displayed row as (text, tag) segments for the view."""
+        row = self.display_rows[index]
+        return self._highlight_line(self._line_formatter(row), row) + self._continuation_segments(row)
+
+    def _highlight_line(self, formatted_line, row=None):
+        """Split a formatted line into (text, tag) segments for syntax and search term highlighting."""
+        # Syntax highlighting is for the full column layout, cached per row
+        syntax = not self.command_only_var.get()
+        return self.highlighter.segments(formatted_line, key=row, syntax=syntax)
+
+    def _continuation_segments(self, row):
+        """Segments for the continuation lines of `row`: the lines themselves, or a collapsed marker."""
+        lines = self.log_store.continuation(row)
+        if not lines:
+            return []
+        if self.expand_records_var.get() == (row in self.toggled_records):
+            return [(f"  [+{len(lines)} lines]", "collapsed")]
+        # The filter matched the whole entry, so the term may be in these lines
+        return self.highlighter.segments("\n" + "\n".join(lines), syntax=False, tag="continuation")
+
+    def toggle_record(self, index):
+        """Expand or collapse the multi-line entry shown at displayed row `index`."""
+        row = self.display_rows[index]
+        if not self.log_store.continuation(row):
+            return
+        self.toggled_records ^= {row}
+        self.log_view.refresh()
+
+    def toggle_all_records(self):
+        """Expand or collapse every multi-line entry, as set by "Expand Multi-line"."""
+        self.toggled_records = set()
+        self.log_view.refresh()
+
+    def _extract_command(self, row):
+        """Extract only the command/message part from a parsed log row.
         
         Log format: DATE TIME - LEVEL - SOURCE - COMMAND
         Example: 2025-11-26 11:28:31,281 - DEBUG - Ieee488Connection - TCPIP0::10.1.53.153::hislip0::INSTR <-- FETCh:DUT:MODem:STATe:RRC?
         We want: FETCh:DUT:MODem:STATe:RRC?
         """
-        # Split by " - " to separate columns
-        parts = line.split(" - ")
-        
-        if len(parts) >= 4:
-            # Format: DATE TIME | LEVEL | SOURCE | COMMAND
-            # Get the 4th part and everything after (in case command contains " - ")
-            command = " - ".join(parts[3:]).rstrip()
-            return command
-        elif len(parts) >= 3:
-            # Fallback: DATE TIME | LEVEL | COMMAND
-            command = " - ".join(parts[2:]).rstrip()
-            return command
-        else:
-            # No dashes found, return the whole line
-            return line.rstrip()
+        return self.log_store.command(row)
 
-    def _format_log_line(self, line):
-        """Parse and format a log line with aligned columns.
+    def _format_log_line(self, row):
+        """Format a parsed log row with aligned columns.
         
         Log format: DATE TIME - LEVEL - SOURCE - MESSAGE
         Example: 2025-11-26 11:28:31,281 - DEBUG - Ieee488Connection - TCPIP0::...
         """
-        # Split by " - " to get the dash-separated parts
-        parts = line.split(" - ")
-        
-        if len(parts) >= 3:
-            # Extract: date+time, level, source, message
-            datetime_col = parts[0].strip() if len(parts) > 0 else ""
-            level_col = parts[1].strip() if len(parts) > 1 else ""
-            source_col = parts[2].strip() if len(parts) > 2 else ""
-            message = " - ".join(parts[3:]).strip() if len(parts) > 3 else ""
-            
-            # Format with fixed column widths for alignment
-            # Date (12) | Time (12) | Level (10) | Source (25) | Message
-            formatted = f"{datetime_col:<24} {level_col:<10} {source_col:<25} {message}"
-            return formatted
-        else:
-            # Fallback for malformed lines
-            return line.rstrip()
+        return self.log_store.format_row(row)
 
 
 def main():
@@ -0,0 +1,292 @@
+"""Benchmarks of the load, filter, display and export pipeline on synthetic logs.
+
+Each case generates (or reuses) logs of a given size with log_generator
+and times every stage the viewer goes through: parsing the files and
+merging them with LogStore.open (threaded decompression, parse worker
+processes), once more from the index cache, building the filter bitmaps and token index, each filter
+type, formatting and highlighting rows for display, the timeline,
+command timing and every export format. Every stage reports its throughput and the peak
+resident set size of the process so far.
+
+Cases run in a fresh worker process each, so the peak RSS of one case
+is not hidden by an earlier, larger one. Results can be written as JSON
+to compare releases.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from src import command_timing
+from src import index_cache
+from src import log_export
+from src import log_filter
+from src import log_generator
+from src import log_highlight
+from src import log_store
+from src import log_timeline
+from src import perf_trace
+from src import token_index
+
+SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*$", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+DEFAULT_SIZES = ("100M", "1G", "5G")
+# Rows formatted for the display stage; the viewer formats one page per scroll
+DISPLAY_ROWS = 100_000
+# Rows written by each export stage
+EXPORT_ROWS = 1_000_000
+
+# name -> FilterSpec fields; "time" stands for the middle half of the logs
+FILTERS = (
+    ("filter levels", dict(levels=("INFO", "ERROR"))),
+    ("filter engine", dict(engine_only=True)),
+    ("filter source", dict(source=command_timing.TRAFFIC_SOURCE)),
+    ("filter time", dict(time=True)),
+    ("filter term", dict(term="fetch")),
+    ("filter term refined", dict(term="fetch:dut:modem")),
+    ("filter term case", dict(term="FETCh", case_sensitive=True)),
+    ("filter combined", dict(term="RRC?", levels=("DEBUG",), source=command_timing.TRAFFIC_SOURCE, time=True)),
+)
+
+# size: bytes processed by the stage (0 if not meaningful); rows: rows processed;
+# matches: rows in the result of a filter, None for other stages.
+StageResult = namedtuple("StageResult", ["name", "seconds", "size", "rows", "matches", "peak_rss"])
+
+
+def parse_size(text):
+    """Parse "100M", "1G", "512K" or a byte count; raises ValueError."""
+    match = SIZE_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid size '{text}', expected e.g. 100M or 5G")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, or None where it cannot be read."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    return None
+
+
+class BenchmarkRun:
+    """Collects the StageResults of one case."""
+
+    def __init__(self):
+        self.results = []
+
+    @contextmanager
+    def stage(self, name, size=0):
+        """Time the body of a with block as stage `name`; set "rows" (and "matches") on the yielded dict."""
+        counts = {"rows": 0, "matches": None}
+        start = time.perf_counter()
+        yield counts
+        seconds = time.perf_counter() - start
+        self.results.append(StageResult(name, seconds, size, counts["rows"], counts["matches"], peak_rss()))
+
+
+def _open_store(run, paths, cache=None, suffix=""):
+    """Open `paths` with LogStore.open like the viewer; its parse and merge spans become the load and merge stages."""
+    tracer = perf_trace.Tracer()
+    with tracer.operation("Load") as operation:
+        store = log_store.LogStore.open(paths, cache=cache)
+    rss = peak_rss()
+    totals = operation.totals()
+    # Text bytes, decompressed for .gz/.zip, so MB/s compares with plain files
+    run.results.append(StageResult("load" + suffix, totals.get("parse", (0.0, 0))[0], store.total_size, len(store),
+                                   None, rss))
+    run.results.append(StageResult("merge" + suffix, totals.get("merge", (0.0, 0))[0], 0, len(store), None, rss))
+    return store
+
+
+def _filter_spec(store, fields):
+    fields = dict(fields)
+    if fields.pop("time", False) and len(store):
+        first, last = store.timestamps[0], store.timestamps[-1]
+        fields["start"] = first + (last - first) // 4
+        fields["end"] = last - (last - first) // 4
+    return log_filter.FilterSpec(**fields)
+
+
+def run_case(paths, display_rows=DISPLAY_ROWS, export_rows=EXPORT_ROWS, export_dir=None, cache=True):
+    """Run every stage over the log files `paths`; return the list of StageResults.
+
+    With `cache`, the first load fills a fresh index cache and the logs
+    are loaded again from it ("load cached", "merge cached").
+    """
+    run = BenchmarkRun()
+    with tempfile.TemporaryDirectory(dir=export_dir) as cache_dir:
+        # Cached columns are read into memory, so the directory can go once loaded
+        columns_cache = index_cache.IndexCache(cache_dir) if cache else None
+        store = _open_store(run, paths, columns_cache)
+        if columns_cache is not None:
+            store.close()
+            store = _open_store(run, paths, columns_cache, " cached")
+    text_bytes = store.total_size
+
+    try:
+        with run.stage("filter bitmaps") as counts:
+            filters = log_filter.LogFilter(store)
+            counts["rows"] = len(store)
+        for name, fields in FILTERS:
+            spec = _filter_spec(store, fields)
+            with run.stage(name, text_bytes if spec.term else 0) as counts:
+                counts["matches"] = len(filters.rows(spec))
+                counts["rows"] = len(store)
+
+        with run.stage("token index", text_bytes) as counts:
+            index = token_index.TokenIndex(store)
+            counts["rows"] = len(store)
+        indexed = log_filter.LogFilter(store, index)
+        with run.stage("filter term indexed", text_bytes) as counts:
+            counts["matches"] = len(indexed.rows(log_filter.FilterSpec(term="fetch")))
+            counts["rows"] = len(store)
+
+        shown = range(min(display_rows, len(store)))
+        highlighter = log_highlight.Highlighter()
+        highlighter.search = re.compile("fetch", re.IGNORECASE)
+        with run.stage("display") as counts:
+            for row in shown:
+                highlighter.segments(store.format_row(row), key=row)
+                highlighter.segments("\n".join(store.continuation(row)), syntax=False)
+            counts["rows"] = len(shown)
+
+        with run.stage("timeline") as counts:
+            log_timeline.build_timeline(store)
+            counts["rows"] = len(store)
+        with run.stage("command timing") as counts:
+            analyzer = command_timing.analyze_store(store)
+            counts["rows"] = analyzer.traffic_lines
+
+        rows = range(min(export_rows, len(store)))
+        with tempfile.TemporaryDirectory(dir=export_dir) as tmp:
+            for export_format in log_export.EXPORT_FORMATS:
+                path = os.path.join(tmp, "export." + export_format)
+                with run.stage(f"export {export_format}") as counts:
+                    counts["rows"] = log_export.export_rows(store, rows, path, export_format)
+                # Throughput of an export is counted in bytes written
+                run.results[-1] = run.results[-1]._replace(size=os.path.getsize(path))
+                os.remove(path)
+    finally:
+        store.close()
+    return run.results
+
+
+def _megabytes(size):
+    return f"{size / 1024 ** 2:.1f}"
+
+
+def format_report(case, results):
+    """The results of `case` as a list of text lines."""
+    lines = [f"Case {case}", f"{'Stage':<22} {'Seconds':>9} {'MB/s':>9} {'Rows':>11} {'Rows/s':>12} "
+                             f"{'Matches':>11} {'Peak RSS MB':>12}"]
+    lines.append("-" * 92)
+    for result in results:
+        rate = f"{result.size / 1024 ** 2 / result.seconds:.1f}" if result.size and result.seconds else "-"
+        row_rate = f"{result.rows / result.seconds:,.0f}" if result.rows and result.seconds else "-"
+        matches = f"{result.matches:,}" if result.matches is not None else "-"
+        rss = _megabytes(result.peak_rss) if result.peak_rss is not None else "-"
+        lines.append(f"{result.name:<22} {result.seconds:>9.3f} {rate:>9} {result.rows:>11,} {row_rate:>12} "
+                     f"{matches:>11} {rss:>12}")
+    return lines
+
+
+def case_name(size, rotations, compress):
+    return f"{size}-r{rotations}{'-gz' if compress else ''}"
+
+
+def prepare_case(data_dir, size, rotations, compress, options):
+    """Paths of the logs of one case, generated into `data_dir` unless already there."""
+    directory = os.path.join(data_dir, case_name(size, rotations, compress) + f"-s{options['seed']}")
+    marker = os.path.join(directory, "complete.json")
+    settings = dict(options, size=size, rotations=rotations, compress=compress)
+    try:
+        with open(marker, encoding='utf-8') as f:
+            if json.load(f) == settings:
+                return [os.path.join(directory, name) for name in log_store.find_log_files(directory)]
+    except (OSError, ValueError):
+        pass
+    paths = log_generator.generate_logs(directory, parse_size(size), rotations, compress, **options)
+    # Written last: an interrupted generation is redone next time
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(settings, f)
+    return paths
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the log analyzer on synthetic Wave Studio logs.")
+    parser.add_argument("sizes", nargs="*", default=list(DEFAULT_SIZES), metavar="SIZE",
+                        help="total log size of each case, e.g. 100M 1G 5G (default: %(default)s)")
+    parser.add_argument("-r", "--rotations", type=int, default=4, help="rotated files besides application.log")
+    parser.add_argument("--gzip", action="store_true", help="gzip the rotated files")
+    parser.add_argument("--levels", type=log_generator.parse_level_mix,
+                        default=log_generator.DEFAULT_LEVEL_MIX, metavar="LEVEL=WEIGHT,...",
+                        help="level mix of the non-traffic entries")
+    parser.add_argument("--traffic", type=float, default=0.3, help="share of entries that are instrument commands")
+    parser.add_argument("--traces", type=float, default=0.5, help="share of ERROR entries with a stack trace")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the generator")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "ws_logs_benchmark"),
+                        help="where generated logs are kept between runs (default: %(default)s)")
+    parser.add_argument("--display-rows", type=int, default=DISPLAY_ROWS, help="rows formatted by the display stage")
+    parser.add_argument("--export-rows", type=int, default=EXPORT_ROWS, help="rows written by each export stage")
+    parser.add_argument("--no-cache", action="store_true", help="skip the load from the index cache")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--in-process", action="store_true",
+                        help="run cases in this process (peak RSS then covers all cases so far)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        for size in args.sizes:
+            parse_size(size)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    options = dict(level_mix=args.levels, traffic_ratio=args.traffic, trace_ratio=args.traces, seed=args.seed)
+    report = {}
+    for size in args.sizes:
+        case = case_name(size, args.rotations, args.gzip)
+        print(f"Preparing {case} in {args.data_dir} ...", file=sys.stderr)
+        paths = prepare_case(args.data_dir, size, args.rotations, args.gzip, options)
+        if args.in_process:
+            results = run_case(paths, args.display_rows, args.export_rows, args.data_dir, not args.no_cache)
+        else:
+            with ProcessPoolExecutor(1) as pool:
+                results = pool.submit(run_case, paths, args.display_rows, args.export_rows, args.data_dir,
+                                      not args.no_cache).result()
+        print("\n".join(format_report(case, results)) + "\n")
+        report[case] = [result._asdict() for result in results]
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
@@ -0,0 +1,239 @@
+"""Headless log analysis: load, merge, filter and export logs without Tk.
+
+The same LogStore and LogFilter as the GUI are used, so a batch scan
+matches what the Log Viewer shows for the same filters. Each path given
+on the command line is a log file or a directory whose application.log*
+files are merged; several paths are scanned in parallel processes and
+their matches are written in the order the paths were given. With
+--merge the paths are instead stations whose logs are merged by
+timestamp into one result with a station column, and with --diff two
+paths are two runs whose instrument command streams are compared.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from src import command_diff
+from src import index_cache
+from src import log_export
+from src import log_filter
+from src import log_query
+from src import log_store
+
+
+def log_paths(path):
+    """The log files for `path`: the file itself, or the application.log* files of a directory."""
+    if os.path.isdir(path):
+        return [os.path.join(path, name) for name in log_store.find_log_files(path)]
+    return [path]
+
+
+def build_spec(store, levels=None, source=None, term="", case_sensitive=False, start=None, end=None, query=None,
+               stations=None):
+    """FilterSpec for `store`; times of day in `start`/`end` are taken on the date of its first entry.
+
+    `query` is a log_query query narrowing the other filters.
+    """
+    reference = store.timestamps[0] if len(store) else None
+    spec = log_filter.FilterSpec(
+        term=term or "",
+        levels=tuple(levels) if levels else None,
+        case_sensitive=case_sensitive,
+        source=source,
+        start=log_store.parse_time(start, reference) if start else None,
+        end=log_store.parse_time(end, reference) if end else None,
+        stations=tuple(stations) if stations else None,
+    )
+    if not query:
+        return spec
+    narrowed = log_query.apply_query(query, spec, reference, [name for name in store.level_table.names if name],
+                                     [name for name in store.station_table.names if name])
+    if spec.term:
+        # -t is one more required term
+        terms = sorted({spec.term, narrowed.term, *narrowed.extra_terms} - {""}, key=lambda t: (-len(t), t))
+        narrowed = narrowed._replace(term=terms[0], extra_terms=tuple(terms[1:]))
+    return narrowed
+
+
+def scan(path, out, output_format="raw", label=None, cache_dir=None, workers=None, **filters):
+    """Load the logs of `path`, filter them and write the matches to the binary stream `out`.
+
+    Matches are written in one of log_export.EXPORT_FORMATS, marked with
+    `label` if given. Parsed columns are cached in `cache_dir` unless it
+    is None; `workers` limits the parsing processes (see LogStore.open).
+    `filters` are the keyword arguments of build_spec(). Returns the
+    number of matching entries.
+    """
+    cache = index_cache.IndexCache(cache_dir) if cache_dir else None
+    store = log_store.LogStore.open(log_paths(path), cache=cache, workers=workers)
+    try:
+        spec = build_spec(store, **filters)
+        rows = log_filter.LogFilter(store).rows(spec)
+        return log_export.write_rows(store, rows, out, output_format, label)
+    finally:
+        store.close()
+
+
+def merge_scan(paths, out, output_format="raw", cache_dir=None, **filters):
+    """Merge the logs of all `paths` by timestamp and write the matches, with their header, to `out`.
+
+    Each path is one station, named by log_store.station_names(); rows
+    are written with a station column. Other arguments are as for
+    scan(). Returns the number of matching entries.
+    """
+    file_paths, stations = [], []
+    for path, station in zip(paths, log_store.station_names(paths)):
+        station_files = log_paths(path)
+        file_paths += station_files
+        stations += [station] * len(station_files)
+    cache = index_cache.IndexCache(cache_dir) if cache_dir else None
+    store = log_store.LogStore.open(file_paths, cache=cache, stations=stations)
+    try:
+        spec = build_spec(store, **filters)
+        rows = log_filter.LogFilter(store).rows(spec)
+        log_export.write_header(out, output_format, store=store)
+        return log_export.write_rows(store, rows, out, output_format)
+    finally:
+        store.close()
+
+
+def diff_runs(a_path, b_path, out, cache_dir=None, **filters):
+    """Compare the instrument commands of the runs logged in `a_path` and `b_path`.
+
+    The report of the command_diff.CommandDiff is written to the binary
+    stream `out`; the rows of both runs are selected by `filters` (see
+    build_spec()). Returns the CommandDiff.
+    """
+    cache = index_cache.IndexCache(cache_dir) if cache_dir else None
+    streams = []
+    for path in (a_path, b_path):
+        store = log_store.LogStore.open(log_paths(path), cache=cache)
+        try:
+            rows = log_filter.LogFilter(store).rows(build_spec(store, **filters))
+            streams.append(command_diff.command_stream(store, rows=rows))
+        finally:
+            store.close()
+    diff = command_diff.CommandDiff(*streams)
+    lines = [f"A: {a_path}", f"B: {b_path}", ""] + diff.report()
+    out.write(("\n".join(lines) + "\n").encode('utf-8'))
+    return diff
+
+
+def _scan_to_file(path, output_path, output_format, label, cache_dir, filters):
+    # Runs in a worker process; matches go to a temporary file so that
+    # only the match count is sent back to the parent. The paths already
+    # keep the processes busy, so each is parsed in its worker.
+    with open(output_path, 'wb') as out:
+        return scan(path, out, output_format, label, cache_dir, workers=1, **filters)
+
+
+def scan_all(paths, out, output_format="raw", jobs=None, cache_dir=None, **filters):
+    """Scan every path in `paths`, in parallel if `jobs` allows, writing matches in path order.
+
+    The format's header is written first; with several paths every match
+    is labelled with its path. Returns a list of (path, count, error)
+    tuples; `error` is None or the exception that stopped the scan of that path.
+    """
+    label = (lambda path: path) if len(paths) > 1 else (lambda path: None)
+    log_export.write_header(out, output_format, label=len(paths) > 1)
+    jobs = min(len(paths), jobs or os.cpu_count() or 1)
+    results = []
+    if jobs <= 1:
+        for path in paths:
+            try:
+                results.append((path, scan(path, out, output_format, label(path), cache_dir, **filters), None))
+            except (OSError, ValueError) as e:
+                results.append((path, 0, e))
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(jobs) as pool:
+        futures = []
+        for i, path in enumerate(paths):
+            output_path = os.path.join(tmp, f"{i}.out")
+            futures.append((path, output_path, pool.submit(
+                _scan_to_file, path, output_path, output_format, label(path), cache_dir, filters)))
+        for path, output_path, future in futures:
+            try:
+                count = future.result()
+            except (OSError, ValueError) as e:
+                results.append((path, 0, e))
+                continue
+            with open(output_path, 'rb') as f:
+                shutil.copyfileobj(f, out)
+            results.append((path, count, None))
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Filter Wave Studio application.log* files without the GUI.")
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="log file, or directory whose application.log* files are merged")
+    parser.add_argument("-l", "--level", action="append", default=[],
+                        help="keep these levels (repeatable or comma-separated)")
+    parser.add_argument("-s", "--source", help="keep only entries from this source")
+    parser.add_argument("--station", action="append", default=[],
+                        help="with --merge, keep these stations (repeatable or comma-separated)")
+    parser.add_argument("-t", "--term", default="", help="keep lines containing this text")
+    parser.add_argument("-c", "--case-sensitive", action="store_true", help="case-sensitive term search")
+    parser.add_argument("-q", "--query",
+                        help='search-box query, e.g. \'level:ERROR source:Engine "FETCh" -"RRC?" after:11:28\'')
+    parser.add_argument("--from", dest="start", help="first time, [YYYY-MM-DD ]HH:MM[:SS[,mmm]]")
+    parser.add_argument("--to", dest="end", help="end time (exclusive), same format as --from")
+    parser.add_argument("-f", "--format", choices=log_export.EXPORT_FORMATS, default="raw",
+                        help="raw log lines, aligned columns, CSV or JSON lines")
+    parser.add_argument("-o", "--output", help="write to this file instead of stdout")
+    parser.add_argument("-j", "--jobs", type=int, help="parallel processes (default: CPU count)")
+    parser.add_argument("-m", "--merge", action="store_true",
+                        help="merge the logs of all paths by timestamp, one station per path")
+    parser.add_argument("--diff", action="store_true",
+                        help="compare the instrument commands of two runs: the first path (A) and the second (B)")
+    parser.add_argument("--cache-dir", default=index_cache.default_cache_dir(),
+                        help="directory of the parsed index cache (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="parse every file, without the index cache")
+    args = parser.parse_args(argv)
+    if args.diff and (len(args.paths) != 2 or args.merge):
+        parser.error("--diff takes two paths and no --merge")
+    if args.station and not args.merge:
+        parser.error("--station needs --merge")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    levels = [level.strip() for value in args.level for level in value.split(",") if level.strip()]
+    stations = [name.strip() for value in args.station for name in value.split(",") if name.strip()]
+    filters = dict(levels=levels, source=args.source, term=args.term, case_sensitive=args.case_sensitive,
+                   start=args.start, end=args.end, query=args.query, stations=stations)
+    cache_dir = None if args.no_cache else args.cache_dir
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        if args.diff:
+            label = " vs ".join(args.paths)
+            try:
+                diff = diff_runs(*args.paths, out, cache_dir, **filters)
+                results = [(label, diff.aligned, None)]
+            except (OSError, ValueError) as e:
+                results = [(label, 0, e)]
+        elif args.merge:
+            label = ", ".join(args.paths)
+            try:
+                results = [(label, merge_scan(args.paths, out, args.format, cache_dir, **filters), None)]
+            except (OSError, ValueError) as e:
+                results = [(label, 0, e)]
+        else:
+            results = scan_all(args.paths, out, args.format, args.jobs, cache_dir=cache_dir, **filters)
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+    failed = False
+    for path, _, error in results:
+        if error is not None:
+            print(f"{path}: {error}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
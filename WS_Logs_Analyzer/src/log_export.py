@@ -0,0 +1,204 @@
+"""Export of filtered LogStore rows to a file.
+
+Rows are formatted and written in chunks of EXPORT_CHUNK_ROWS straight
+from the store, so memory use does not grow with the size of the
+result. `LogExporter` runs an export on a worker thread and reports
+progress through a queue, like LogLoader.
+"""
+import csv
+import io
+import json
+import os
+import queue
+import threading
+
+from src import log_store
+
+EXPORT_FORMATS = ("raw", "aligned", "csv", "jsonl")
+EXPORT_CHUNK_ROWS = 10000
+# File extension -> format, for the save dialog
+FORMAT_BY_EXTENSION = {".csv": "csv", ".jsonl": "jsonl", ".json": "jsonl", ".txt": "aligned"}
+CSV_COLUMNS = ["timestamp", "level", "source", "message", "file"]
+# First column of stores holding the logs of several stations
+STATION_COLUMN = "station"
+
+
+class ExportCancelled(Exception):
+    """Raised when an export is aborted through its cancel event."""
+
+
+def format_for_path(path):
+    """Export format matching the extension of `path` ("raw" by default)."""
+    return FORMAT_BY_EXTENSION.get(os.path.splitext(path)[1].lower(), "raw")
+
+
+def csv_columns(store):
+    """The CSV columns of `store`'s rows, "station" first if it has stations."""
+    return ([STATION_COLUMN] if store is not None and store.has_stations else []) + CSV_COLUMNS
+
+
+def row_record(store, row):
+    """The columns of `row` as a dict for JSON and CSV output."""
+    record = {STATION_COLUMN: store.station(row)} if store.has_stations else {}
+    record.update({
+        "timestamp": log_store.format_timestamp(store.timestamps[row]),
+        "level": store.level(row),
+        "source": store.source(row),
+        "message": store.message(row),
+        "file": store.files[store.row_file[row]].path,
+    })
+    return record
+
+
+def _raw_chunk(store, rows, label):
+    prefix = b"" if label is None else label.encode('utf-8') + b":"
+    lines = []
+    for row in rows:
+        line = store.line_bytes(row)
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        if store.has_stations:
+            # Merged stations: the raw line alone would not tell where it came from
+            line = store.station(row).encode('utf-8') + b":" + line
+        lines.append(prefix + line)
+    return b"".join(lines)
+
+
+def _aligned_chunk(store, rows, label):
+    prefix = "" if label is None else label + ":"
+    lines = []
+    for row in rows:
+        lines.append(f"{prefix}{store.format_row(row)}\n")
+        # Continuation lines of multi-line entries follow unchanged
+        lines.extend(f"{prefix}{line}\n" for line in store.continuation(row))
+    return "".join(lines).encode('utf-8')
+
+
+def _csv_chunk(store, rows, label):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    columns = csv_columns(store)
+    for row in rows:
+        record = row_record(store, row)
+        values = [record[name] for name in columns]
+        writer.writerow(values if label is None else [label] + values)
+    return buffer.getvalue().encode('utf-8')
+
+
+def _jsonl_chunk(store, rows, label):
+    lines = []
+    for row in rows:
+        record = row_record(store, row)
+        if label is not None:
+            record["path"] = label
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+    return "".join(lines).encode('utf-8')
+
+
+_CHUNK_WRITERS = {"raw": _raw_chunk, "aligned": _aligned_chunk, "csv": _csv_chunk, "jsonl": _jsonl_chunk}
+
+
+def write_header(out, export_format, label=False, store=None):
+    """Write the column header of `export_format`, if it has one, to the binary stream `out`.
+
+    `label` tells whether rows are written with a label column; `store`,
+    if given, is the store the rows come from, for its station column.
+    """
+    if export_format == "aligned":
+        header = f"{'DateTime':<24} {'Level':<10} {'Source':<25} {'Message'}"
+        if store is not None:
+            header = store.format_header()
+        out.write((header + "\n" + "-" * 120 + "\n").encode('utf-8'))
+    elif export_format == "csv":
+        out.write((",".join((["path"] if label else []) + csv_columns(store)) + "\n").encode('utf-8'))
+
+
+def write_rows(store, rows, out, export_format="raw", label=None, progress=None, cancel=None):
+    """Write `rows` of `store` to the binary stream `out`; return the number written.
+
+    Only the rows present when the call starts are written, even if
+    `rows` grows meanwhile. With a `label`, raw and aligned lines are
+    prefixed with "label:", CSV rows get a first path column and JSONL
+    records a "path" key. `progress(rows_written, total_rows)` is called
+    after every chunk and setting the `cancel` event raises ExportCancelled.
+    """
+    write_chunk = _CHUNK_WRITERS[export_format]
+    total = len(rows)
+    for first in range(0, total, EXPORT_CHUNK_ROWS):
+        if cancel is not None and cancel.is_set():
+            raise ExportCancelled()
+        out.write(write_chunk(store, rows[first:min(first + EXPORT_CHUNK_ROWS, total)], label))
+        if progress is not None:
+            progress(min(first + EXPORT_CHUNK_ROWS, total), total)
+    return total
+
+
+def export_rows(store, rows, path, export_format=None, progress=None, cancel=None):
+    """Export `rows` of `store` to the file `path`, with the header of the format.
+
+    The format defaults to the one matching the file extension. A
+    cancelled or failed export removes the partial file.
+    """
+    export_format = export_format or format_for_path(path)
+    try:
+        with open(path, 'wb') as out:
+            write_header(out, export_format, store=store)
+            return write_rows(store, rows, out, export_format, progress=progress, cancel=cancel)
+    except BaseException:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+
+
+class LogExporter(threading.Thread):
+    """Exports rows to a file on a worker thread.
+
+    Events are queued on `events` as (kind, payload) tuples:
+      ("progress", (rows_written, total_rows))
+      ("done", rows_written)
+      ("cancelled", None)
+      ("error", exception)
+    """
+
+    def __init__(self, store, rows, path, export_format=None):
+        super().__init__(daemon=True)
+        self.store = store
+        self.rows = rows
+        self.path = path
+        self.export_format = export_format or format_for_path(path)
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Ask the worker to stop after the current chunk."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            count = export_rows(
+                self.store, self.rows, self.path, self.export_format,
+                progress=lambda done, total: self.events.put(("progress", (done, total))),
+                cancel=self._cancel,
+            )
+        except ExportCancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            # A store closed under a cancelled export fails instead of stopping cleanly
+            self.events.put(("cancelled", None) if self.cancelled else ("error", e))
+        else:
+            self.events.put(("done", count))
+
+    def poll(self):
+        """Return the events queued since the last call, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
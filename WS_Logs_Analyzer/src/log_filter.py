@@ -0,0 +1,321 @@
+"""Filtering of LogStore rows by level, source, station, time and search terms.
+
+Level, source and station filters combine per-code row bitmaps with
+bitwise AND/OR. Results are kept in a small LRU cache keyed by the full filter state, so
+returning to an earlier query is instant. A search term that contains a
+cached term only rescans that term's (smaller) result set. When a
+TokenIndex is attached, only its candidate rows are verified. All search
+terms of a spec, required and excluded, are checked in one pass that
+decodes each candidate row once.
+"""
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from itertools import compress
+
+from src import perf_trace
+from src.token_index import TokenIndex
+
+# levels: names of the checked level boxes, or None to skip level filtering.
+# source: exact source name to keep, or None. start/end: timestamp range
+# [start, end) in ms since the epoch, None meaning unbounded.
+# extra_terms: further terms every row must contain besides `term`;
+# excluded_terms: terms no row may contain (see log_query).
+# stations: names of the stations to keep, or None for all.
+FilterSpec = namedtuple(
+    "FilterSpec",
+    ["term", "levels", "engine_only", "case_sensitive", "source", "start", "end", "extra_terms", "excluded_terms",
+     "stations"],
+    defaults=("", None, False, False, None, None, None, (), (), None),
+)
+
+# Cache limits: number of result sets and total cached row ids (4 bytes each).
+CACHE_ENTRIES = 32
+CACHE_ROWS = 20_000_000
+# Between 0/1 mask bytes and the "0"/"1" digits of a bitmap in base 2
+_MASK_TO_DIGITS = bytes.maketrans(b"\0\1", b"01")
+_DIGITS_TO_MASK = bytes.maketrans(b"01", b"\0\1")
+
+
+def level_regex(levels):
+    """Regex matching a level column against the selected level names."""
+    return re.compile(r'\b(' + '|'.join(re.escape(level) for level in levels) + r')\b', re.IGNORECASE)
+
+
+class BitmapIndex:
+    """Row bitmaps per level and per source code of a LogStore.
+
+    A bitmap is an int with bit `row` set if the row has the code, 1 bit
+    per row, so combining checkbox states is a C-level int AND/OR and
+    `rows()` expands the result back to row ids. Masks of one byte per
+    row are packed to bits through their "0"/"1" text, as int() parses
+    and format() prints base 2 in linear time. Bitmaps are built per
+    code on first use, as there can be many sources.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.row_count = len(store)
+        self._level_bitmaps = {}
+        self._source_bitmaps = {}
+
+    @staticmethod
+    def _pack(mask):
+        """Bitmap of a mask with one 0/1 byte per row."""
+        return int(mask.translate(_MASK_TO_DIGITS)[::-1] or b"0", 2)
+
+    def _build(self, column, table, code, first_row=0):
+        if first_row:
+            column = column[first_row:]
+        return self._pack(self.store.code_mask(column, table, [code]))
+
+    def extend(self, first_row):
+        """Add the rows appended to the store from `first_row` on."""
+        store = self.store
+        for code in self._level_bitmaps:
+            self._level_bitmaps[code] |= self._build(store.levels, store.level_table, code, first_row) << first_row
+        for code in self._source_bitmaps:
+            self._source_bitmaps[code] |= self._build(store.sources, store.source_table, code, first_row) << first_row
+        self.row_count = len(store)
+
+    def levels(self, codes):
+        """Bitmap of the rows whose level code is in `codes`."""
+        bitmap = 0
+        for code in codes:
+            level_bitmap = self._level_bitmaps.get(code)
+            if level_bitmap is None:
+                level_bitmap = self._level_bitmaps[code] = self._build(
+                    self.store.levels, self.store.level_table, code)
+            bitmap |= level_bitmap
+        return bitmap
+
+    def source(self, code):
+        """Bitmap of the rows whose source code is `code`."""
+        if code is None:
+            return 0
+        bitmap = self._source_bitmaps.get(code)
+        if bitmap is None:
+            bitmap = self._source_bitmaps[code] = self._build(self.store.sources, self.store.source_table, code)
+        return bitmap
+
+    def stations(self, codes):
+        """Bitmap of the rows whose station code is in `codes`.
+
+        Built from the file of each row on every call: a station filter
+        only ORs a few file masks, so nothing is kept per station.
+        """
+        return self._pack(self.store.station_mask(codes)[:self.row_count])
+
+    def span(self, first, end):
+        """Bitmap of the rows first <= row < end."""
+        return ((1 << (end - first)) - 1) << first
+
+    def rows(self, bitmap):
+        """Expand `bitmap` to an array of row ids."""
+        digits = format(bitmap, "b")[::-1].encode('ascii')
+        return array('I', compress(range(self.row_count), digits.translate(_DIGITS_TO_MASK)))
+
+
+class LogFilter:
+    """Evaluates FilterSpecs against one LogStore, caching the row ids of each result."""
+
+    def __init__(self, store, index=None):
+        self.store = store
+        self.index = index
+        self.bitmaps = BitmapIndex(store)
+        self._cache = OrderedDict()
+        self._cached_rows = 0
+
+    def rows(self, spec):
+        """Return the store rows matching `spec` as an array of row ids."""
+        if not spec.term and not spec.excluded_terms:
+            # Case sensitivity only affects the search terms
+            spec = spec._replace(case_sensitive=False, extra_terms=())
+
+        rows = self._cache.get(spec)
+        if rows is not None:
+            self._cache.move_to_end(spec)
+            return rows
+
+        if spec.term or spec.excluded_terms:
+            base = self._narrowest_cached(spec)
+            if base is None:
+                base = self.rows(spec._replace(term="", case_sensitive=False, extra_terms=(), excluded_terms=()))
+            with perf_trace.span("term"):
+                rows = self._match_terms(base, spec)
+        else:
+            with perf_trace.span("bitmaps"):
+                rows = self._structural_rows(spec)
+
+        self._remember(spec, rows)
+        return rows
+
+    def _structural_rows(self, spec):
+        """Rows passing the level and source filters."""
+        store = self.store
+        bitmap = None
+
+        # --- Level Filtering ---
+        if spec.levels is not None:
+            # Match each distinct level once, then OR the bitmaps of the matching codes
+            level_codes = self._level_codes(spec.levels)
+            if len(level_codes) < len(store.level_table):
+                bitmap = self.bitmaps.levels(level_codes)
+
+        # --- Source 'Engine' Filtering ---
+        if spec.engine_only:
+            engine_bitmap = self.bitmaps.source(store.source_table.code("Engine"))
+            bitmap = engine_bitmap if bitmap is None else bitmap & engine_bitmap
+
+        # --- Source Filtering ---
+        if spec.source is not None:
+            source_bitmap = self.bitmaps.source(store.source_table.code(spec.source))
+            bitmap = source_bitmap if bitmap is None else bitmap & source_bitmap
+
+        # --- Station Filtering ---
+        if spec.stations is not None:
+            station_bitmap = self.bitmaps.stations(self._station_codes(spec.stations))
+            bitmap = station_bitmap if bitmap is None else bitmap & station_bitmap
+
+        # --- Time Range Filtering ---
+        if spec.start is not None or spec.end is not None:
+            first, end = store.time_range(spec.start, spec.end)
+            if bitmap is None:
+                return array('I', range(first, end))
+            bitmap &= self.bitmaps.span(first, end)
+
+        if bitmap is None:
+            return array('I', range(len(store)))
+        return self.bitmaps.rows(bitmap)
+
+    def _level_codes(self, levels):
+        """Codes of the level table entries matching the selected `levels`."""
+        if not levels:
+            return []
+        regex = level_regex(levels)
+        return [code for code, name in enumerate(self.store.level_table.names) if regex.search(name)]
+
+    def _station_codes(self, stations):
+        """Codes of the named `stations`; unknown names match no row."""
+        codes = (self.store.station_table.code(name) for name in stations)
+        return [code for code in codes if code is not None]
+
+    def extend(self, first_row, changed_row=None):
+        """Update bitmaps and cached results for rows appended from `first_row` on.
+
+        Only the new rows are evaluated; every cached row array, including
+        the one on display, is updated in place. `changed_row` is an
+        earlier row whose entry got continuation lines: it is checked
+        again against every cached result, which it can join, or leave
+        when the new text contains an excluded term. The index never saw
+        its new text, so it is checked without it and stays a candidate
+        of later indexed searches.
+        """
+        self.bitmaps.extend(first_row)
+        if changed_row is not None and self.index is not None:
+            self.index.invalidate(changed_row)
+        new_rows = range(first_row, len(self.store))
+        for spec, rows in self._cache.items():
+            if changed_row is not None:
+                position = bisect_left(rows, changed_row)
+                cached = position < len(rows) and rows[position] == changed_row
+                if self._evaluate(spec, (changed_row,), indexed=False):
+                    if not cached:
+                        rows.insert(position, changed_row)
+                        self._cached_rows += 1
+                elif cached:
+                    del rows[position]
+                    self._cached_rows -= 1
+            added = self._evaluate(spec, new_rows)
+            rows.extend(added)
+            self._cached_rows += len(added)
+
+    def _evaluate(self, spec, rows, indexed=True):
+        """Filter a few `rows` by `spec` row by row, without bitmaps (and without the index unless `indexed`)."""
+        store = self.store
+        if spec.levels is not None:
+            level_codes = set(self._level_codes(spec.levels))
+            levels = store.levels
+            rows = [row for row in rows if levels[row] in level_codes]
+        if spec.engine_only:
+            engine_code = store.source_table.code("Engine")
+            sources = store.sources
+            rows = [row for row in rows if sources[row] == engine_code]
+        if spec.source is not None:
+            source_code = store.source_table.code(spec.source)
+            sources = store.sources
+            rows = [row for row in rows if sources[row] == source_code]
+        if spec.stations is not None:
+            station_codes = set(self._station_codes(spec.stations))
+            rows = [row for row in rows if store.file_stations[store.row_file[row]] in station_codes]
+        if spec.start is not None or spec.end is not None:
+            start = spec.start if spec.start is not None else float("-inf")
+            end = spec.end if spec.end is not None else float("inf")
+            timestamps = store.timestamps
+            rows = [row for row in rows if start <= timestamps[row] < end]
+        if spec.term or spec.excluded_terms:
+            rows = self._match_terms(rows, spec, indexed)
+        return rows
+
+    def _narrowest_cached(self, spec):
+        """Smallest cached result whose term is contained in `spec.term`, if any."""
+        if spec.case_sensitive:
+            term = spec.term
+        else:
+            term = spec.term.lower()
+        best = None
+        for cached_spec, rows in self._cache.items():
+            # Every other filter setting must be the same
+            if not cached_spec.term or cached_spec._replace(term=spec.term) != spec:
+                continue
+            cached_term = cached_spec.term if spec.case_sensitive else cached_spec.term.lower()
+            if cached_term in term and (best is None or len(rows) < len(best)):
+                best = rows
+        return best
+
+    def _match_terms(self, rows, spec, indexed=True):
+        """Rows of sorted `rows` containing all terms of `spec` and none of its excluded terms."""
+        if not spec.extra_terms and not spec.excluded_terms:
+            return self._match_term(rows, spec.term, spec.case_sensitive, indexed)
+        required = (spec.term,) + tuple(spec.extra_terms) if spec.term else ()
+        excluded = tuple(spec.excluded_terms)
+        if not spec.case_sensitive:
+            required = tuple(term.lower() for term in required)
+            excluded = tuple(term.lower() for term in excluded)
+        if indexed and self.index is not None:
+            indexable = [term for term in required if TokenIndex.supports(term)]
+            if indexable:
+                rows = self.index.candidates(max(indexable, key=len), rows)
+
+        line = self.store.line
+        case_sensitive = spec.case_sensitive
+
+        def matches(row):
+            # One decode per row, shared by every term
+            text = line(row) if case_sensitive else line(row).lower()
+            for term in required:
+                if term not in text:
+                    return False
+            for term in excluded:
+                if term in text:
+                    return False
+            return True
+
+        return array('I', filter(matches, rows))
+
+    def _match_term(self, rows, term, case_sensitive, indexed=True):
+        if indexed and self.index is not None and TokenIndex.supports(term):
+            rows = self.index.candidates(term, rows)
+        line = self.store.line
+        if case_sensitive:
+            return array('I', (row for row in rows if term in line(row)))
+        term = term.lower()
+        return array('I', (row for row in rows if term in line(row).lower()))
+
+    def _remember(self, spec, rows):
+        self._cache[spec] = rows
+        self._cached_rows += len(rows)
+        while len(self._cache) > 1 and (len(self._cache) > CACHE_ENTRIES or self._cached_rows > CACHE_ROWS):
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_rows -= len(evicted)
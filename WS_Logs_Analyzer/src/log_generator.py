@@ -0,0 +1,159 @@
+"""Synthetic Wave Studio logs for benchmarks and tests.
+
+Generates `DATE - LEVEL - SOURCE - MESSAGE` entries in the layout the
+application writes: a mix of levels and sources, Ieee488Connection
+command/response pairs with realistic latencies, and ERROR entries
+followed by multi-line stack traces. Output is split into rotations
+(`application.log`, `application.log.1`, ...), oldest in the highest
+number, each covering its own time span like real rotations do.
+"""
+import gzip
+import os
+import random
+from datetime import datetime
+
+from src import command_timing
+from src import log_store
+
+# Relative weight of every level among the non-traffic entries
+DEFAULT_LEVEL_MIX = {"DEBUG": 55, "INFO": 25, "TRACE": 10, "ENGINE": 7, "ERROR": 3}
+SOURCES = ("Engine", "Scheduler", "SequenceRunner", "ResultWriter", "DeviceManager", "LicenseService")
+MESSAGES = (
+    "Step {n} started",
+    "Step {n} finished in {ms} ms",
+    "Executing command sequence {n}",
+    "Invoke measurement task {n}",
+    "Writing result file result_{n}.csv",
+    "Queue length {ms}",
+    "Device state changed to READY",
+    "Configuration reloaded",
+)
+ADDRESSES = (
+    "TCPIP0::10.1.53.153::hislip0::INSTR",
+    "TCPIP0::10.1.53.154::hislip0::INSTR",
+    "GPIB0::20::INSTR",
+)
+# Commands ending in '?' get a response after a latency in [min_ms, max_ms]
+COMMANDS = (
+    ("FETCh:DUT:MODem:STATe:RRC?", 1, 15),
+    ("READ:LTE:MEAS:MEValuation:MODulation:AVERage?", 20, 400),
+    ("CONFigure:LTE:SIGN:RFSettings:FREQuency 1.95E9", 0, 0),
+    ("INITiate:LTE:MEAS:MEValuation", 0, 0),
+    ("*OPC?", 5, 2000),
+    ("SYSTem:ERRor?", 1, 5),
+)
+TRACE_FRAMES = (
+    '  File "engine.py", line {n}, in run_step',
+    '  File "sequence.py", line {n}, in execute',
+    '  File "instrument.py", line {n}, in query',
+    '  File "connection.py", line {n}, in read',
+)
+DEFAULT_START = datetime(2025, 11, 26, 8, 0, 0)
+# Bytes of generated text collected before a write
+WRITE_BATCH = 1024 * 1024
+
+
+def parse_level_mix(text):
+    """Parse "DEBUG=60,INFO=30,ERROR=10" into a level mix dict; raises ValueError."""
+    mix = {}
+    for item in text.split(","):
+        level, _, weight = item.partition("=")
+        if not level.strip() or not weight.strip():
+            raise ValueError(f"Invalid level weight '{item}', expected LEVEL=WEIGHT")
+        mix[level.strip().upper()] = float(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("At least one level needs a positive weight")
+    return mix
+
+
+class LogGenerator:
+    """Produces synthetic log text in time order, one entry (with its continuation lines) at a time.
+
+    `traffic_ratio` is the share of entries that start an Ieee488Connection
+    exchange and `trace_ratio` the share of ERROR entries carrying a
+    stack trace. The same `seed` always gives the same logs.
+    """
+
+    def __init__(self, level_mix=None, traffic_ratio=0.3, trace_ratio=0.5, seed=0, start=DEFAULT_START):
+        self.rng = random.Random(seed)
+        level_mix = level_mix or DEFAULT_LEVEL_MIX
+        self.levels = list(level_mix)
+        self.level_weights = list(level_mix.values())
+        self.traffic_ratio = traffic_ratio
+        self.trace_ratio = trace_ratio
+        self.timestamp = int((start - datetime(1970, 1, 1)).total_seconds() * 1000)
+        self.entries = 0
+        self._pending = []
+
+    def _line(self, level, source, message):
+        return f"{log_store.format_timestamp(self.timestamp)} - {level} - {source} - {message}\n"
+
+    def entry(self):
+        """Return the text of the next entry, newline included."""
+        rng = self.rng
+        self.timestamp += rng.randint(0, 20)
+        self.entries += 1
+        if self._pending:
+            # The response of the previous command, once its latency has passed
+            latency, address, response = self._pending.pop()
+            self.timestamp += latency
+            return self._line("DEBUG", command_timing.TRAFFIC_SOURCE, f"{address} --> {response}")
+
+        if rng.random() < self.traffic_ratio:
+            address = rng.choice(ADDRESSES)
+            command, min_ms, max_ms = rng.choice(COMMANDS)
+            if command.endswith("?"):
+                self._pending.append((rng.randint(min_ms, max_ms), address, rng.choice(("1", "0", "READY", "-1.25E+01"))))
+            return self._line("DEBUG", command_timing.TRAFFIC_SOURCE, f"{address} <-- {command}")
+
+        level = rng.choices(self.levels, self.level_weights)[0]
+        n = rng.randint(1, 9999)
+        message = rng.choice(MESSAGES).format(n=n, ms=rng.randint(0, 5000))
+        text = self._line(level, rng.choice(SOURCES), message)
+        if level == "ERROR" and rng.random() < self.trace_ratio:
+            frames = [rng.choice(TRACE_FRAMES).format(n=rng.randint(1, 2000)) for _ in range(rng.randint(2, 6))]
+            text += "Traceback (most recent call last):\n" + "\n".join(frames)
+            text += f"\nTimeoutError: step {n} timed out\n"
+        return text
+
+    def text(self, size):
+        """Return whole entries totalling at least `size` bytes (as UTF-8; the text is ASCII)."""
+        chunks = []
+        total = 0
+        while total < size:
+            entry = self.entry()
+            chunks.append(entry)
+            total += len(entry)
+        return "".join(chunks)
+
+
+def generate_logs(directory, total_bytes, rotations=0, compress=False, **options):
+    """Write about `total_bytes` of synthetic logs to `directory`; return their paths, newest first.
+
+    The size is split evenly over the current file and `rotations`
+    rotated files. With `compress`, rotated files are gzip-compressed
+    (`application.log.N.gz`); `total_bytes` counts uncompressed text.
+    `options` are passed to LogGenerator.
+    """
+    os.makedirs(directory, exist_ok=True)
+    generator = LogGenerator(**options)
+    file_bytes = -(-total_bytes // (rotations + 1))
+    paths = []
+    # Oldest rotation first, so time runs on across files
+    for number in range(rotations, -1, -1):
+        name = "application.log" if number == 0 else f"application.log.{number}"
+        path = os.path.join(directory, name)
+        if number and compress:
+            path += ".gz"
+            out = gzip.open(path, 'wb', compresslevel=6)
+        else:
+            out = open(path, 'wb')
+        with out:
+            written = 0
+            while written < file_bytes:
+                chunk = generator.text(min(WRITE_BATCH, file_bytes - written)).encode('ascii')
+                out.write(chunk)
+                written += len(chunk)
+        paths.append(path)
+    paths.reverse()
+    return paths
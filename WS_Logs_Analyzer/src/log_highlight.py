@@ -0,0 +1,96 @@
+"""Syntax and search-term highlighting of displayed log lines.
+
+The keyword patterns are fused into one alternation with a named group
+per tag, so a line is scanned once whatever the number of tags, and the
+resulting spans are cached per store row: the view only asks for the
+rows scrolled into the viewport, and scrolling back or changing the
+search term does not scan them again.
+"""
+import re
+from collections import OrderedDict
+
+# Tag name -> pattern; the words of different tags never overlap, so at
+# most one alternative matches at any position
+HIGHLIGHT_PATTERNS = {
+    "error": r'(?i:\b(?:ERROR|EXCEPTION|CRITICAL|FAILED)\b)',
+    "warning": r'(?i:\b(?:WARNING|WARN|DEPRECATED)\b)',
+    "info": r'(?i:\b(?:COMMAND|EXECUTE|INVOKE|STEP)\b)',
+    "loglevel_engine": r'\bEngine\b',
+    "loglevel_debug": r'\bDebug\b',
+    "loglevel_info": r'\bInfo\b',
+    "loglevel_trace": r'\bTrace\b',
+    # Error level is already covered by the 'error' tag pattern
+}
+SYNTAX_PATTERN = re.compile("|".join(f"(?P<{tag}>{pattern})" for tag, pattern in HIGHLIGHT_PATTERNS.items()))
+# Tag of search term matches
+SEARCH_TAG = "highlight"
+# Rows whose syntax spans are kept; a few pages of scrolling each way
+SPAN_CACHE_ROWS = 10_000
+
+
+def syntax_spans(line):
+    """(start, end, tag) of every keyword in `line`, in order."""
+    return [(match.start(), match.end(), match.lastgroup) for match in SYNTAX_PATTERN.finditer(line)]
+
+
+class Highlighter:
+    """Splits lines into (text, tag) segments for the view.
+
+    `search` is the compiled search term regex, or None. Syntax spans are
+    cached by the `key` passed to segments(), usually the store row;
+    call clear() when the lines behind the keys change.
+    """
+
+    def __init__(self, cache_rows=SPAN_CACHE_ROWS):
+        self.search = None
+        self.cache_rows = cache_rows
+        self._spans = OrderedDict()
+
+    def clear(self):
+        self._spans.clear()
+
+    def _syntax_spans(self, key, line):
+        spans = self._spans.get(key)
+        if spans is not None:
+            self._spans.move_to_end(key)
+            return spans
+        spans = syntax_spans(line)
+        self._spans[key] = spans
+        if len(self._spans) > self.cache_rows:
+            self._spans.popitem(last=False)
+        return spans
+
+    def segments(self, line, key=None, syntax=True, tag=None):
+        """Split `line` into (text, tag) segments.
+
+        Keywords are tagged if `syntax`, with their spans cached under
+        `key` unless it is None, and search term matches are tagged
+        SEARCH_TAG. Where spans overlap, the first to start wins. Text
+        outside any span gets `tag`.
+        """
+        spans = []
+        if syntax:
+            spans = self._syntax_spans(key, line) if key is not None else syntax_spans(line)
+        if self.search is not None:
+            found = [(match.start(), match.end(), SEARCH_TAG) for match in self.search.finditer(line)
+                     if match.end() > match.start()]
+            if found:
+                spans = sorted(spans + found)
+
+        # If no matches, the whole line is one segment (fast path)
+        if not spans:
+            return [(line, tag)]
+
+        segments = []
+        last_end = 0
+        for start, end, span_tag in spans:
+            if start >= last_end:
+                # Text before the current match
+                if start > last_end:
+                    segments.append((line[last_end:start], tag))
+                segments.append((line[start:end], span_tag))
+                last_end = end
+        # Any remaining text after the last match
+        if last_end < len(line):
+            segments.append((line[last_end:], tag))
+        return segments
@@ -0,0 +1,105 @@
+"""Background loading of log files into a LogStore.
+
+Tk widgets may only be touched from the main thread, so the worker
+thread never calls into the GUI: it queues events that the application
+drains with `root.after` polling.
+"""
+import queue
+import threading
+
+from src import log_store
+from src import perf_trace
+from src.token_index import TokenIndex
+
+
+class LogLoader(threading.Thread):
+    """Parses and merges log files on a worker thread.
+
+    Events are queued on `events` as (kind, payload) tuples:
+      ("progress", (bytes_read, total_bytes, lines))
+      ("partial", store)  - the first entries, shown while loading continues
+      ("done", store)
+      ("indexing", (rows_indexed, total_rows))
+      ("index", token_index or None if indexing was cancelled or failed)
+      ("cancelled", None)
+      ("error", exception)
+    One of "cancelled" or "error", or "done" (followed by "index" when
+    `build_index` is set) ends the stream.
+
+    Loading and indexing are timed as the "Load" and "Index" operations
+    of `tracer`; `operation` and `index_operation` hold their timings
+    once the "done" and "index" events are queued. `stations`, if given,
+    names the station of each file (see LogStore.open).
+    """
+
+    def __init__(self, file_paths, build_index=False, cache=None, tracer=None, stations=None):
+        super().__init__(daemon=True)
+        self.file_paths = list(file_paths)
+        self.stations = stations
+        self.build_index = build_index
+        self.cache = cache
+        self.tracer = tracer or perf_trace.Tracer()
+        self.operation = None
+        self.index_operation = None
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Ask the worker to stop at its next progress check."""
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def run(self):
+        try:
+            with self.tracer.operation("Load") as self.operation:
+                store = log_store.LogStore.open(
+                    self.file_paths,
+                    progress=self._on_progress,
+                    cancel=self._cancel,
+                    on_partial=lambda partial: self.events.put(("partial", partial)),
+                    cache=self.cache,
+                    stations=self.stations,
+                )
+        except log_store.LoadCancelled:
+            self.events.put(("cancelled", None))
+        except Exception as e:
+            self.events.put(("error", e))
+        else:
+            self.events.put(("done", store))
+            if self.build_index:
+                self._index(store)
+
+    def _index(self, store):
+        # The store is already on screen; the index is attached once complete.
+        try:
+            with self.tracer.operation("Index") as self.index_operation:
+                index = TokenIndex(
+                    store,
+                    progress=lambda rows, total: self.events.put(("indexing", (rows, total))),
+                    cancel=self._cancel,
+                )
+        except Exception:
+            # Cancelled, or the store was closed by a newer load
+            index = None
+        self.events.put(("index", index))
+
+    def is_finished_by(self, kind):
+        """Whether an event of `kind` is the last one this loader posts."""
+        if kind == "done":
+            return not self.build_index
+        return kind in ("index", "cancelled", "error")
+
+    def _on_progress(self, bytes_read, total_bytes, lines):
+        self.events.put(("progress", (bytes_read, total_bytes, lines)))
+
+    def poll(self):
+        """Return the events queued since the last call, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
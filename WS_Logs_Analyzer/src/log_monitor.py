@@ -0,0 +1,76 @@
+"""Rotation-aware tail of a live Wave Studio `application.log`.
+
+`LogTail` remembers the identity (device, inode) of the followed file
+and the byte offset read so far, so every poll reads only appended
+bytes. When Wave Studio rotates `application.log` to
+`application.log.1`, the rest of the old file is read from its rotated
+name before following the new file from its start.
+"""
+import os
+
+
+def _identity(stat_result):
+    return stat_result.st_dev, stat_result.st_ino
+
+
+class LogTail:
+    """Follows a log file and returns the complete lines appended since the last poll."""
+
+    def __init__(self, path, offset=None):
+        """Start following `path` at byte `offset`, or at its current end if None."""
+        self.path = path
+        stat_result = os.stat(path)
+        self._identity = _identity(stat_result)
+        self.offset = stat_result.st_size if offset is None else offset
+        self.rotations = 0
+        self._partial = b""
+
+    def _rotated_path(self, old_size):
+        """Where the followed file went after a rotation, if it can be found."""
+        candidate = self.path + ".1"
+        try:
+            stat_result = os.stat(candidate)
+        except OSError:
+            return None
+        # Without inode support (st_ino == 0) fall back to comparing sizes
+        if self._identity[1]:
+            return candidate if _identity(stat_result) == self._identity else None
+        return candidate if stat_result.st_size >= old_size else None
+
+    @staticmethod
+    def _read_from(path, offset):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            return f.read()
+
+    def poll(self):
+        """Return the complete lines (bytes) appended since the last poll."""
+        try:
+            stat_result = os.stat(self.path)
+        except OSError:
+            # Between the rename and the creation of the new file
+            return b""
+
+        chunks = [self._partial]
+        rotated = _identity(stat_result) != self._identity or stat_result.st_size < self.offset
+        if rotated:
+            rotated_path = self._rotated_path(self.offset)
+            if rotated_path is not None:
+                remainder = self._read_from(rotated_path, self.offset)
+                if remainder and not remainder.endswith(b"\n"):
+                    remainder += b"\n"
+                chunks.append(remainder)
+            self._identity = _identity(stat_result)
+            self.offset = 0
+            self.rotations += 1
+
+        if stat_result.st_size > self.offset:
+            data = self._read_from(self.path, self.offset)
+            self.offset += len(data)
+            chunks.append(data)
+
+        data = b"".join(chunks)
+        # Keep an unfinished last line for the next poll
+        cut = data.rfind(b"\n") + 1
+        self._partial = data[cut:]
+        return data[:cut]
@@ -0,0 +1,148 @@
+"""Search-box query language compiled into one FilterSpec.
+
+A query is a list of space-separated conditions that must all hold:
+
+    level:ERROR,DEBUG source:Ieee488Connection "FETCh" after:11:28 -"RRC?"
+
+- `level:A,B` keeps entries at one of the levels; `-level:A` drops them
+- `source:NAME` keeps entries of one source (exact name)
+- `station:A,B` keeps entries of the named stations; `-station:A` drops them
+- `after:TIME` / `before:TIME` keep entries at or after / before a time
+  (`[YYYY-MM-DD ]HH:MM[:SS[,mmm]]`, a time alone on the date of the logs)
+- `word` or `"quoted text"` must appear in the entry; `-word` or
+  `-"quoted text"` must not
+
+The level, source, station and time conditions become bitmap and time-range
+lookups and all text conditions one pass over the remaining rows (see
+LogFilter). Text without any of this syntax is searched as typed, so
+plain searches containing spaces or colons keep working.
+"""
+import re
+from collections import namedtuple
+
+from src import log_store
+
+# A leading '-' negates only a word or quote, so "-->" stays a plain term
+QUERY_TOKEN = re.compile(r'\s*(-(?=["\w]))?(?:(level|source|station|after|before):)?(?:"([^"]*)"?|(\S+))',
+                         re.IGNORECASE)
+# Text that uses the query syntax: a field prefix, a quote or a negated word
+QUERY_SYNTAX = re.compile(r'(?:^|\s)(?:-?(?:level|source|station|after|before):|-?"|-\w)', re.IGNORECASE)
+
+# levels/excluded_levels: upper-cased level names, None when not given;
+# stations/excluded_stations: station names as typed, likewise;
+# after/before: time texts as typed.
+Query = namedtuple("Query", ["terms", "excluded", "levels", "excluded_levels", "source", "after", "before",
+                             "stations", "excluded_stations"])
+
+
+def has_query_syntax(text):
+    """Whether `text` is a query rather than a plain search term."""
+    return QUERY_SYNTAX.search(text) is not None
+
+
+def parse_query(text):
+    """Parse `text` into a Query; raises ValueError for conditions that cannot hold."""
+    terms, excluded, excluded_levels, excluded_stations = [], [], [], []
+    levels = stations = source = after = before = None
+    for match in QUERY_TOKEN.finditer(text):
+        negated, field, quoted, word = match.groups()
+        value = quoted if quoted is not None else word
+        if value is None or (not value and field is None):
+            continue
+        field = field.lower() if field else None
+        if field is None:
+            (excluded if negated else terms).append(value)
+        elif field == "level":
+            names = [name.strip().upper() for name in value.split(",") if name.strip()]
+            if negated:
+                excluded_levels.extend(names)
+            else:
+                levels = names if levels is None else [name for name in levels if name in names]
+        elif field == "station":
+            names = [name.strip() for name in value.split(",") if name.strip()]
+            if negated:
+                excluded_stations.extend(names)
+            else:
+                stations = names if stations is None else [name for name in stations if name in names]
+        elif negated:
+            raise ValueError(f"'{field}:' cannot be negated")
+        elif field == "source":
+            if source is not None and source != value:
+                raise ValueError(f"An entry has one source, not both '{source}' and '{value}'")
+            source = value
+        elif field == "after":
+            after = value
+        else:
+            before = value
+    return Query(tuple(terms), tuple(excluded), None if levels is None else tuple(levels),
+                 tuple(excluded_levels), source, after, before,
+                 None if stations is None else tuple(stations), tuple(excluded_stations))
+
+
+def apply_query(text, spec, reference=None, all_levels=(), all_stations=()):
+    """Return FilterSpec `spec` narrowed by the query `text`.
+
+    Plain text (see has_query_syntax) becomes the search term as is.
+    Otherwise the query's levels and stations are intersected with
+    `spec.levels` and `spec.stations`, its times with
+    `spec.start`/`spec.end`, and its terms become `term` (the longest,
+    usually the most selective), `extra_terms` and `excluded_terms`.
+    Times of day are taken on the date of the `reference` timestamp;
+    `-level:` removes levels from `spec.levels`, or from `all_levels` if
+    `spec.levels` is None, and `-station:` likewise with `all_stations`.
+    Raises ValueError for an invalid query.
+    """
+    if not has_query_syntax(text):
+        return spec._replace(term=text)
+    query = parse_query(text)
+
+    levels = spec.levels
+    if query.levels is not None:
+        if levels is None:
+            levels = query.levels
+        else:
+            selected = {level.upper() for level in levels}
+            levels = tuple(level for level in query.levels if level in selected)
+    if query.excluded_levels:
+        if levels is None:
+            levels = tuple(all_levels)
+        levels = tuple(level for level in levels if level.upper() not in query.excluded_levels)
+
+    stations = spec.stations
+    if query.stations is not None:
+        stations = query.stations if stations is None else tuple(name for name in query.stations if name in stations)
+    if query.excluded_stations:
+        if stations is None:
+            stations = tuple(all_stations)
+        stations = tuple(name for name in stations if name not in query.excluded_stations)
+
+    source = spec.source
+    if query.source is not None:
+        if source is not None and source != query.source:
+            raise ValueError(f"An entry has one source, not both '{source}' and '{query.source}'")
+        source = query.source
+
+    start, end = spec.start, spec.end
+    if query.after is not None:
+        after = log_store.parse_time(query.after, reference)
+        start = after if start is None else max(start, after)
+    if query.before is not None:
+        before = log_store.parse_time(query.before, reference)
+        end = before if end is None else min(end, before)
+
+    terms = sorted(set(query.terms), key=lambda term: (-len(term), term))
+    return spec._replace(
+        term=terms[0] if terms else "",
+        extra_terms=tuple(terms[1:]),
+        excluded_terms=tuple(sorted(set(query.excluded))),
+        levels=levels,
+        stations=stations,
+        source=source,
+        start=start,
+        end=end,
+    )
+
+
+def highlight_terms(spec):
+    """The terms of `spec` that matching rows contain, for highlighting."""
+    return ((spec.term,) if spec.term else ()) + tuple(spec.extra_terms)
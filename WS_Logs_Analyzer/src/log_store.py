@@ -0,0 +1,994 @@
+"""Reading and merging of Wave Studio `application.log*` files.
+
+Every rotated file (`application.log`, `application.log.1`, ...) is
+already written in time order and the rotations cover disjoint time
+spans, so they are chained, oldest first, without sorting. Logs of
+several stations (bench PCs, one log directory each) overlap in time:
+their rows get one merge order, a stable sort of the timestamp column
+(NumPy's argsort if installed, else Timsort, which merges the sorted
+files it finds), and every column is gathered in that order once. Each
+file records its station, so the station of a row costs no memory per
+row.
+
+`LogStore` keeps rotated logs memory-mapped (the active `application.log`
+is read into memory, see LogFile) and only records the byte span of each
+entry; lines are decoded when they are filtered or shown.
+Each entry is parsed once at load into columns (timestamp in ms, level
+code, source code, message offset) that filters and formatters read.
+Lines that do not start with a timestamp (stack traces, multi-line
+responses) belong to the entry before them: an entry's byte span covers
+its whole record, continuation lines included.
+
+Archived `.gz`/`.zip` rotations are inflated on worker threads while the
+other files are parsed, and parsed chunk by chunk as they arrive; their
+text is kept in memory instead of being mapped.
+
+Large loads of plain files are parsed in worker processes: every file is
+split into byte ranges starting at an entry, each worker maps the file
+itself and sends back only the columns of its range, and the columns are
+concatenated per file before the merge.
+"""
+import gzip
+import mmap
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import ExitStack
+from datetime import date
+
+from src import perf_trace
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Log files of one Wave Studio installation: application.log, application.log.1, ...
+# Archived rotations may be compressed: application.log.3.gz, application.log.4.zip
+LOG_FILE_PATTERN = re.compile(r"^application\.log(?:\.(\d+))?(\.gz|\.zip)?$", re.IGNORECASE)
+COMPRESSED_SUFFIXES = (".gz", ".zip")
+# Decompressed bytes handed from a decompression thread to the parser at a time.
+DECOMPRESS_CHUNK = 4 * 1024 * 1024
+DECOMPRESS_WORKERS = os.cpu_count() or 1
+# Plain files are parsed by worker processes in byte ranges of about
+# PARSE_CHUNK_BYTES once a load has PARALLEL_PARSE_MIN_BYTES of them to
+# parse; smaller loads are parsed before the workers would have started.
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_CHUNK_BYTES = 32 * 1024 * 1024
+PARALLEL_PARSE_MIN_BYTES = 64 * 1024 * 1024
+# Seconds between checks of the cancel event while waiting for a worker
+PARSE_POLL_INTERVAL = 0.1
+# User-entered times: a full log timestamp, or a time of day on the date of the logs.
+TIME_INPUT_PATTERN = re.compile(
+    r"^\s*(?:(\d{4})-(\d{2})-(\d{2})[ T])?(\d{1,2}):(\d{2})(?::(\d{2})(?:[,.](\d{1,3}))?)?\s*$"
+)
+
+# Only lines starting with "YYYY-MM-DD HH:MM:SS,mmm" are log entries.
+ENTRY_START_PATTERN = re.compile(rb"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}")
+TIMESTAMP_LENGTH = 23
+
+# One match per log entry, from its timestamped line through the
+# continuation lines that follow it, newline included.
+# Group 8 is the rest of the first line.
+ENTRY_PATTERN = re.compile(
+    rb"^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2}):(\d{2}),(\d{3})([^\n]*)"
+    rb"(?:\n(?!\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})[^\n]*)*\n?", re.MULTILINE
+)
+COLUMN_SEPARATOR = b" - "
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MS_PER_DAY = 86400000
+
+# Entries parsed between two progress reports / cancellation checks.
+PROGRESS_INTERVAL = 50000
+# Limits of the `lengths` ('I') and `msg_offsets` ('H') columns
+MAX_ENTRY_LENGTH = 2 ** 32 - 1
+MAX_MESSAGE_OFFSET = 2 ** 16 - 1
+
+
+def format_timestamp(timestamp):
+    """Format a timestamp column value (ms since the epoch) like the log does."""
+    days, ms = divmod(timestamp, _MS_PER_DAY)
+    day = date.fromordinal(_EPOCH_ORDINAL + days)
+    seconds, ms = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{day.isoformat()} {hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def parse_time(text, reference=None):
+    """Parse a user-entered time into a timestamp column value (ms since the epoch).
+
+    Accepts "YYYY-MM-DD HH:MM[:SS[,mmm]]" or just "HH:MM[:SS[,mmm]]", which
+    is taken on the date of the `reference` timestamp. Raises ValueError.
+    """
+    match = TIME_INPUT_PATTERN.match(text)
+    if match is None:
+        raise ValueError(f"Invalid time '{text}', expected [YYYY-MM-DD ]HH:MM[:SS[,mmm]]")
+    year, month, day, hours, minutes, seconds, ms = match.groups()
+    if year is not None:
+        day_ms = (date(int(year), int(month), int(day)).toordinal() - _EPOCH_ORDINAL) * _MS_PER_DAY
+    elif reference is not None:
+        day_ms = reference - reference % _MS_PER_DAY
+    else:
+        raise ValueError(f"Time '{text}' needs a date")
+    if int(hours) > 23 or int(minutes) > 59 or int(seconds or 0) > 59:
+        raise ValueError(f"Invalid time '{text}'")
+    return (day_ms + ((int(hours) * 60 + int(minutes)) * 60 + int(seconds or 0)) * 1000
+            + int((ms or "0").ljust(3, "0")))
+
+
+def find_log_files(dir_path):
+    """Names of the application.log* files in `dir_path`, application.log first."""
+    log_files = [f for f in os.listdir(dir_path)
+                 if os.path.isfile(os.path.join(dir_path, f)) and LOG_FILE_PATTERN.match(f)]
+    # Sort numerically
+    log_files.sort(key=lambda f: (int(LOG_FILE_PATTERN.match(f).group(1) or -1), f))
+    return log_files
+
+
+def station_names(paths):
+    """Station name of each log directory or file in `paths`.
+
+    A station is named after its log directory (a file's directory);
+    directories sharing a base name are named by their full path.
+    """
+    directories = [os.path.normpath(os.path.abspath(path if os.path.isdir(path) else os.path.dirname(path)))
+                   for path in paths]
+    bases = {directory: os.path.basename(directory) or directory for directory in directories}
+    counts = Counter(bases.values())
+    return [bases[directory] if counts[bases[directory]] == 1 else directory for directory in directories]
+
+
+def is_compressed(path):
+    return path.lower().endswith(COMPRESSED_SUFFIXES)
+
+
+class LoadCancelled(Exception):
+    """Raised when a load is aborted through its cancel event."""
+
+
+def last_entry_start(buffer, parsed, searched):
+    """Offset of the last entry start in `buffer` after `searched`, or `parsed` if none.
+
+    Used to parse a growing buffer in pieces: the entry starting there
+    may still get continuation lines, so only the entries before it are
+    complete. Lines starting after `searched` are the only ones checked.
+    """
+    end = len(buffer)
+    while True:
+        newline = buffer.rfind(b"\n", searched, end)
+        if newline < 0:
+            return parsed
+        if ENTRY_START_PATTERN.match(buffer, newline + 1):
+            return newline + 1
+        end = newline
+
+
+def entry_boundary(buffer, offset, size):
+    """Start of the first entry at or after `offset` in the first `size` bytes of `buffer`, or `size`."""
+    if offset <= 0:
+        return 0
+    if offset >= size:
+        return size
+    match = ENTRY_PATTERN.search(buffer, offset, size)
+    return size if match is None else match.start()
+
+
+def split_ranges(size, chunk_bytes):
+    """Split `size` bytes into (start, end) ranges of about `chunk_bytes`, to be moved to entry starts."""
+    count = max(1, -(-size // chunk_bytes))
+    bounds = [size * i // count for i in range(count + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def remap_codes(column, mapping):
+    """`column` with every code replaced by `mapping[code]`; `column` itself if nothing changes."""
+    if all(code == new_code for code, new_code in enumerate(mapping)):
+        return column
+    return array(column.typecode, map(mapping.__getitem__, column))
+
+
+def parse_range(path, start, end, size):
+    """Parse the entries of `path` that start in bytes [start, end) of its first `size` bytes.
+
+    Meant for a worker process: the file is mapped here instead of being
+    sent, and both ends move to the next entry start so that ranges cut
+    anywhere share no entry. Returns (columns, level_names, source_names):
+    the EntryColumns of the range, with codes into string tables of its
+    own whose raw names are listed in code order.
+    """
+    levels = StringTable()
+    sources = StringTable()
+    columns = EntryColumns()
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            size = min(size, len(buffer))
+            pos = entry_boundary(buffer, start, size)
+            stop = entry_boundary(buffer, end, size) if end < size else size
+            if pos < stop:
+                columns.parse(buffer, levels, sources, pos=pos, end=stop)
+        finally:
+            buffer.close()
+    return columns, levels.raw_names(), sources.raw_names()
+
+
+def _result(future, cancel):
+    """Wait for `future`; setting the `cancel` event raises LoadCancelled."""
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise LoadCancelled()
+        try:
+            return future.result(timeout=PARSE_POLL_INTERVAL)
+        except FutureTimeout:
+            pass
+
+
+class StringTable:
+    """Interns a repeated column value (level, source) as a small integer code.
+
+    Code 0 is the empty string, used by entries that lack the column.
+    """
+
+    def __init__(self):
+        self.names = [""]
+        self._codes = {b"": 0}
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, raw):
+        """Return the code of the stripped bytes `raw`, adding it if new."""
+        code = self._codes.get(raw)
+        if code is None:
+            code = self._codes[raw] = len(self.names)
+            self.names.append(raw.decode('utf-8', errors='ignore'))
+        return code
+
+    def code(self, name):
+        """Return the code of `name`, or None if no entry uses it."""
+        return self._codes.get(name.encode('utf-8'))
+
+    def raw_names(self):
+        """The interned raw bytes, in code order."""
+        return list(self._codes)
+
+    def translate(self, raw_names):
+        """Intern `raw_names` (another table's raw_names()); return the code of each here."""
+        return [self.intern(raw) for raw in raw_names]
+
+
+class EntryColumns:
+    """Parsed columns of consecutive log entries of one buffer.
+
+    `starts` holds the offset of each entry in the buffer and `lengths`
+    its size. `msg_offsets` holds the offset of the message column from
+    the entry start: 0 for malformed lines that have fewer than three
+    columns, and the length of the first line for lines without a
+    message column. The columns are taken from the first line of an
+    entry only. Lengths and message offsets are stored relative to the
+    entry start in 4 and 2 bytes; an entry beyond MAX_ENTRY_LENGTH is
+    cut there, and a line whose message starts beyond MAX_MESSAGE_OFFSET
+    is treated as malformed.
+    """
+
+    _COLUMNS = ("starts", "lengths", "msg_offsets", "timestamps", "levels", "sources")
+
+    def __init__(self):
+        self.starts = array('Q')
+        self.lengths = array('I')
+        self.msg_offsets = array('H')
+        self.timestamps = array('q')
+        self.levels = array('H')
+        self.sources = array('H')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def parse(self, buffer, levels, sources, pos=0, progress=None, cancel=None, end=None):
+        """Append the entries of `buffer` from line start `pos` on, up to `end` if given.
+
+        Levels and sources are interned into the `levels` and `sources`
+        tables. `progress(self, offset)` is called every PROGRESS_INTERVAL
+        entries; setting the `cancel` event raises LoadCancelled. An entry
+        with an impossible date (e.g. month 13) is kept, with its
+        continuation lines, at the time of the entry before it, or of the
+        first dated entry after it if none comes before.
+        """
+        day_ms = {}
+        # Rows of leading entries without a valid date, until one has one
+        undated = []
+        next_report = len(self) + PROGRESS_INTERVAL
+        for match in ENTRY_PATTERN.finditer(buffer, pos, len(buffer) if end is None else end):
+            entry_start, entry_end = match.span()
+            if len(self.starts) >= next_report:
+                next_report += PROGRESS_INTERVAL
+                if cancel is not None and cancel.is_set():
+                    raise LoadCancelled()
+                if progress is not None:
+                    progress(self, entry_start)
+            year, month, day, hour, minute, second, millis, rest = match.groups()
+
+            day_key = year + month + day
+            base = day_ms.get(day_key)
+            if base is None:
+                try:
+                    ordinal = date(int(year), int(month), int(day)).toordinal()
+                except ValueError:
+                    pass
+                else:
+                    base = day_ms[day_key] = (ordinal - _EPOCH_ORDINAL) * _MS_PER_DAY
+            if base is not None:
+                timestamp = base + ((int(hour) * 60 + int(minute)) * 60 + int(second)) * 1000 + int(millis)
+                for row in undated:
+                    self.timestamps[row] = timestamp
+                undated = []
+            elif len(self.timestamps) and not undated:
+                timestamp = self.timestamps[-1]
+            else:
+                timestamp = 0
+                undated.append(len(self.timestamps))
+
+            # Same column rules as splitting the first line on " - "; the
+            # timestamp cannot contain a separator, so only the rest is split.
+            parts = rest.split(COLUMN_SEPARATOR, 3)
+            level = levels.intern(parts[1].strip()) if len(parts) >= 2 else 0
+            source = sources.intern(parts[2].strip()) if len(parts) >= 3 else 0
+            if len(parts) == 4:
+                msg_offset = (TIMESTAMP_LENGTH + len(parts[0]) + len(parts[1]) + len(parts[2])
+                              + 3 * len(COLUMN_SEPARATOR))
+            elif len(parts) == 3:
+                msg_offset = match.end(8) - entry_start
+            else:
+                msg_offset = 0
+            if msg_offset > MAX_MESSAGE_OFFSET:
+                msg_offset = 0
+            length = entry_end - entry_start
+            if length > MAX_ENTRY_LENGTH:
+                length = MAX_ENTRY_LENGTH
+
+            self.starts.append(entry_start)
+            self.lengths.append(length)
+            self.msg_offsets.append(msg_offset)
+            self.timestamps.append(timestamp)
+            self.levels.append(level)
+            self.sources.append(source)
+
+
+class LogFile(EntryColumns):
+    """A log file and the parsed columns of every entry in it.
+
+    Rotated files (`application.log.N`) are memory-mapped. Any other file
+    may still be written, and on Windows an open handle stops the writer
+    from renaming it to `application.log.1`, so it is read into memory
+    and closed right away.
+    """
+
+    def __init__(self, path, levels, sources, progress=None, cancel=None, cache=None, chunks=None):
+        """Map or read `path` and parse it, interning into the `levels` and `sources` tables.
+
+        `progress(file, bytes_parsed)` is called every PROGRESS_INTERVAL
+        entries; setting the `cancel` event raises LoadCancelled. With an
+        IndexCache as `cache`, unchanged files are read from it instead of
+        parsed, and newly parsed files are saved to it. `chunks`, if given,
+        are (end, future) pairs of parse_range() calls covering the file in
+        order, whose results are used instead of parsing here.
+        """
+        super().__init__()
+        self.path = path
+        self.entry_count = 0
+        self.from_cache = False
+        self._map()
+        try:
+            if cache is not None:
+                # The mapping may be shorter than a file still being written,
+                # and the chunks shorter than the mapping
+                stat_result = self._stat
+                cacheable = stat_result.st_size == self.size and (chunks is None or chunks[-1][0] == self.size)
+                self.from_cache = cacheable and cache.load(
+                    path, self.size, stat_result.st_mtime_ns, self, levels, sources)
+            if self.from_cache:
+                for _, future in chunks or ():
+                    future.cancel()
+            elif chunks is not None:
+                self._collect(chunks, levels, sources, progress, cancel)
+            else:
+                self.parse(self.buffer, levels, sources, progress=progress, cancel=cancel)
+            if not self.from_cache and cache is not None and cacheable:
+                cache.save(path, self.size, stat_result.st_mtime_ns, self, levels, sources)
+        except BaseException:
+            self.close()
+            raise
+
+    def _collect(self, chunks, levels, sources, progress, cancel):
+        """Append the columns parsed by worker processes, re-interning their codes."""
+        for end, future in chunks:
+            columns, level_names, source_names = _result(future, cancel)
+            columns.levels = remap_codes(columns.levels, levels.translate(level_names))
+            columns.sources = remap_codes(columns.sources, sources.translate(source_names))
+            for name in self._COLUMNS:
+                getattr(self, name).extend(getattr(columns, name))
+            if progress is not None:
+                progress(self, end)
+
+    def _map(self):
+        with open(self.path, 'rb') as f:
+            self._stat = os.fstat(f.fileno())
+            match = LOG_FILE_PATTERN.match(os.path.basename(self.path))
+            if match is None or match.group(1) is None:
+                self.buffer = f.read()
+            else:
+                try:
+                    self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty files cannot be mapped.
+                    self.buffer = b""
+        self.size = len(self.buffer)
+
+    def snapshot(self):
+        """Return an independently mapped (or read) copy of the entries parsed so far."""
+        copy = LogFile.__new__(LogFile)
+        copy.path = self.path
+        copy._map()
+        count = len(self)
+        for name in self._COLUMNS:
+            setattr(copy, name, getattr(self, name)[:count])
+        copy.entry_count = count
+        return copy
+
+    def __len__(self):
+        return self.entry_count if self.starts is None else len(self.starts)
+
+    def release_columns(self):
+        """Drop the per-file columns once a LogStore holds the merged copy."""
+        self.entry_count = len(self.starts)
+        for name in self._COLUMNS:
+            setattr(self, name, None)
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self.buffer = b""
+
+
+class Decompressor:
+    """Inflates one .gz/.zip log into a queue of (chunk, compressed_offset) items.
+
+    `run()` is meant for a worker thread: zlib releases the GIL while
+    inflating, so it overlaps with parsing on the loading thread. It
+    stops early once the `stop` event is set.
+    """
+
+    def __init__(self, path, stop=None):
+        self.path = path
+        self.chunks = queue.Queue()
+        self._stop = stop if stop is not None else threading.Event()
+
+    @staticmethod
+    def _open(raw, stack):
+        if raw.name.lower().endswith(".zip"):
+            archive = stack.enter_context(zipfile.ZipFile(raw))
+            members = [info for info in archive.infolist() if not info.is_dir()]
+            if not members:
+                raise ValueError(f"No log file in archive '{raw.name}'")
+            return stack.enter_context(archive.open(members[0]))
+        return stack.enter_context(gzip.GzipFile(fileobj=raw))
+
+    def run(self):
+        try:
+            with ExitStack() as stack:
+                raw = stack.enter_context(open(self.path, 'rb'))
+                stream = self._open(raw, stack)
+                while not self._stop.is_set():
+                    chunk = stream.read(DECOMPRESS_CHUNK)
+                    if not chunk:
+                        break
+                    self.chunks.put((chunk, raw.tell()))
+            self.chunks.put(None)
+        except (zipfile.BadZipFile, EOFError, zlib.error) as e:
+            # Reported like other unreadable files, which callers already handle
+            self.chunks.put(ValueError(f"Corrupt archive '{self.path}': {e}"))
+        except Exception as e:
+            self.chunks.put(e)
+
+    def __iter__(self):
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+class CompressedLogFile(LogFile):
+    """A .gz/.zip log decompressed into memory and parsed one chunk at a time."""
+
+    def __init__(self, path, levels, sources, progress=None, cancel=None, cache=None, decompressor=None):
+        """Like LogFile; `decompressor` is a Decompressor already running on a worker thread.
+
+        Without one the file is decompressed on the calling thread.
+        `progress` receives offsets into the compressed file.
+        """
+        EntryColumns.__init__(self)
+        self.path = path
+        self.entry_count = 0
+        self.buffer = bytearray()
+        self.size = 0
+        self.from_cache = False
+        if decompressor is None:
+            decompressor = Decompressor(path)
+            decompressor.run()
+
+        stat_result = os.stat(path)
+        if cache is not None:
+            self.from_cache = cache.load(path, stat_result.st_size, stat_result.st_mtime_ns, self, levels, sources)
+        compressed_offset = 0
+        report = None
+        if progress is not None:
+            report = lambda columns, offset: progress(self, compressed_offset)
+
+        parsed = 0
+        for chunk, compressed_offset in decompressor:
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+            # Line starts before the last (possibly cut) line are already searched
+            searched = max(parsed, self.buffer.rfind(b"\n"))
+            self.buffer += chunk
+            self.size = len(self.buffer)
+            if not self.from_cache:
+                # Only complete entries; the last one may continue in the next chunk
+                end = last_entry_start(self.buffer, parsed, searched)
+                if end > parsed:
+                    self.parse(self.buffer, levels, sources, parsed, report, cancel, end)
+                    parsed = end
+        if not self.from_cache:
+            self.parse(self.buffer, levels, sources, parsed, report, cancel)
+            if cache is not None:
+                cache.save(path, stat_result.st_size, stat_result.st_mtime_ns, self, levels, sources)
+
+    def snapshot(self):
+        """Return a copy of the entries parsed so far, with its own copy of their text."""
+        copy = CompressedLogFile.__new__(CompressedLogFile)
+        copy.path = self.path
+        count = len(self)
+        copy.buffer = bytes(self.buffer[:self.starts[count - 1] + self.lengths[count - 1]]) if count else b""
+        copy.size = len(copy.buffer)
+        for name in self._COLUMNS:
+            setattr(copy, name, getattr(self, name)[:count])
+        copy.entry_count = count
+        return copy
+
+    def close(self):
+        self.buffer = b""
+
+
+class LiveLogFile:
+    """In-memory buffer for log data read incrementally, e.g. by the tail monitor."""
+
+    def __init__(self, path):
+        self.path = path
+        self.buffer = bytearray()
+        self.entry_total = 0
+
+    @property
+    def size(self):
+        return len(self.buffer)
+
+    def append(self, data, levels, sources):
+        """Append complete lines of `data`; return (continued_end, entries).
+
+        `entries` are the EntryColumns parsed from `data`. When `data`
+        starts with continuation lines of the last entry appended or
+        adopted before, `continued_end` is the new end of that entry,
+        otherwise None.
+        """
+        pos = len(self.buffer)
+        self.buffer += data
+        continued_end = None
+        if self.entry_total and not ENTRY_START_PATTERN.match(self.buffer, pos):
+            next_entry = ENTRY_PATTERN.search(self.buffer, pos)
+            continued_end = len(self.buffer) if next_entry is None else next_entry.start()
+        entries = EntryColumns()
+        entries.parse(self.buffer, levels, sources, pos=pos)
+        self.entry_total += len(entries)
+        return continued_end, entries
+
+    def adopt(self, entry):
+        """Append the bytes of an entry parsed from another file; return its start."""
+        start = len(self.buffer)
+        self.buffer += entry
+        self.entry_total += 1
+        return start
+
+    def close(self):
+        self.buffer = bytearray()
+
+
+def _merge_order(timestamps):
+    """Positions of the `timestamps` column in stable timestamp order.
+
+    The column is the concatenation of sorted runs, which both sorts
+    merge instead of sorting from scratch.
+    """
+    if np is not None:
+        return np.argsort(np.frombuffer(timestamps, dtype=np.int64), kind="stable")
+    return sorted(range(len(timestamps)), key=timestamps.__getitem__)
+
+
+def _gather(column, order):
+    """A new array of the items of `column` at the positions `order`."""
+    if np is not None:
+        return array(column.typecode, np.frombuffer(column, dtype=column.typecode)[order].tobytes())
+    return array(column.typecode, map(column.__getitem__, order))
+
+
+class LogStore:
+    """Timestamp-ordered columns over several memory-mapped log files.
+
+    A row is addressed by its position in the merged order. `row_file`
+    names the file a row came from and `starts` the byte offset of the
+    row in that file's buffer; `lengths` and `msg_offsets` are relative
+    to it (see EntryColumns). `levels` and `sources` hold codes into the
+    `level_table` and `source_table` string tables. A row takes 28 bytes.
+    `file_stations` holds the station code of every file, into
+    `station_table`; code 0 ("") is used when no stations are given.
+    """
+
+    def __init__(self, files, level_table, source_table, station_table=None, file_stations=None):
+        self.files = files
+        self.level_table = level_table
+        self.source_table = source_table
+        self.station_table = StringTable() if station_table is None else station_table
+        self.file_stations = array('H', [0] * len(files) if file_stations is None else file_stations)
+        # Width of the station column of format_row()
+        self.station_width = max(len("Station"), *map(len, self.station_table.names))
+        self.row_file = array('H')
+        self.starts = array('Q')
+        self.lengths = array('I')
+        self.msg_offsets = array('H')
+        self.timestamps = array('q')
+        self.levels = array('H')
+        self.sources = array('H')
+        # Incremented whenever rows are renumbered (see append_entries)
+        self.generation = 0
+        self._merge()
+
+    @classmethod
+    def open(cls, file_paths, progress=None, cancel=None, on_partial=None, cache=None, workers=None,
+             stations=None):
+        """Map and parse every file in `file_paths`.
+
+        `progress(bytes_read, total_bytes, lines)` is called while parsing
+        and setting the `cancel` event raises LoadCancelled. If given,
+        `on_partial(store)` receives a store over the first entries of the
+        first file as soon as they are parsed; it is mapped separately and
+        the caller closes it once it is replaced. `cache` is an optional
+        IndexCache for the parsed columns. Up to `workers` processes
+        (default PARSE_WORKERS) parse the plain files of large loads.
+        `stations`, if given, names the station of each file.
+        """
+        level_table = StringTable()
+        source_table = StringTable()
+        station_table = StringTable()
+        file_stations = [station_table.intern(name.encode('utf-8')) for name in stations or ()]
+        file_stations += [0] * (len(file_paths) - len(file_stations))
+        sizes = [os.path.getsize(path) for path in file_paths]
+        total_bytes = sum(sizes)
+        files = []
+        bytes_done = lines_done = 0
+        partial = []
+
+        def publish_partial(log_file):
+            if on_partial is not None and not partial:
+                snapshot = log_file.snapshot()
+                partial.append(cls([snapshot], level_table, source_table, station_table, file_stations[:1]))
+                on_partial(partial[0])
+
+        def report(log_file, bytes_parsed):
+            if progress is not None:
+                progress(bytes_done + bytes_parsed, total_bytes, lines_done + len(log_file))
+            if not files:
+                publish_partial(log_file)
+
+        # Archived rotations are inflated on worker threads while earlier files are parsed
+        stop = threading.Event()
+        decompressors = [Decompressor(path, stop) if is_compressed(path) else None for path in file_paths]
+        pool = None
+        if any(decompressors):
+            pool = ThreadPoolExecutor(min(DECOMPRESS_WORKERS, sum(map(bool, decompressors))))
+            for decompressor in filter(None, decompressors):
+                pool.submit(decompressor.run)
+
+        process_pool = None
+        try:
+            chunks, process_pool = cls._start_parsing(file_paths, sizes, decompressors, cache, workers)
+            for path, size, decompressor, file_chunks in zip(file_paths, sizes, decompressors, chunks):
+                with perf_trace.span("parse"):
+                    if decompressor is not None:
+                        log_file = CompressedLogFile(
+                            path, level_table, source_table, report, cancel, cache, decompressor)
+                    else:
+                        log_file = LogFile(path, level_table, source_table, report, cancel, cache, file_chunks)
+                files.append(log_file)
+                bytes_done += size
+                lines_done += len(log_file)
+                if progress is not None:
+                    progress(bytes_done, total_bytes, lines_done)
+                if len(files) == 1 and len(log_file):
+                    publish_partial(log_file)
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled()
+            with perf_trace.span("merge"):
+                store = cls(files, level_table, source_table, station_table, file_stations)
+        except BaseException:
+            for log_file in files:
+                log_file.close()
+            raise
+        finally:
+            stop.set()
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=False, cancel_futures=True)
+        return store
+
+    @staticmethod
+    def _start_parsing(file_paths, sizes, decompressors, cache, workers):
+        """Submit the plain, uncached files of a large load to worker processes.
+
+        Returns (chunks, pool): per file None or the (end, future) pairs of
+        its byte ranges for LogFile, and the process pool, or None when the
+        load is parsed in this process.
+        """
+        workers = PARSE_WORKERS if workers is None else workers
+        plain = [i for i, (path, size, decompressor) in enumerate(zip(file_paths, sizes, decompressors))
+                 if decompressor is None and size and not (cache is not None and cache.contains(path))]
+        chunks = [None] * len(file_paths)
+        if workers <= 1 or not plain or sum(sizes[i] for i in plain) < PARALLEL_PARSE_MIN_BYTES:
+            return chunks, None
+        ranges = {i: split_ranges(sizes[i], PARSE_CHUNK_BYTES) for i in plain}
+        # Loads run on a background thread of the GUI; spawned workers do
+        # not inherit its state like forked ones would
+        pool = ProcessPoolExecutor(min(workers, sum(map(len, ranges.values()))),
+                                   mp_context=multiprocessing.get_context("spawn"))
+        for i, file_ranges in ranges.items():
+            chunks[i] = [(end, pool.submit(parse_range, file_paths[i], start, end, sizes[i]))
+                         for start, end in file_ranges]
+        return chunks, pool
+
+    def _merge(self):
+        """Fill the columns from the files, releasing the columns of each file once copied."""
+        non_empty = [(i, f) for i, f in enumerate(self.files) if len(f)]
+        # Rotations usually cover disjoint time ranges: chain them oldest
+        # first into runs, one per station unless its files overlap. A
+        # rotation may end in the millisecond the next one starts.
+        runs = []
+        for file_index, log_file in sorted(non_empty, key=lambda item: (item[1].timestamps[0], item[0])):
+            for run in runs:
+                if run[-1][1].timestamps[-1] <= log_file.timestamps[0]:
+                    run.append((file_index, log_file))
+                    break
+            else:
+                runs.append([(file_index, log_file)])
+        # Overlapping runs are concatenated run by run and sorted stably, so
+        # equal timestamps keep the order of their run: rotations oldest first
+        for run in runs:
+            for file_index, log_file in run:
+                self.row_file.extend(array('H', [file_index]) * len(log_file))
+                for name in EntryColumns._COLUMNS:
+                    getattr(self, name).extend(getattr(log_file, name))
+                log_file.release_columns()
+        if len(runs) > 1:
+            order = _merge_order(self.timestamps)
+            for name in ("row_file",) + EntryColumns._COLUMNS:
+                setattr(self, name, _gather(getattr(self, name), order))
+
+    def add_file(self, log_file, station=""):
+        """Attach another file (e.g. a LiveLogFile) of `station` and return its file index."""
+        self.files.append(log_file)
+        self.file_stations.append(self.station_table.intern(station.encode('utf-8')))
+        self.station_width = max(self.station_width, len(station))
+        return len(self.files) - 1
+
+    def append_entries(self, file_index, entries):
+        """Add the EntryColumns `entries` of file `file_index` in timestamp order; return the merge order.
+
+        Lines appended to a live log are usually newer than every row, so
+        they follow the last row and None is returned. Older ones (e.g. a
+        station whose clock lags the others) are merged into the sorted
+        rows, which renumbers them: the returned order then lists the
+        former row of every row, `entries` counting as rows from the
+        former len(self) on.
+        """
+        first_row = len(self.row_file)
+        self.row_file.extend(array('H', [file_index]) * len(entries))
+        for name in EntryColumns._COLUMNS:
+            getattr(self, name).extend(getattr(entries, name))
+        timestamps = self.timestamps
+        if all(timestamps[row - 1] <= timestamps[row] for row in range(max(first_row, 1), len(timestamps))):
+            return None
+        order = _merge_order(timestamps)
+        for name in ("row_file",) + EntryColumns._COLUMNS:
+            setattr(self, name, _gather(getattr(self, name), order))
+        self.generation += 1
+        return order
+
+    def extend_last_entry(self, file_index, end):
+        """Extend the last row of file `file_index` to end at `end`; return that row.
+
+        Used when continuation lines of an entry arrive after the entry
+        itself, as on a live log. Returns None if the file has no rows.
+        """
+        row = self._last_row(file_index)
+        if row is not None:
+            self.lengths[row] = min(end - self.starts[row], MAX_ENTRY_LENGTH)
+        return row
+
+    def move_last_entry(self, file_index, live_index):
+        """Move the last row of file `file_index` into the LiveLogFile `live_index`; return that row.
+
+        Used when a live log continues a loaded file: continuation lines of
+        the loaded last entry can then extend it with extend_last_entry().
+        The row keeps its position. Returns None if the file has no rows.
+        """
+        row = self._last_row(file_index)
+        if row is not None:
+            self.starts[row] = self.files[live_index].adopt(self._bytes(row, self.starts[row]))
+            self.row_file[row] = live_index
+        return row
+
+    def _last_row(self, file_index):
+        for row in range(len(self.row_file) - 1, -1, -1):
+            if self.row_file[row] == file_index:
+                return row
+        return None
+
+    def __len__(self):
+        return len(self.row_file)
+
+    @property
+    def total_size(self):
+        return sum(f.size for f in self.files)
+
+    def _end(self, row):
+        return self.starts[row] + self.lengths[row]
+
+    def _bytes(self, row, start):
+        return self.files[self.row_file[row]].buffer[start:self._end(row)]
+
+    def _first_line(self, row, start):
+        # Bytes of the first line of `row` from `start` on, without the newline
+        buffer = self.files[self.row_file[row]].buffer
+        end = self._end(row)
+        newline = buffer.find(b"\n", start, end)
+        return buffer[start:end if newline < 0 else newline]
+
+    def line_bytes(self, row):
+        """Raw bytes of the entry at merged position `row`, continuation lines and newline included."""
+        return self._bytes(row, self.starts[row])
+
+    def line(self, row):
+        """Decode the entry at merged position `row`, continuation lines and newline included."""
+        return self._bytes(row, self.starts[row]).decode('utf-8', errors='ignore')
+
+    def continuation(self, row):
+        """Decode the lines of a multi-line entry after its first line (empty for most entries)."""
+        buffer = self.files[self.row_file[row]].buffer
+        end = self._end(row)
+        newline = buffer.find(b"\n", self.starts[row], end)
+        if newline < 0:
+            return []
+        text = buffer[newline + 1:end].decode('utf-8', errors='ignore').rstrip()
+        return text.splitlines() if text else []
+
+    def time_range(self, start=None, end=None):
+        """First and end row of the entries with `start` <= timestamp < `end` (None: unbounded)."""
+        first = 0 if start is None else bisect_left(self.timestamps, start)
+        last = len(self) if end is None else bisect_left(self.timestamps, end, first)
+        return first, last
+
+    def code_mask(self, column, table, codes):
+        """Return a bytes mask with 1 for every row whose `column` code is in `codes`.
+
+        `table` is the StringTable the codes of `column` refer to.
+        """
+        if len(table) <= 256:
+            # Every code fits in the low byte: translate those bytes in C
+            lookup = bytearray(256)
+            for code in codes:
+                lookup[code] = 1
+            raw = column.tobytes()
+            if column.itemsize > 1:
+                low = 0 if sys.byteorder == "little" else column.itemsize - 1
+                raw = raw[low::column.itemsize]
+            return raw.translate(lookup)
+
+        lookup = bytearray(len(table))
+        for code in codes:
+            lookup[code] = 1
+        return bytes(map(lookup.__getitem__, column))
+
+    @property
+    def has_stations(self):
+        """Whether the logs of named stations were loaded, i.e. rows have a station column."""
+        return len(self.station_table) > 1
+
+    @property
+    def stations(self):
+        """Station code of every row, derived from the file of each row."""
+        return remap_codes(self.row_file, self.file_stations)
+
+    def station_mask(self, codes):
+        """Return a bytes mask with 1 for every row whose station code is in `codes`."""
+        codes = set(codes)
+        # row_file holds file indexes, so the station of each file decides
+        lookup = bytes(code in codes for code in self.file_stations)
+        if len(lookup) <= 256:
+            raw = self.row_file.tobytes()
+            low = 0 if sys.byteorder == "little" else self.row_file.itemsize - 1
+            return raw[low::self.row_file.itemsize].translate(lookup.ljust(256, b"\0"))
+        return bytes(map(lookup.__getitem__, self.row_file))
+
+    def station(self, row):
+        return self.station_table.names[self.file_stations[self.row_file[row]]]
+
+    def level(self, row):
+        return self.level_table.names[self.levels[row]]
+
+    def source(self, row):
+        return self.source_table.names[self.sources[row]]
+
+    def message(self, row):
+        """Decode the message column of `row` with its continuation lines, without surrounding whitespace."""
+        return self._bytes(row, self.starts[row] + self.msg_offsets[row]).decode('utf-8', errors='ignore').strip()
+
+    def format_header(self):
+        """Column names aligned like format_row()."""
+        header = f"{'DateTime':<24} {'Level':<10} {'Source':<25} {'Message'}"
+        if self.has_stations:
+            return f"{'Station':<{self.station_width}} {header}"
+        return header
+
+    def format_row(self, row):
+        """Format the first line of `row` with aligned [Station,] DateTime, Level, Source and Message columns."""
+        start = self.starts[row]
+        msg_start = start + self.msg_offsets[row]
+        if msg_start == start:
+            # Fallback for malformed lines
+            text = self._first_line(row, start).decode('utf-8', errors='ignore').rstrip()
+        else:
+            header = self.files[self.row_file[row]].buffer[start:msg_start]
+            datetime_col = header.split(COLUMN_SEPARATOR, 1)[0].decode('utf-8', errors='ignore').strip()
+            message = self._first_line(row, msg_start).decode('utf-8', errors='ignore').strip()
+            text = f"{datetime_col:<24} {self.level(row):<10} {self.source(row):<25} {message}"
+        if self.has_stations:
+            return f"{self.station(row):<{self.station_width}} {text}"
+        return text
+
+    def command(self, row):
+        """Return only the command/message column of the first line of `row`."""
+        start = self.starts[row]
+        msg_start = start + self.msg_offsets[row]
+        if msg_start == start:
+            return self._first_line(row, start).decode('utf-8', errors='ignore').rstrip()
+        if self.files[self.row_file[row]].buffer[msg_start - len(COLUMN_SEPARATOR):msg_start] != COLUMN_SEPARATOR:
+            # DATE TIME | LEVEL | COMMAND
+            return self.source(row)
+        return self._first_line(row, msg_start).decode('utf-8', errors='ignore').rstrip()
+
+    def close(self):
+        for log_file in self.files:
+            log_file.close()
+        self.files = []
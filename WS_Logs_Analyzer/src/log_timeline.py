@@ -0,0 +1,115 @@
+"""Entry counts per level or source in fixed time buckets, for the timeline panel.
+
+With NumPy installed the counts come from one `bincount` over
+(bucket index * code count + code) computed from the timestamp and code
+columns. Without it the bucket boundaries are bisected in the sorted
+timestamp column and each bucket's codes are counted with a Counter.
+"""
+from bisect import bisect_left
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+TARGET_BUCKETS = 200
+# Bucket widths the timeline picks from, in milliseconds
+BUCKET_STEPS_MS = tuple(s * 1000 for s in (
+    1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400,
+))
+# Group -> (store column, its string table); the station column is derived from the file of each row
+COLUMNS = {
+    "Level": ("levels", "level_table"),
+    "Source": ("sources", "source_table"),
+    "Station": ("stations", "station_table"),
+}
+
+
+def choose_bucket_ms(span_ms, target=TARGET_BUCKETS):
+    """The smallest bucket width giving at most `target` buckets over `span_ms`."""
+    for step in BUCKET_STEPS_MS:
+        if span_ms < step * target:
+            return step
+    days = -(-span_ms // (BUCKET_STEPS_MS[-1] * target))
+    return BUCKET_STEPS_MS[-1] * days
+
+
+def format_duration(ms):
+    """Short label for a bucket width, e.g. "30 s", "5 min", "2 h"."""
+    for unit, unit_ms in (("d", 86400000), ("h", 3600000), ("min", 60000)):
+        if ms >= unit_ms and ms % unit_ms == 0:
+            return f"{ms // unit_ms} {unit}"
+    return f"{ms / 1000:g} s"
+
+
+class Timeline:
+    """Counts of the codes of one column per time bucket.
+
+    `counts[bucket][code]` is the number of entries with `code` whose
+    timestamp lies in [start + bucket * bucket_ms, start + (bucket + 1) * bucket_ms).
+    `names[code]` is the level or source name of a code.
+    """
+
+    def __init__(self, start, bucket_ms, counts, names):
+        self.start = start
+        self.bucket_ms = bucket_ms
+        self.counts = counts
+        self.names = names
+
+    def __len__(self):
+        return len(self.counts)
+
+    def bucket_range(self, bucket):
+        """The [start, end) timestamps of `bucket`."""
+        start = self.start + bucket * self.bucket_ms
+        return start, start + self.bucket_ms
+
+    def totals(self):
+        """Entries per code over the whole timeline."""
+        totals = [0] * len(self.names)
+        for bucket_counts in self.counts:
+            for code, count in enumerate(bucket_counts):
+                totals[code] += count
+        return totals
+
+    def max_bucket_total(self):
+        return max((sum(bucket_counts) for bucket_counts in self.counts), default=0)
+
+
+def build_timeline(store, group_by="Level", bucket_ms=None):
+    """Count the entries of `store` per bucket and per level, source or station (`group_by`)."""
+    column_name, table_name = COLUMNS[group_by]
+    column = getattr(store, column_name)
+    names = list(getattr(store, table_name).names)
+    timestamps = store.timestamps
+    if not len(timestamps):
+        return Timeline(0, bucket_ms or BUCKET_STEPS_MS[0], [], names)
+
+    if np is not None:
+        ts = np.frombuffer(timestamps, dtype=np.int64)
+        first, last = int(ts.min()), int(ts.max())
+    else:
+        # The merged timestamp column is sorted
+        first, last = timestamps[0], timestamps[-1]
+    if bucket_ms is None:
+        bucket_ms = choose_bucket_ms(last - first + 1)
+    start = first - first % bucket_ms
+    bucket_count = (last - start) // bucket_ms + 1
+
+    if np is not None:
+        codes = np.frombuffer(column, dtype=np.uint16).astype(np.int64)
+        keys = (ts - start) // bucket_ms * len(names) + codes
+        flat = np.bincount(keys, minlength=bucket_count * len(names))
+        counts = flat.reshape(bucket_count, len(names)).tolist()
+    else:
+        counts = []
+        lo = 0
+        for bucket in range(bucket_count):
+            hi = bisect_left(timestamps, start + (bucket + 1) * bucket_ms, lo)
+            bucket_counts = [0] * len(names)
+            for code, count in Counter(column[lo:hi]).items():
+                bucket_counts[code] = count
+            counts.append(bucket_counts)
+            lo = hi
+    return Timeline(start, bucket_ms, counts, names)
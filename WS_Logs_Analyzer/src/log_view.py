@@ -0,0 +1,180 @@
+"""Virtualized log view for the Log Viewer tab.
+
+Only the rows that fit in the viewport are formatted and inserted into
+the Text widget; scrolling re-renders that window from the row source,
+so the cost of a redraw does not depend on the size of the result set.
+"""
+import math
+import tkinter as tk
+from tkinter import ttk
+import tkinter.font as tkfont
+
+from src import perf_trace
+
+
+class VirtualLogView(ttk.Frame):
+    """A Text widget with its own scrollbar that renders rows on demand.
+
+    Rows are supplied with `set_rows(row_count, render_row)`, where
+    `render_row(index)` returns the row as a list of (text, tag) segments;
+    `tag` is None for untagged text. Tags are configured on `self.text`.
+    A row may span several lines when its segments contain newlines.
+    `on_row_activate(index)`, if set, is called when a row is double-clicked.
+    """
+
+    def __init__(self, master, font, **kwargs):
+        super().__init__(master, **kwargs)
+        self.font = tkfont.Font(font=font)
+        self.text = tk.Text(self, wrap=tk.NONE, font=font, state="disabled", height=1)
+        self.vscroll = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.hscroll = ttk.Scrollbar(self, orient="horizontal", command=self.text.xview)
+        self.text.configure(xscrollcommand=self.hscroll.set)
+
+        self.text.grid(row=0, column=0, sticky="nsew")
+        self.vscroll.grid(row=0, column=1, sticky="ns")
+        self.hscroll.grid(row=1, column=0, sticky="ew")
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.header_lines = []
+        self.row_count = 0
+        self.top = 0
+        self._render_row = None
+        self._visible_rows = 1
+        # Row index of every rendered text line, below the header
+        self._line_rows = []
+        self.on_row_activate = None
+
+        self.text.bind("<Configure>", self._on_resize)
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda e: self._scroll_by(-3))
+        self.text.bind("<Button-5>", lambda e: self._scroll_by(3))
+        for key, rows in (("<Up>", -1), ("<Down>", 1)):
+            self.text.bind(key, lambda e, rows=rows: self._scroll_by(rows))
+        self.text.bind("<Prior>", lambda e: self._scroll_by(-self._page_rows()))
+        self.text.bind("<Next>", lambda e: self._scroll_by(self._page_rows()))
+        self.text.bind("<Control-Home>", lambda e: self.scroll_to(0))
+        self.text.bind("<Control-End>", lambda e: self.scroll_to(self.row_count))
+        self.text.bind("<Button-1>", lambda e: self.text.focus_set())
+        self.text.bind("<Double-Button-1>", self._on_double_click)
+
+    def set_header(self, lines):
+        """Fixed lines shown above the rows, tagged "header"."""
+        self.header_lines = list(lines)
+        self._visible_rows = self._measure()
+
+    def set_rows(self, row_count, render_row, keep_position=False):
+        """Show `row_count` rows produced by `render_row`, from the top unless `keep_position`."""
+        self.row_count = row_count
+        self._render_row = render_row
+        if not keep_position:
+            self.top = 0
+        self.refresh()
+
+    @property
+    def at_end(self):
+        """Whether the last row is visible, i.e. new rows should be followed."""
+        return self.top + self._page_rows() >= self.row_count
+
+    def scroll_to(self, index):
+        """Make row `index` the first visible row (clamped to the last page)."""
+        self.top = index
+        self.refresh()
+        return "break"
+
+    def _page_rows(self):
+        return max(1, self._visible_rows)
+
+    def _row_lines(self, index):
+        return 1 + sum(segment.count("\n") for segment, _ in self._render_row(index))
+
+    def _clamp(self, top):
+        """`top` limited to the first row of the last page.
+
+        Rows may span several lines, so the last page starts at the first
+        of the last rows whose lines fit in the viewport. That is never
+        before row_count - page rows, so rows are only measured near the end.
+        """
+        last_top = self.row_count - self._page_rows()
+        if top > last_top and self._render_row is not None:
+            lines = 0
+            last_top = self.row_count
+            while last_top > 0:
+                lines += self._row_lines(last_top - 1)
+                if lines > self._page_rows() and last_top < self.row_count:
+                    break
+                last_top -= 1
+        return max(0, min(top, last_top))
+
+    def _scroll_by(self, rows):
+        return self.scroll_to(self.top + rows)
+
+    def _on_mousewheel(self, event):
+        if not event.delta:
+            return "break"
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            return self.scroll_to(int(float(amount) * self.row_count))
+        step = self._page_rows() if unit == "pages" else 1
+        # Tk may pass fractions such as "0.5"; any step moves at least one row
+        rows = float(amount) * step
+        return self._scroll_by(math.ceil(rows) if rows > 0 else math.floor(rows))
+
+    def row_at(self, y):
+        """Index of the row rendered at pixel height `y` of the Text widget, or None."""
+        line = int(self.text.index(f"@0,{y}").split(".")[0]) - 1 - len(self.header_lines)
+        if 0 <= line < len(self._line_rows):
+            return self._line_rows[line]
+        return None
+
+    def _on_double_click(self, event):
+        index = self.row_at(event.y)
+        if index is not None and self.on_row_activate is not None:
+            self.on_row_activate(index)
+        return "break"
+
+    def _measure(self):
+        lines = self.text.winfo_height() // max(1, self.font.metrics("linespace"))
+        return max(1, lines - len(self.header_lines))
+
+    def _on_resize(self, event=None):
+        visible_rows = self._measure()
+        if visible_rows != self._visible_rows:
+            self._visible_rows = visible_rows
+            self.refresh()
+
+    def refresh(self):
+        """Re-render the rows currently in the viewport."""
+        self.top = self._clamp(self.top)
+        end = min(self.row_count, self.top + self._visible_rows)
+        xview = self.text.xview()[0]
+
+        args = []
+        line_rows = []
+        for line in self.header_lines:
+            args += [line + "\n", ("header",)]
+        if self._render_row is not None:
+            with perf_trace.span("format"):
+                for index in range(self.top, end):
+                    lines = 1
+                    for segment, tag in self._render_row(index):
+                        args += [segment, (tag,) if tag else ()]
+                        lines += segment.count("\n")
+                    args += ["\n", ()]
+                    line_rows += [index] * lines
+        self._line_rows = line_rows
+
+        with perf_trace.span("insert"):
+            self.text.config(state="normal")
+            self.text.delete("1.0", tk.END)
+            if args:
+                self.text.insert(tk.END, *args)
+            self.text.config(state="disabled")
+            self.text.xview_moveto(xview)
+
+        if self.row_count:
+            self.vscroll.set(self.top / self.row_count, end / self.row_count)
+        else:
+            self.vscroll.set(0.0, 1.0)
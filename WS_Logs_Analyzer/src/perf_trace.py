@@ -0,0 +1,181 @@
+"""Timing spans for diagnosing slow operations in the field.
+
+A user-level operation (loading logs, applying a filter) is timed with
+`Tracer.operation()`, and its stages with the module-level `span()`
+wherever they run: spans attach to the operation active on the calling
+thread, so code such as LogStore.open is instrumented without passing
+a tracer around, and costs one thread-local lookup when nothing is
+being timed.
+
+Finished operations can be appended to a trace file in the Chrome
+trace event format (a JSON array of "X" events, one per line, that
+chrome://tracing and Perfetto open without the closing bracket). One
+operation at a time can also be run under cProfile.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Environment variable naming a trace file to append every operation to
+TRACE_ENV = "WS_LOGS_TRACE"
+# Functions listed in the text summary saved next to a profile
+PROFILE_TOP_FUNCTIONS = 40
+
+_local = threading.local()
+
+
+def default_profile_dir():
+    """Directory for saved profiles."""
+    return os.path.join(tempfile.gettempdir(), "WS_Logs_Analyzer", "profiles")
+
+
+def format_seconds(seconds):
+    """Short duration label: "850 ms", "2.4 s"."""
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.1f} s"
+
+
+class Operation:
+    """The spans of one timed operation; `seconds` is set once it finishes.
+
+    `spans` holds (name, start, seconds, thread_id) tuples, `start` being
+    a time.perf_counter() value. `profile_path` is the saved cProfile
+    output if the operation was profiled.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.spans = []
+        self.profile_path = None
+
+    def add(self, name, start, seconds):
+        self.spans.append((name, start, seconds, threading.get_ident()))
+
+    def totals(self):
+        """Total seconds and count per span name, in order of first appearance."""
+        totals = {}
+        for name, _, seconds, _ in self.spans:
+            total, count = totals.get(name, (0.0, 0))
+            totals[name] = (total + seconds, count + 1)
+        return totals
+
+    def summary(self):
+        """One line for the status bar, e.g. "Filter 84 ms (bitmaps 3 ms, term 70 ms, insert 6 ms)"."""
+        parts = []
+        for name, (seconds, count) in self.totals().items():
+            parts.append(f"{name} {format_seconds(seconds)}" + (f" x{count}" if count > 1 else ""))
+        text = f"{self.name} {format_seconds(self.seconds or 0.0)}"
+        return f"{text} ({', '.join(parts)})" if parts else text
+
+
+@contextmanager
+def span(name):
+    """Time the with block as stage `name` of the operation running on this thread, if any."""
+    operation = getattr(_local, "operation", None)
+    if operation is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        operation.add(name, start, time.perf_counter() - start)
+
+
+class Tracer:
+    """Times operations, appends them to an optional trace file and profiles them on request."""
+
+    def __init__(self, trace_path=None):
+        self.trace_path = trace_path
+        self._origin = time.perf_counter()
+        self._profile_dir = None
+        self._lock = threading.Lock()
+
+    def profile_next(self, directory=None):
+        """Run the next operation (on any thread) under cProfile, saving the result in `directory`."""
+        with self._lock:
+            self._profile_dir = directory or default_profile_dir()
+
+    def cancel_profile(self):
+        """Drop a profile requested with profile_next() that has not started yet."""
+        with self._lock:
+            self._profile_dir = None
+
+    @property
+    def profile_pending(self):
+        return self._profile_dir is not None
+
+    @contextmanager
+    def operation(self, name):
+        """Time the with block as operation `name` and yield its Operation.
+
+        Inside another operation on the same thread it is timed as a span.
+        """
+        if getattr(_local, "operation", None) is not None:
+            with span(name):
+                yield _local.operation
+            return
+
+        with self._lock:
+            profile_dir, self._profile_dir = self._profile_dir, None
+        profiler = cProfile.Profile() if profile_dir else None
+        operation = Operation(name)
+        _local.operation = operation
+        try:
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler is active on this thread
+                    profiler = None
+            yield operation
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            _local.operation = None
+            operation.seconds = time.perf_counter() - operation.start
+            if profiler is not None:
+                operation.profile_path = self._save_profile(profiler, operation, profile_dir)
+            if self.trace_path:
+                self._write_trace(operation)
+
+    def _save_profile(self, profiler, operation, directory):
+        """Save the profile as NAME-TIME.prof plus a .txt of the top functions; return the .prof path."""
+        try:
+            os.makedirs(directory, exist_ok=True)
+            stem = os.path.join(directory, f"{operation.name.lower().replace(' ', '_')}-{time.strftime('%Y%m%d-%H%M%S')}")
+            profiler.dump_stats(stem + ".prof")
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            with open(stem + ".txt", 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+        except OSError:
+            return None
+        return stem + ".prof"
+
+    def _event(self, name, category, start, seconds, thread_id):
+        return {
+            "name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread_id,
+            "ts": round((start - self._origin) * 1e6), "dur": round(seconds * 1e6),
+        }
+
+    def _write_trace(self, operation):
+        events = [self._event(operation.name, "operation", operation.start, operation.seconds, threading.get_ident())]
+        events += [self._event(name, operation.name, start, seconds, thread_id)
+                   for name, start, seconds, thread_id in operation.spans]
+        text = "".join(json.dumps(event) + ",\n" for event in events)
+        try:
+            with self._lock, open(self.trace_path, 'a', encoding='utf-8') as f:
+                if f.tell() == 0:
+                    f.write("[\n")
+                f.write(text)
+        except OSError:
+            # Tracing never breaks the operation it observes
+            pass
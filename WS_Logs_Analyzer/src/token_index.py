@@ -0,0 +1,124 @@
+"""Inverted token index for substring search over a LogStore.
+
+Rows are grouped in blocks of BLOCK_ROWS consecutive rows and every
+alphanumeric token of the lowercased line text is mapped to the blocks
+containing it. A row that contains a search term contains each
+alphanumeric piece of the term inside one of its tokens, so a query
+intersects, per piece, the blocks of all tokens containing that piece.
+Only rows in the surviving blocks are decoded and verified.
+
+Indexing blocks of tokens rather than rows of trigrams keeps the index
+to about ten bytes per line and the build to a few microseconds per line.
+"""
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+from src import log_store
+
+BLOCK_ROWS = 64
+TOKEN_PATTERN = re.compile(rb"[a-z0-9_]+")
+# A piece found in more distinct tokens than this is not selective enough to use.
+MAX_TOKENS_PER_PIECE = 2000
+
+
+class TokenIndex:
+    """Maps lowercased line tokens to the row blocks that contain them."""
+
+    def __init__(self, store, progress=None, cancel=None):
+        """Index every row of `store`.
+
+        `progress(rows_indexed, total_rows)` is called periodically and
+        setting the `cancel` event raises log_store.LoadCancelled.
+        """
+        self.store = store
+        self.generation = store.generation
+        self.row_count = len(store)
+        # Blocks with a row whose text grew after indexing (see invalidate())
+        self._changed_blocks = set()
+        self.block_rows = block_rows = BLOCK_ROWS
+        self.postings = {}
+        report_every = max(1, log_store.PROGRESS_INTERVAL // block_rows)
+        for block, first in enumerate(range(0, self.row_count, block_rows)):
+            if block % report_every == 0 and block:
+                if cancel is not None and cancel.is_set():
+                    raise log_store.LoadCancelled()
+                if progress is not None:
+                    progress(first, self.row_count)
+            rows = range(first, min(first + block_rows, self.row_count))
+            text = b"\n".join(store.line_bytes(row) for row in rows).lower()
+            for token in set(TOKEN_PATTERN.findall(text)):
+                posting = self.postings.get(token)
+                if posting is None:
+                    posting = self.postings[token] = array('I')
+                posting.append(block)
+
+        # All tokens in one buffer so a piece is located with one C-level search
+        self._tokens = list(self.postings)
+        self._vocabulary = b"\n".join(self._tokens)
+        self._token_starts = array('Q')
+        offset = 0
+        for token in self._tokens:
+            self._token_starts.append(offset)
+            offset += len(token) + 1
+
+    def covers(self, store):
+        """Whether the index still describes the rows of `store`, i.e. they were not renumbered."""
+        return store is self.store and store.generation == self.generation
+
+    def invalidate(self, row):
+        """Make `row`, whose text changed after indexing, a candidate of every search."""
+        if row < self.row_count:
+            self._changed_blocks.add(row // self.block_rows)
+
+    @staticmethod
+    def supports(term):
+        """Whether the index can narrow a search for `term`."""
+        return term.isascii() and TOKEN_PATTERN.search(term.lower().encode('ascii')) is not None
+
+    def _blocks_containing(self, piece):
+        """Blocks with a token containing `piece`, or None if the piece is not selective."""
+        token_ids = set()
+        for match in re.finditer(re.escape(piece), self._vocabulary):
+            token_ids.add(bisect_right(self._token_starts, match.start()) - 1)
+            if len(token_ids) > MAX_TOKENS_PER_PIECE:
+                return None
+        blocks = set()
+        for token_id in token_ids:
+            blocks.update(self.postings[self._tokens[token_id]])
+        return blocks
+
+    def _candidate_blocks(self, term):
+        """Blocks that may contain `term`, or None if every block may."""
+        pieces = set(TOKEN_PATTERN.findall(term.lower().encode('ascii')))
+        blocks = None
+        # Longer pieces are usually the most selective
+        for piece in sorted(pieces, key=len, reverse=True):
+            piece_blocks = self._blocks_containing(piece)
+            if piece_blocks is None:
+                continue
+            blocks = piece_blocks if blocks is None else blocks & piece_blocks
+            if not blocks:
+                break
+        return blocks
+
+    def candidates(self, term, rows):
+        """Yield the rows of sorted `rows` that may contain `term` (case-insensitive).
+
+        Every row containing `term` is yielded; the caller verifies them.
+        Rows appended to the store after indexing, and the blocks of
+        invalidated rows, are always candidates.
+        """
+        indexed_end = bisect_left(rows, self.row_count)
+        blocks = self._candidate_blocks(term)
+        if blocks is not None:
+            blocks |= self._changed_blocks
+        if blocks is None:
+            yield from rows[:indexed_end]
+        else:
+            for block in sorted(blocks):
+                first = block * self.block_rows
+                i = bisect_left(rows, first, 0, indexed_end)
+                end = bisect_left(rows, first + self.block_rows, i, indexed_end)
+                yield from rows[i:end]
+        yield from rows[indexed_end:]
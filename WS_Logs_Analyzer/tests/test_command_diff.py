@@ -0,0 +1,138 @@
+"""Test suite for the run-to-run command stream diff."""
+import io
+import os
+import random
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import command_diff, log_cli, log_filter, log_store
+
+INSTR = "TCPIP0::10.1.53.153::hislip0::INSTR"
+RUN_A = (
+    f"2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - {INSTR} <-- CONF:FREQ 1e9\n"
+    f"2025-11-26 11:28:31,100 - DEBUG - Ieee488Connection - {INSTR} <-- *OPC?\n"
+    f"2025-11-26 11:28:31,150 - DEBUG - Ieee488Connection - {INSTR} --> 1\n"
+    f"2025-11-26 11:28:31,200 - DEBUG - Ieee488Connection - {INSTR} <-- FETCh:DUT:POWer?\n"
+    f"2025-11-26 11:28:31,300 - INFO - Engine - Step done\n"
+    f"2025-11-26 11:28:31,300 - DEBUG - Ieee488Connection - {INSTR} <-- SYST:ERR?\n"
+    f"2025-11-26 11:28:31,400 - DEBUG - Ieee488Connection - {INSTR} <-- *RST\n"
+    f"2025-11-26 11:28:31,500 - INFO - Engine - Done\n"
+)
+# Polls *OPC? twice, FETCh takes 400 ms longer and SYST:ERR? is not sent
+RUN_B = (
+    f"2025-11-26 12:00:00,000 - DEBUG - Ieee488Connection - {INSTR} <-- CONF:FREQ 1e9\n"
+    f"2025-11-26 12:00:00,100 - DEBUG - Ieee488Connection - {INSTR} <-- *OPC?\n"
+    f"2025-11-26 12:00:00,300 - DEBUG - Ieee488Connection - {INSTR} <-- *OPC?\n"
+    f"2025-11-26 12:00:00,400 - DEBUG - Ieee488Connection - {INSTR} <-- FETCh:DUT:POWer?\n"
+    f"2025-11-26 12:00:00,900 - DEBUG - Ieee488Connection - {INSTR} <-- *RST\n"
+    f"2025-11-26 12:00:01,000 - INFO - Engine - Done\n"
+)
+
+
+def _lcs_length(a, b):
+    previous = [0] * (len(b) + 1)
+    for item in a:
+        current = [0]
+        for j, other in enumerate(b):
+            current.append(previous[j] + 1 if item == other else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def test_matching_blocks_align_equal_runs():
+    """Test blocks are valid, minimal within the cost limit and merged, also with the shortcuts."""
+    assert command_diff.matching_blocks([1, 2, 3, 4], [1, 2, 9, 3, 4]) == [(0, 0, 2), (2, 3, 2)]
+    assert command_diff.matching_blocks([], [1]) == [] and command_diff.matching_blocks([1], [1]) == [(0, 0, 1)]
+
+    generator = random.Random(7)
+    for _ in range(300):
+        alphabet = generator.randint(1, 6)
+        a = [generator.randrange(alphabet) for _ in range(generator.randint(0, 30))]
+        b = [generator.randrange(alphabet + 2) for _ in range(generator.randint(0, 30))]
+        for max_cost in (command_diff.DIFF_MAX_COST, 2, 1):
+            blocks = command_diff.matching_blocks(a, b, max_cost)
+            i_end = j_end = 0
+            for i, j, size in blocks:
+                assert size > 0 and i >= i_end and j >= j_end and a[i:i + size] == b[j:j + size]
+                i_end, j_end = i + size, j + size
+            if max_cost == command_diff.DIFF_MAX_COST:
+                assert sum(size for _, _, size in blocks) == _lcs_length(a, b), (a, b)
+
+    # A long stream with scattered polls is split at its unique commands
+    a = [f"CONF:FREQ {n}" if n % 10 == 0 else "*OPC?" if n % 2 else "INIT" for n in range(5000)]
+    b = list(a)
+    for n in range(4000, 0, -500):
+        b.insert(n, "*OPC?")
+    del b[2500]
+    assert sum(size for _, _, size in command_diff.matching_blocks(a, b, 8)) == len(a) - 1
+    print("✓ test_matching_blocks_align_equal_runs passed")
+
+
+def test_diff_of_two_runs():
+    """Test inserted and removed commands and the time lost per step, command and stretch."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for name, content in (("a", RUN_A), ("b", RUN_B)):
+            os.makedirs(os.path.join(tmp, name))
+            paths.append(os.path.join(tmp, name, "application.log"))
+            with open(paths[-1], 'w', encoding='utf-8') as f:
+                f.write(content)
+
+        stores = [log_store.LogStore.open([path]) for path in paths]
+        try:
+            diff = command_diff.diff_stores(*stores)
+            assert diff.a.commands == ["CONF:FREQ 1e9", "*OPC?", "FETCh:DUT:POWer?", "SYST:ERR?", "*RST"]
+            assert list(diff.a.durations) == [100, 100, 100, 100, 100]
+            assert list(diff.b.rows) == [0, 1, 2, 3, 4]
+            assert diff.aligned == 4
+            # The first poll of run B is aligned with the one of run A
+            assert list(diff.stretches()) == [(100, 2, 2, 2, 3), (-100, 3, 4, 4, 4)]
+
+            steps = sorted(diff.steps(), key=lambda step: -step.lost_ms)
+            assert steps[0] == (400, "FETCh:DUT:POWer?", 2, 3)
+            assert (100, "*OPC?", 1, 1) in steps and (100, "*OPC?", None, 2) in steps
+            assert steps[-1] == (-100, "SYST:ERR?", 3, None)
+            assert sum(step.lost_ms for step in steps) == sum(diff.b.durations) - sum(diff.a.durations)
+            assert diff.by_command()[0] == ["FETCh:DUT:POWer?", 400, 1, 0, 0]
+            assert ["*OPC?", 200, 1, 0, 1] in diff.by_command()
+
+            report = diff.report()
+            assert report[1] == "Run B: 5 commands in 1.0 s, +0.5 s (+100.0%)"
+            assert report[2] == "Aligned: 4, only in A: 1, only in B: 1"
+            text = "\n".join(report)
+            assert "     +400 ms  A 2025-11-26 11:28:31,200  B 2025-11-26 12:00:00,400  FETCh:DUT:POWer?" in text
+            assert "only in A" in text
+
+            # The run comparison on a worker thread gives the same diff
+            comparer = command_diff.RunComparer([paths[0]], diff.b)
+            comparer.start()
+            comparer.join()
+            [(kind, payload)] = comparer.poll()
+            assert kind == "done" and payload.blocks == diff.blocks
+
+            # Run A is filtered like run B, its time bounds moved to its own date
+            spec = log_filter.FilterSpec(start=log_store.parse_time("2025-11-27 11:28:31,100"), stations=("b",))
+            comparer = command_diff.RunComparer([paths[0]], diff.b, "^[^*]", spec=spec,
+                                                reference=log_store.parse_time("2025-11-27 12:00:00"))
+            comparer.start()
+            comparer.join()
+            [(kind, payload)] = comparer.poll()
+            assert kind == "done" and payload.a.commands == ["FETCh:DUT:POWer?", "SYST:ERR?"]
+        finally:
+            for store in stores:
+                store.close()
+
+        out = io.BytesIO()
+        assert log_cli.diff_runs(*paths, out, start="11:28:31,100").aligned == 3
+        assert out.getvalue().decode('utf-8').splitlines()[3] == "Run A: 4 commands in 0.4 s"
+        output = os.path.join(tmp, "diff.txt")
+        assert log_cli.main([os.path.dirname(path) for path in paths] + ["--diff", "-o", output, "--no-cache"]) == 0
+        with open(output, encoding='utf-8') as f:
+            assert "Aligned: 4, only in A: 1, only in B: 1" in f.read()
+        print("✓ test_diff_of_two_runs passed")
+
+
+if __name__ == '__main__':
+    test_matching_blocks_align_equal_runs()
+    test_diff_of_two_runs()
+    print("\nAll tests passed!")
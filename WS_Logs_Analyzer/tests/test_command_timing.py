@@ -0,0 +1,75 @@
+"""Test suite for the SCPI command latency analyzer."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import command_timing, log_store
+
+INSTR_A = "TCPIP0::10.1.53.153::hislip0::INSTR"
+INSTR_B = "TCPIP0::10.1.53.154::hislip0::INSTR"
+LOG_CONTENT = (
+    f"2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - {INSTR_A} <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    f"2025-11-26 11:28:31,005 - DEBUG - Ieee488Connection - {INSTR_B} <-- CONF:FREQ 1e9\n"
+    f"2025-11-26 11:28:31,010 - INFO - Engine - Step Fetch started\n"
+    f"2025-11-26 11:28:31,040 - DEBUG - Ieee488Connection - {INSTR_A} --> CONN\n"
+    f"2025-11-26 11:28:31,050 - DEBUG - Ieee488Connection - {INSTR_B} <-- *OPC?\n"
+    f"2025-11-26 11:28:31,300 - DEBUG - Ieee488Connection - {INSTR_B} --> 1\n"
+    f"2025-11-26 11:28:31,400 - DEBUG - Ieee488Connection - {INSTR_A} <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    f"2025-11-26 11:28:31,410 - DEBUG - Ieee488Connection - {INSTR_A} --> IDLE\n"
+    f"2025-11-26 11:28:31,500 - DEBUG - Ieee488Connection - {INSTR_A} <-- *RST\n"
+)
+
+
+def _open_store(tmp):
+    path = os.path.join(tmp, "application.log")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(LOG_CONTENT)
+    return log_store.LogStore.open([path])
+
+
+def test_commands_are_paired_per_address():
+    """Test latencies, unanswered writes, percentiles and the slowest calls."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            analyzer = command_timing.analyze_store(store, slowest=2)
+        finally:
+            store.close()
+
+        fetch = analyzer.stats["FETCh:DUT:MODem:STATe:RRC?"]
+        assert list(fetch.latencies) == [40, 10]
+        assert fetch.percentile(50) == 10 and fetch.percentile(99) == 40
+        assert fetch.histogram[command_timing.HISTOGRAM_EDGES_MS.index(10)] == 1
+        assert analyzer.stats["*OPC?"].total_ms == 250
+        assert analyzer.stats["CONF:FREQ"].unanswered == 1
+        assert analyzer.stats["*RST"].unanswered == 1
+        assert analyzer.traffic_lines == 8
+
+        slowest = analyzer.slowest()
+        assert [(call.latency_ms, call.command) for call in slowest] == [
+            (250, "*OPC?"), (40, "FETCh:DUT:MODem:STATe:RRC?")]
+        assert slowest[0].row == 4 and slowest[0].response_row == 5
+        assert [s.command for s in analyzer.by_total_time()][:2] == ["*OPC?", "FETCh:DUT:MODem:STATe:RRC?"]
+        report = "\n".join(analyzer.report())
+        assert "2025-11-26 11:28:31,050" in report
+        print("✓ test_commands_are_paired_per_address passed")
+
+
+def test_command_pattern_and_row_subset():
+    """Test only matching commands are counted and a row subset can be analysed."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            analyzer = command_timing.analyze_store(store, command_pattern=r"^FETC")
+            assert list(analyzer.stats) == ["FETCh:DUT:MODem:STATe:RRC?"]
+            analyzer = command_timing.analyze_store(store, rows=range(6, 9))
+            assert list(analyzer.stats["FETCh:DUT:MODem:STATe:RRC?"].latencies) == [10]
+        finally:
+            store.close()
+        print("✓ test_command_pattern_and_row_subset passed")
+
+
+if __name__ == '__main__':
+    test_commands_are_paired_per_address()
+    test_command_pattern_and_row_subset()
+    print("\nAll tests passed!")
@@ -0,0 +1,82 @@
+"""Test suite for the on-disk index cache."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import index_cache, log_store
+
+CURRENT_LOG = (
+    "2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    "2025-11-26 11:28:32,000 - INFO - Engine - Measurement done\n"
+)
+ROTATED_LOG = (
+    "2025-11-26 10:00:00,000 - ERROR - Engine - fetch failed\n"
+    "2025-11-26 10:00:01,000 - TRACE - Scheduler - tick\n"
+)
+
+
+def _write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def _columns(store):
+    return [(store.line(row), store.level(row), store.source(row), store.timestamps[row])
+            for row in range(len(store))]
+
+
+def test_cached_columns_match_parsed_columns():
+    """Test reopening reads unchanged files from the cache and re-interns their codes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        current = os.path.join(tmp, "application.log")
+        rotated = os.path.join(tmp, "application.log.1")
+        _write(current, CURRENT_LOG)
+        _write(rotated, ROTATED_LOG)
+        cache = index_cache.IndexCache(os.path.join(tmp, "cache"))
+
+        store = log_store.LogStore.open([current, rotated])
+        expected = _columns(store)
+        store.close()
+
+        store = log_store.LogStore.open([current, rotated], cache=cache)
+        assert not any(f.from_cache for f in store.files)
+        store.close()
+
+        # Opening in another order gives other codes to the same names
+        store = log_store.LogStore.open([rotated, current], cache=cache)
+        try:
+            assert all(f.from_cache for f in store.files)
+            assert _columns(store) == expected
+            assert store.level_table.names[store.levels[0]] == "ERROR"
+        finally:
+            store.close()
+        print("✓ test_cached_columns_match_parsed_columns passed")
+
+
+def test_changed_file_is_parsed_again():
+    """Test a file whose size or mtime changed misses the cache, and the cache is pruned."""
+    with tempfile.TemporaryDirectory() as tmp:
+        current = os.path.join(tmp, "application.log")
+        _write(current, CURRENT_LOG)
+        cache = index_cache.IndexCache(os.path.join(tmp, "cache"))
+        log_store.LogStore.open([current], cache=cache).close()
+
+        with open(current, 'a', encoding='utf-8') as f:
+            f.write("2025-11-26 11:28:33,000 - INFO - Engine - appended\n")
+        store = log_store.LogStore.open([current], cache=cache)
+        try:
+            assert not store.files[0].from_cache
+            assert len(store) == 3
+        finally:
+            store.close()
+
+        cache.max_bytes = 0
+        cache.prune()
+        assert os.listdir(cache.directory) == []
+        print("✓ test_changed_file_is_parsed_again passed")
+
+
+if __name__ == '__main__':
+    test_cached_columns_match_parsed_columns()
+    test_changed_file_is_parsed_again()
+    print("\nAll tests passed!")
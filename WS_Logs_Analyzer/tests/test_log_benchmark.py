@@ -0,0 +1,85 @@
+"""Test suite for the synthetic log generator and the benchmark harness."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import command_timing
+from src import log_benchmark
+from src import log_generator
+from src import log_store
+
+
+def test_generated_logs_load_like_real_rotations():
+    """Test the generator writes time-ordered rotations with the requested mix, traffic and traces."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = log_generator.generate_logs(
+            tmp, 200_000, rotations=2, compress=True, level_mix={"INFO": 1, "ERROR": 1},
+            traffic_ratio=0.4, trace_ratio=1.0, seed=7)
+        names = log_store.find_log_files(tmp)
+        assert names == ["application.log", "application.log.1.gz", "application.log.2.gz"]
+        assert [os.path.join(tmp, name) for name in names] == paths
+
+        store = log_store.LogStore.open(paths)
+        try:
+            assert store.total_size >= 200_000
+            # Rotations cover consecutive time spans, oldest in the highest number
+            assert list(store.timestamps) == sorted(store.timestamps)
+            assert store.row_file[0] == 2 and store.row_file[len(store) - 1] == 0
+            assert set(store.level_table.names) == {"", "INFO", "ERROR", "DEBUG"}
+            errors = [row for row in range(len(store)) if store.level(row) == "ERROR"]
+            assert errors and all(store.continuation(row)[0].startswith("Traceback") for row in errors)
+
+            analyzer = command_timing.analyze_store(store)
+            assert analyzer.traffic_lines > len(store) // 4
+            assert analyzer.stats["FETCh:DUT:MODem:STATe:RRC?"].count > 0
+        finally:
+            store.close()
+
+        again = os.path.join(tmp, "again")
+        log_generator.generate_logs(again, 20_000, traffic_ratio=0.4, seed=7)
+        with open(os.path.join(again, "application.log"), 'rb') as f:
+            first = f.read()
+        log_generator.generate_logs(again, 20_000, traffic_ratio=0.4, seed=7)
+        with open(os.path.join(again, "application.log"), 'rb') as f:
+            assert f.read() == first
+        print("✓ test_generated_logs_load_like_real_rotations passed")
+
+
+def test_run_case_reports_every_stage():
+    """Test a small case times every stage and formats a report line for each."""
+    with tempfile.TemporaryDirectory() as tmp:
+        options = dict(level_mix=log_generator.DEFAULT_LEVEL_MIX, traffic_ratio=0.3, trace_ratio=0.5, seed=1)
+        paths = log_benchmark.prepare_case(tmp, "64K", 1, False, options)
+        assert log_benchmark.prepare_case(tmp, "64K", 1, False, options) == paths
+
+        results = log_benchmark.run_case(paths, display_rows=100, export_rows=100, export_dir=tmp)
+        names = [result.name for result in results]
+        assert names[:4] == ["load", "merge", "load cached", "merge cached"]
+        assert all(name in names for name, _ in log_benchmark.FILTERS)
+        assert all(f"export {fmt}" in names for fmt in ("raw", "aligned", "csv", "jsonl"))
+        by_name = {result.name: result for result in results}
+        rows = by_name["merge"].rows
+        assert rows > 0 and by_name["load"].rows == rows == by_name["load cached"].rows
+        assert by_name["load"].seconds > 0 and by_name["merge cached"].seconds > 0
+        assert by_name["filter term"].matches == by_name["filter term indexed"].matches
+        assert by_name["filter term refined"].matches <= by_name["filter term"].matches
+        assert by_name["display"].rows == 100 and by_name["export csv"].size > 0
+
+        uncached = log_benchmark.run_case(paths, display_rows=0, export_rows=0, export_dir=tmp, cache=False)
+        assert [result.name for result in uncached][:3] == ["load", "merge", "filter bitmaps"]
+
+        # Compressed rotations count their text bytes, like plain files
+        packed = log_benchmark.prepare_case(tmp, "64K", 1, True, options)
+        load = log_benchmark.run_case(packed, display_rows=0, export_rows=0, export_dir=tmp, cache=False)[0]
+        assert load.size == by_name["load"].size > sum(os.path.getsize(path) for path in packed)
+
+        report = log_benchmark.format_report("64K-r1", results)
+        assert report[0] == "Case 64K-r1" and len(report) == len(results) + 3
+        assert log_benchmark.parse_size("1.5G") == 3 * 1024 ** 3 // 2
+        print("✓ test_run_case_reports_every_stage passed")
+
+
+if __name__ == '__main__':
+    test_generated_logs_load_like_real_rotations()
+    test_run_case_reports_every_stage()
+    print("\nAll tests passed!")
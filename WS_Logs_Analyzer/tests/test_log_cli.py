@@ -0,0 +1,133 @@
+"""Test suite for the headless command-line mode."""
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_cli
+
+CURRENT_LOG = (
+    "2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    "2025-11-26 11:29:00,000 - INFO - Engine - Measurement done\n"
+    "2025-11-26 11:30:00,000 - ERROR - Ieee488Connection - fetch timeout\n"
+)
+ROTATED_LOG = "2025-11-26 10:00:00,000 - DEBUG - Engine - fetch started\n"
+
+
+def _write_logs(directory):
+    os.makedirs(directory)
+    with open(os.path.join(directory, "application.log"), 'w', encoding='utf-8') as f:
+        f.write(CURRENT_LOG)
+    with open(os.path.join(directory, "application.log.1"), 'w', encoding='utf-8') as f:
+        f.write(ROTATED_LOG)
+    with open(os.path.join(directory, "other.txt"), 'w', encoding='utf-8') as f:
+        f.write(ROTATED_LOG)
+
+
+def test_scan_filters_merged_directory():
+    """Test level, source, term and time filters over a merged directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        station = os.path.join(tmp, "station1")
+        _write_logs(station)
+
+        out = io.BytesIO()
+        assert log_cli.scan(station, out, term="FETCH") == 3
+        assert out.getvalue().decode('utf-8').splitlines()[0] == ROTATED_LOG.rstrip()
+
+        out = io.BytesIO()
+        assert log_cli.scan(station, out, levels=["debug", "ERROR"], source="Ieee488Connection",
+                            start="11:28:31", end="11:30") == 1
+        assert out.getvalue().decode('utf-8') == CURRENT_LOG.splitlines(keepends=True)[0]
+
+        out = io.BytesIO()
+        assert log_cli.scan(station, out, "jsonl", start="2025-11-26 11:29") == 2
+        records = [json.loads(line) for line in out.getvalue().decode('utf-8').splitlines()]
+        assert records[1] == {
+            "file": os.path.join(station, "application.log"),
+            "timestamp": "2025-11-26 11:30:00,000",
+            "level": "ERROR",
+            "source": "Ieee488Connection",
+            "message": "fetch timeout",
+        }
+        print("✓ test_scan_filters_merged_directory passed")
+
+
+def test_scan_all_keeps_path_order_in_parallel():
+    """Test several directories are scanned in worker processes and written in order."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stations = [os.path.join(tmp, f"station{i}") for i in range(3)]
+        for station in stations:
+            _write_logs(station)
+        missing = os.path.join(tmp, "missing")
+
+        out = io.BytesIO()
+        results = log_cli.scan_all(stations + [missing], out, jobs=2, levels=["ERROR"])
+        assert [(path, count) for path, count, _ in results] == [(s, 1) for s in stations] + [(missing, 0)]
+        assert results[-1][2] is not None
+        assert out.getvalue().decode('utf-8').splitlines() == [f"{s}:{CURRENT_LOG.splitlines()[2]}" for s in stations]
+        print("✓ test_scan_all_keeps_path_order_in_parallel passed")
+
+
+def test_corrupt_archives_are_reported_per_path():
+    """Test a truncated .gz or corrupt .zip rotation fails only the scan of its directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stations = [os.path.join(tmp, f"station{i}") for i in range(3)]
+        for station in stations:
+            _write_logs(station)
+        with gzip.open(os.path.join(stations[0], "application.log.2.gz"), 'wb') as f:
+            f.write(ROTATED_LOG.encode('utf-8') * 100)
+        with open(os.path.join(stations[0], "application.log.2.gz"), 'r+b') as f:
+            f.truncate(30)
+        with open(os.path.join(stations[1], "application.log.2.zip"), 'wb') as f:
+            f.write(b"PK\x03\x04 not a zip archive")
+
+        for jobs in (1, 2):
+            out = io.BytesIO()
+            results = log_cli.scan_all(stations, out, jobs=jobs, levels=["ERROR"])
+            assert [(path, count) for path, count, _ in results] == [(stations[0], 0), (stations[1], 0),
+                                                                     (stations[2], 1)]
+            assert all("Corrupt archive" in str(error) for _, _, error in results[:2])
+        print("✓ test_corrupt_archives_are_reported_per_path passed")
+
+
+def test_merge_stations():
+    """Test --merge interleaves the stations by time and filters and exports their station."""
+    with tempfile.TemporaryDirectory() as tmp:
+        stations = [os.path.join(tmp, f"station{i}") for i in range(2)]
+        for station in stations:
+            _write_logs(station)
+
+        out = io.BytesIO()
+        assert log_cli.merge_scan(stations, out, "csv", term="fetch") == 6
+        rows = out.getvalue().decode('utf-8').splitlines()
+        assert rows[0] == "station,timestamp,level,source,message,file"
+        assert [row.split(",")[0] for row in rows[1:]] == ["station0", "station1"] * 3
+        assert rows[1].startswith('station0,"2025-11-26 10:00:00,000"')
+
+        out = io.BytesIO()
+        assert log_cli.merge_scan(stations, out, term="fetch", query="-station:station0 level:ERROR") == 1
+        assert out.getvalue().decode('utf-8') == f"station1:{CURRENT_LOG.splitlines()[2]}\n"
+
+        output = os.path.join(tmp, "merged.log")
+        assert log_cli.main(stations + ["--merge", "--station", "station0", "-l", "INFO", "-o", output,
+                                        "--no-cache"]) == 0
+        with open(output, encoding='utf-8') as f:
+            assert f.read() == f"station0:{CURRENT_LOG.splitlines()[1]}\n"
+
+        # Without --merge no row has a station, so --station is refused
+        try:
+            log_cli.parse_args(stations + ["--station", "station0"])
+            assert False, "Expected a usage error"
+        except SystemExit as error:
+            assert error.code == 2
+        print("✓ test_merge_stations passed")
+
+
+if __name__ == '__main__':
+    test_scan_filters_merged_directory()
+    test_scan_all_keeps_path_order_in_parallel()
+    test_corrupt_archives_are_reported_per_path()
+    test_merge_stations()
+    print("\nAll tests passed!")
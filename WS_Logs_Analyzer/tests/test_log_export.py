@@ -0,0 +1,95 @@
+"""Test suite for exporting filtered rows."""
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_export, log_store
+
+LOG_CONTENT = (
+    "2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    "2025-11-26 11:28:31,100 - INFO - Engine - Measurement, \"quoted\" done\n"
+    "2025-11-26 11:28:31,200 - ERROR - Engine - fetch timeout"
+)
+
+
+def _open_store(tmp):
+    path = os.path.join(tmp, "application.log")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(LOG_CONTENT)
+    return log_store.LogStore.open([path])
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def test_export_formats():
+    """Test raw, aligned, CSV and JSONL exports written in several chunks."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        original_chunk = log_export.EXPORT_CHUNK_ROWS
+        log_export.EXPORT_CHUNK_ROWS = 2
+        try:
+            rows = [0, 1, 2]
+            progress = []
+            raw = os.path.join(tmp, "out.log")
+            assert log_export.export_rows(store, rows, raw, progress=lambda *p: progress.append(p)) == 3
+            assert _read(raw) == LOG_CONTENT + "\n"
+            assert progress == [(2, 3), (3, 3)]
+
+            aligned = os.path.join(tmp, "out.txt")
+            log_export.export_rows(store, rows[1:], aligned)
+            lines = _read(aligned).splitlines()
+            assert lines[0].startswith("DateTime") and lines[1] == "-" * 120
+            assert lines[2:] == [store.format_row(1), store.format_row(2)]
+
+            csv_path = os.path.join(tmp, "out.csv")
+            log_export.export_rows(store, rows, csv_path)
+            with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+                records = list(csv.DictReader(f))
+            assert records[1]["message"] == 'Measurement, "quoted" done'
+            assert records[2]["timestamp"] == "2025-11-26 11:28:31,200"
+
+            jsonl = os.path.join(tmp, "out.jsonl")
+            log_export.export_rows(store, rows, jsonl)
+            records = [json.loads(line) for line in _read(jsonl).splitlines()]
+            assert [r["level"] for r in records] == ["DEBUG", "INFO", "ERROR"]
+            assert records[0]["file"] == os.path.join(tmp, "application.log")
+        finally:
+            log_export.EXPORT_CHUNK_ROWS = original_chunk
+            store.close()
+        print("✓ test_export_formats passed")
+
+
+def test_cancelled_export_removes_file():
+    """Test the worker reports completion, and a cancelled export leaves no partial file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            path = os.path.join(tmp, "out.jsonl")
+            exporter = log_export.LogExporter(store, [0, 2], path)
+            exporter.start()
+            exporter.join()
+            assert exporter.poll()[-1] == ("done", 2)
+
+            cancel = threading.Event()
+            cancel.set()
+            try:
+                log_export.export_rows(store, [0, 1], path, cancel=cancel)
+                assert False, "export was not cancelled"
+            except log_export.ExportCancelled:
+                pass
+            assert not os.path.exists(path)
+        finally:
+            store.close()
+        print("✓ test_cancelled_export_removes_file passed")
+
+
+if __name__ == '__main__':
+    test_export_formats()
+    test_cancelled_export_removes_file()
+    print("\nAll tests passed!")
@@ -0,0 +1,195 @@
+"""Test suite for the log_filter module."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_filter, log_store, token_index
+
+LOG_CONTENT = (
+    "2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    "2025-11-26 11:28:31,100 - Engine - Engine - Step Fetch started\n"
+    "2025-11-26 11:28:31,200 - INFO - Engine - Measurement done\n"
+    "2025-11-26 11:28:31,300 - ERROR - Ieee488Connection - fetch timeout\n"
+    "2025-11-26 11:28:31,400 - WARNING - Engine - ignored level\n"
+)
+ALL_LEVELS = ("TRACE", "ENGINE", "DEBUG", "INFO", "ERROR")
+
+
+def _open_store(tmp):
+    path = os.path.join(tmp, "application.log")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(LOG_CONTENT)
+    return log_store.LogStore.open([path])
+
+
+def test_structural_filters():
+    """Test level and Engine-source filtering on the parsed columns."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            rows = log_filter.LogFilter(store).rows
+            assert list(rows(log_filter.FilterSpec(levels=ALL_LEVELS))) == [0, 1, 2, 3]
+            assert list(rows(log_filter.FilterSpec())) == [0, 1, 2, 3, 4]
+            assert list(rows(log_filter.FilterSpec(levels=()))) == []
+            assert list(rows(log_filter.FilterSpec(levels=("engine",)))) == [1]
+            assert list(rows(log_filter.FilterSpec(levels=ALL_LEVELS, engine_only=True))) == [1, 2]
+            # One bit per row
+            bitmaps = log_filter.LogFilter(store).bitmaps
+            assert bitmaps.levels([store.level_table.code("ERROR")]) == 0b1000 and bitmaps.span(1, 3) == 0b110
+        finally:
+            store.close()
+        print("✓ test_structural_filters passed")
+
+
+def test_time_range_composes_with_other_filters():
+    """Test [start, end) time ranges are bisected and combined with level and term filters."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            rows = log_filter.LogFilter(store).rows
+            start = log_store.parse_time("11:28:31,100", store.timestamps[0])
+            end = log_store.parse_time("2025-11-26 11:28:31,400")
+            assert store.time_range(start, end) == (1, 4)
+            assert list(rows(log_filter.FilterSpec(start=start, end=end))) == [1, 2, 3]
+            assert list(rows(log_filter.FilterSpec(start=start))) == [1, 2, 3, 4]
+            assert list(rows(log_filter.FilterSpec(levels=ALL_LEVELS, end=end, engine_only=True))) == [1, 2]
+            assert list(rows(log_filter.FilterSpec(term="fetch", start=start, end=end))) == [1, 3]
+            assert list(rows(log_filter.FilterSpec(term="fetch"))) == [0, 1, 3]
+        finally:
+            store.close()
+        print("✓ test_time_range_composes_with_other_filters passed")
+
+
+def test_term_filter_narrows_cached_result():
+    """Test extending a term rescans only the cached result and caches per filter state."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            log_rows = log_filter.LogFilter(store)
+            spec = log_filter.FilterSpec(term="fet", levels=ALL_LEVELS)
+            assert list(log_rows.rows(spec)) == [0, 1, 3]
+            assert list(log_rows.rows(spec._replace(term="FETC", case_sensitive=True))) == [0]
+
+            scanned = []
+            original_line = store.line
+            store.line = lambda row: scanned.append(row) or original_line(row)
+            assert list(log_rows.rows(spec._replace(term="fetch t"))) == [3]
+            assert scanned == [0, 1, 3]
+
+            scanned.clear()
+            assert list(log_rows.rows(spec)) == [0, 1, 3]
+            assert scanned == []
+        finally:
+            store.close()
+        print("✓ test_term_filter_narrows_cached_result passed")
+
+
+def test_token_index_matches_full_scan():
+    """Test searches through the token index return the same rows as a scan."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        original_block_rows = token_index.BLOCK_ROWS
+        token_index.BLOCK_ROWS = 2
+        try:
+            index = token_index.TokenIndex(store)
+            scan = log_filter.LogFilter(store)
+            indexed = log_filter.LogFilter(store, index=index)
+            for term in ("fetch", "FETCh", "engine - m", "rrc?", "absent", "ms"):
+                for case_sensitive in (False, True):
+                    spec = log_filter.FilterSpec(term=term, case_sensitive=case_sensitive)
+                    assert list(indexed.rows(spec)) == list(scan.rows(spec)), spec
+            assert list(index.candidates("timeout", range(len(store)))) == [2, 3]
+        finally:
+            token_index.BLOCK_ROWS = original_block_rows
+            store.close()
+        print("✓ test_token_index_matches_full_scan passed")
+
+
+def test_appended_rows_extend_cached_results():
+    """Test rows appended from a live file update bitmaps, cached results and index lookups."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            log_rows = log_filter.LogFilter(store, index=token_index.TokenIndex(store))
+            specs = [
+                log_filter.FilterSpec(levels=ALL_LEVELS),
+                log_filter.FilterSpec(levels=("TRACE",)),
+                log_filter.FilterSpec(levels=ALL_LEVELS, engine_only=True),
+                log_filter.FilterSpec(term="fetch", levels=ALL_LEVELS),
+                log_filter.FilterSpec(term="done", excluded_terms=("traceback",), levels=ALL_LEVELS),
+            ]
+            before = [log_rows.rows(spec) for spec in specs]
+
+            live = log_store.LiveLogFile(os.path.join(tmp, "application.log"))
+            file_index = store.add_file(live)
+            _, entries = live.append(
+                b"2025-11-26 11:28:32,000 - TRACE - Engine - fetch again\n"
+                b"2025-11-26 11:28:32,100 - ERROR - Ieee488Connection - done\n",
+                store.level_table, store.source_table)
+            store.append_entries(file_index, entries)
+            log_rows.extend(5)
+            assert list(before[4]) == [2, 6]
+            # A stack trace of row 6 arrives with the next poll
+            continued_end, entries = live.append(
+                b"  Traceback: Fetch failed\n"
+                b"2025-11-26 11:28:33,000 - DEBUG - Engine - next\n",
+                store.level_table, store.source_table)
+            changed_row = store.extend_last_entry(file_index, continued_end)
+            store.append_entries(file_index, entries)
+            log_rows.extend(7, changed_row)
+
+            assert store.line(5).startswith("2025-11-26 11:28:32,000 - TRACE")
+            assert changed_row == 6 and store.continuation(6) == ["  Traceback: Fetch failed"]
+            fresh = log_filter.LogFilter(store)
+            for spec, rows in zip(specs, before):
+                assert list(rows) == list(fresh.rows(spec)), spec
+                assert log_rows.rows(spec) is rows
+            assert list(before[1]) == [5]
+            assert list(before[3]) == [0, 1, 3, 5, 6]
+            # Row 6 leaves the result once its continuation has an excluded term
+            assert list(before[4]) == [2]
+        finally:
+            store.close()
+        print("✓ test_appended_rows_extend_cached_results passed")
+
+
+def test_extended_rows_stay_index_candidates():
+    """Test a loaded row extended by live continuation lines is found by indexed searches."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            index = token_index.TokenIndex(store)
+            log_rows = log_filter.LogFilter(store, index=index)
+            spec = log_filter.FilterSpec(term="traceback")
+            assert list(log_rows.rows(spec)) == []
+
+            live = log_store.LiveLogFile(os.path.join(tmp, "application.log"))
+            file_index = store.add_file(live)
+            assert store.move_last_entry(0, file_index) == 4
+            continued_end, entries = live.append(b"  Traceback: level lost\n", store.level_table, store.source_table)
+            changed_row = store.extend_last_entry(file_index, continued_end)
+            assert store.append_entries(file_index, entries) is None
+            log_rows.extend(5, changed_row)
+
+            assert list(log_rows.rows(spec)) == [4]
+            assert list(log_filter.LogFilter(store, index=index).rows(spec._replace(term="traceback: level"))) == [4]
+
+            # Rows renumbered by an older live row no longer match the index
+            assert index.covers(store)
+            _, entries = live.append(b"2025-11-26 11:28:30,000 - INFO - Engine - early\n",
+                                     store.level_table, store.source_table)
+            assert store.append_entries(file_index, entries) is not None
+            assert not index.covers(store)
+        finally:
+            store.close()
+        print("✓ test_extended_rows_stay_index_candidates passed")
+
+
+if __name__ == '__main__':
+    test_structural_filters()
+    test_time_range_composes_with_other_filters()
+    test_term_filter_narrows_cached_result()
+    test_token_index_matches_full_scan()
+    test_appended_rows_extend_cached_results()
+    test_extended_rows_stay_index_candidates()
+    print("\nAll tests passed!")
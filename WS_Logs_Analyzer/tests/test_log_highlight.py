@@ -0,0 +1,78 @@
+"""Test suite for the fused syntax highlighter and its per-row span cache."""
+import os
+import re
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_highlight
+
+LINES = [
+    "2025-11-26 11:28:31,281  DEBUG      Ieee488Connection         INSTR <-- FETCh:DUT:POWer?",
+    "2025-11-26 11:28:34,000  ERROR      Engine                    Step 3 failed: Exception in Command",
+    "2025-11-26 11:28:35,000  WARNING    Engine                    Deprecated Info, Debug and Trace output",
+    "2025-11-26 11:28:36,000  INFO       Ieee488Connection         stepping engines; warned",
+]
+
+
+def _separate_spans(line):
+    """The spans found by running every pattern on its own."""
+    spans = []
+    for tag, pattern in log_highlight.HIGHLIGHT_PATTERNS.items():
+        spans += [(match.start(), match.end(), tag) for match in re.finditer(pattern, line)]
+    return sorted(spans)
+
+
+def test_fused_pattern_matches_each_pattern():
+    """Test one scan with the fused pattern finds what every pattern finds separately."""
+    for line in LINES:
+        assert log_highlight.syntax_spans(line) == _separate_spans(line), line
+    assert [tag for _, _, tag in log_highlight.syntax_spans(LINES[1])] == [
+        "error", "loglevel_engine", "info", "error", "error", "info"]
+    assert log_highlight.syntax_spans(LINES[3]) == []
+
+    highlighter = log_highlight.Highlighter()
+    segments = highlighter.segments(LINES[2])
+    assert "".join(text for text, _ in segments) == LINES[2]
+    assert ("Deprecated", "warning") in segments and ("Trace", "loglevel_trace") in segments
+    assert highlighter.segments(LINES[3]) == [(LINES[3], None)]
+    print("✓ test_fused_pattern_matches_each_pattern passed")
+
+
+def test_search_terms_and_span_cache():
+    """Test search matches are merged with cached syntax spans and the cache stays bounded."""
+    highlighter = log_highlight.Highlighter(cache_rows=2)
+    highlighter.search = re.compile("fetch|failed", re.IGNORECASE)
+    segments = highlighter.segments(LINES[1], key=1)
+    # The search match and the keyword start together; the first span wins
+    assert ("failed", "error") in segments and ("Step", "info") in segments
+    assert ("FETCh", "highlight") in highlighter.segments(LINES[0], key=0)
+
+    # Cached rows are not scanned again, even for another search term
+    scanned = []
+    original_spans = log_highlight.syntax_spans
+    log_highlight.syntax_spans = lambda line: scanned.append(line) or original_spans(line)
+    try:
+        highlighter.search = re.compile("instr", re.IGNORECASE)
+        assert ("INSTR", "highlight") in highlighter.segments(LINES[0], key=0)
+        assert ("Step", "info") in highlighter.segments(LINES[1], key=1)
+        assert scanned == []
+        # Only `cache_rows` rows are kept, least recently used first out
+        highlighter.segments(LINES[2], key=2)
+        highlighter.segments(LINES[1], key=1)
+        highlighter.segments(LINES[0], key=0)
+        assert scanned == [LINES[2], LINES[0]]
+        highlighter.clear()
+        highlighter.segments(LINES[1], key=1)
+        assert scanned[-1] == LINES[1]
+    finally:
+        log_highlight.syntax_spans = original_spans
+
+    text = "\n  File x.py, line 3\n  INSTR timeout"
+    assert highlighter.segments(text, syntax=False, tag="continuation") == [
+        ("\n  File x.py, line 3\n  ", "continuation"), ("INSTR", "highlight"), (" timeout", "continuation")]
+    print("✓ test_search_terms_and_span_cache passed")
+
+
+if __name__ == '__main__':
+    test_fused_pattern_matches_each_pattern()
+    test_search_terms_and_span_cache()
+    print("\nAll tests passed!")
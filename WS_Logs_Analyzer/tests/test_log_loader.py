@@ -0,0 +1,68 @@
+"""Test suite for the background log loader."""
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_loader, log_store
+
+
+def _write_entries(directory, name, count):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(f"2025-11-26 11:{i // 60000 % 60:02d}:{i // 1000 % 60:02d},{i % 1000:03d} - INFO - Engine - entry {i}\n")
+    return path
+
+
+def test_loader_reports_progress_partial_and_done():
+    """Test the worker posts progress, an early partial store and the final store."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_entries(tmp, "application.log", 250)
+        original_interval = log_store.PROGRESS_INTERVAL
+        log_store.PROGRESS_INTERVAL = 100
+        try:
+            loader = log_loader.LogLoader([path])
+            loader.start()
+            loader.join()
+        finally:
+            log_store.PROGRESS_INTERVAL = original_interval
+
+        events = loader.poll()
+        kinds = [kind for kind, _ in events]
+        assert kinds[-1] == "done"
+        assert "progress" in kinds
+        partial = next(payload for kind, payload in events if kind == "partial")
+        store = events[-1][1]
+        try:
+            assert len(partial) == 100
+            assert len(store) == 250
+            assert partial.line(99) == store.line(99)
+        finally:
+            partial.close()
+            store.close()
+        print("✓ test_loader_reports_progress_partial_and_done passed")
+
+
+def test_cancelled_load_raises():
+    """Test setting the cancel event aborts LogStore.open."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_entries(tmp, "application.log", 250)
+        cancel = threading.Event()
+        cancel.set()
+        original_interval = log_store.PROGRESS_INTERVAL
+        log_store.PROGRESS_INTERVAL = 100
+        try:
+            log_store.LogStore.open([path], cancel=cancel)
+            assert False, "Expected LoadCancelled"
+        except log_store.LoadCancelled:
+            pass
+        finally:
+            log_store.PROGRESS_INTERVAL = original_interval
+        print("✓ test_cancelled_load_raises passed")
+
+
+if __name__ == '__main__':
+    test_loader_reports_progress_partial_and_done()
+    test_cancelled_load_raises()
+    print("\nAll tests passed!")
@@ -0,0 +1,52 @@
+"""Test suite for the real-time log tail."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_monitor
+
+
+def _append(path, text):
+    with open(path, 'ab') as f:
+        f.write(text.encode('utf-8'))
+
+
+def test_tail_returns_complete_appended_lines():
+    """Test only appended bytes are read and an unfinished line waits for its newline."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "application.log")
+        _append(path, "old line\n")
+        tail = log_monitor.LogTail(path)
+        assert tail.poll() == b""
+
+        _append(path, "first\nsec")
+        assert tail.poll() == b"first\n"
+        _append(path, "ond\n")
+        assert tail.poll() == b"second\n"
+        assert tail.poll() == b""
+        print("✓ test_tail_returns_complete_appended_lines passed")
+
+
+def test_tail_follows_rotation():
+    """Test the rest of a rotated file is read before the new file from its start."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "application.log")
+        _append(path, "a\n")
+        tail = log_monitor.LogTail(path, offset=0)
+        assert tail.poll() == b"a\n"
+
+        _append(path, "b\n")
+        os.rename(path, path + ".1")
+        assert tail.poll() == b""
+        _append(path, "c\n")
+        assert tail.poll() == b"b\nc\n"
+        assert tail.rotations == 1
+        _append(path, "d\n")
+        assert tail.poll() == b"d\n"
+        print("✓ test_tail_follows_rotation passed")
+
+
+if __name__ == '__main__':
+    test_tail_returns_complete_appended_lines()
+    test_tail_follows_rotation()
+    print("\nAll tests passed!")
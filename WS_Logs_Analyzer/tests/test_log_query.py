@@ -0,0 +1,94 @@
+"""Test suite for the search-box query language."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_cli, log_filter, log_query, log_store, token_index
+
+LOG_CONTENT = (
+    "2025-11-26 11:28:31,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+    "2025-11-26 11:28:32,000 - DEBUG - Ieee488Connection - INSTR <-- FETCh:DUT:POWer?\n"
+    "2025-11-26 11:28:33,000 - DEBUG - Ieee488Connection - INSTR --> 1\n"
+    "2025-11-26 11:28:34,000 - ERROR - Ieee488Connection - FETCh timeout\n"
+    "  while waiting for POWer\n"
+    "2025-11-26 11:29:00,000 - INFO - Engine - Step fetch power done\n"
+)
+ALL_LEVELS = ("TRACE", "ENGINE", "DEBUG", "INFO", "ERROR")
+
+
+def test_parse_and_apply_query():
+    """Test fields, quoted and negated terms, and that plain text stays one term."""
+    query = log_query.parse_query('level:ERROR,debug source:Ieee488Connection "FETCh" after:11:28 -"RRC?" -level:debug')
+    assert query.terms == ("FETCh",) and query.excluded == ("RRC?",)
+    assert query.levels == ("ERROR", "DEBUG") and query.excluded_levels == ("DEBUG",)
+    assert query.source == "Ieee488Connection" and query.after == "11:28" and query.before is None
+
+    reference = log_store.parse_time("2025-11-26 00:00")
+    base = log_filter.FilterSpec(levels=("TRACE", "DEBUG", "ERROR"), start=reference + 41300000)
+    spec = log_query.apply_query('level:ERROR,DEBUG,INFO "FETCh" dut after:11:28 before:11:29 -"RRC?"', base, reference)
+    assert spec.levels == ("ERROR", "DEBUG")
+    assert spec.start == reference + 41300000 and spec.end == reference + 41340000
+    assert spec.term == "FETCh" and spec.extra_terms == ("dut",) and spec.excluded_terms == ("RRC?",)
+    assert log_query.highlight_terms(spec) == ("FETCh", "dut")
+
+    for plain in ("FETCh:DUT:POWer?", "Measurement done", "-->", "state - ready"):
+        assert not log_query.has_query_syntax(plain)
+        assert log_query.apply_query(plain, base).term == plain
+    for text, message in (("-source:Engine", "negated"), ("source:A source:B", "one source"), ("after:25:00", "Invalid")):
+        try:
+            log_query.apply_query(text, base, reference)
+        except ValueError as e:
+            assert message in str(e), e
+        else:
+            raise AssertionError(text)
+    print("✓ test_parse_and_apply_query passed")
+
+
+def test_query_filters_in_one_pass():
+    """Test compiled queries against the filter, with and without a token index, and in the CLI."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "application.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(LOG_CONTENT)
+        store = log_store.LogStore.open([path])
+        try:
+            reference = store.timestamps[0]
+            base = log_filter.FilterSpec(levels=ALL_LEVELS)
+            plain = log_filter.LogFilter(store)
+            indexed = log_filter.LogFilter(store, index=token_index.TokenIndex(store))
+            scanned = []
+            original_line = store.line
+            store.line = lambda row: scanned.append(row) or original_line(row)
+            for text, expected in (
+                ('source:Ieee488Connection "FETCh" -"RRC?"', [1, 3]),
+                ("fetch power", [4]),
+                ('fetch "power"', [1, 3, 4]),
+                ('fetch power -level:info', [1, 3]),
+                ('level:ERROR,DEBUG fetch after:11:28:32 before:11:28:34', [1]),
+                ('-fetch', [2]),
+                ("source:Engine", [4]),
+            ):
+                spec = log_query.apply_query(text, base, reference)
+                del scanned[:]
+                assert list(plain.rows(spec)) == expected, text
+                # Every candidate row is decoded once for all of its terms
+                assert len(scanned) == len(set(scanned)), text
+                assert list(indexed.rows(spec)) == expected, text
+            # The continuation line of row 3 is part of the entry
+            assert list(plain.rows(log_query.apply_query('"waiting for" level:error', base, reference))) == [3]
+        finally:
+            store.line = original_line
+            store.close()
+
+        output = os.path.join(tmp, "out.log")
+        assert log_cli.main([path, "-q", '"FETCh" -level:ERROR', "-t", "dut", "-o", output, "--no-cache"]) == 0
+        with open(output, encoding='utf-8') as f:
+            assert [line.split(" - ")[3].rstrip() for line in f] == [
+                "INSTR <-- FETCh:DUT:MODem:STATe:RRC?", "INSTR <-- FETCh:DUT:POWer?"]
+        print("✓ test_query_filters_in_one_pass passed")
+
+
+if __name__ == '__main__':
+    test_parse_and_apply_query()
+    test_query_filters_in_one_pass()
+    print("\nAll tests passed!")
@@ -0,0 +1,347 @@
+"""Test suite for the log_store module."""
+import gzip
+import mmap
+import os
+import sys
+import tempfile
+import zipfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import index_cache
+from src import log_generator
+from src import log_store
+
+
+def _write_log(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+def test_log_store_merges_by_offset():
+    """Test the memory-mapped store merges overlapping files and decodes lazily."""
+    with tempfile.TemporaryDirectory() as tmp:
+        newest = _write_log(tmp, "application.log",
+                            "2025-11-26 11:28:33,000 - INFO - Engine - c\n"
+                            "2025-11-26 11:28:35,000 - INFO - Engine - e\n")
+        oldest = _write_log(tmp, "application.log.1",
+                            "2025-11-26 11:28:31,000 - INFO - Engine - a\n"
+                            "not a log entry\n"
+                            "2025-11-26 11:28:34,000 - INFO - Engine - d")
+        empty = _write_log(tmp, "application.log.2", "")
+        store = log_store.LogStore.open([newest, oldest, empty])
+        try:
+            assert len(store) == 4
+            assert list(store.row_file) == [1, 0, 1, 0]
+            # The untimestamped line continues the entry before it
+            assert store.line(0) == "2025-11-26 11:28:31,000 - INFO - Engine - a\nnot a log entry\n"
+            assert store.line(2).endswith(" - d")
+            # Only rotated files stay mapped; the active one can be rotated away
+            assert isinstance(store.files[0].buffer, bytes) and isinstance(store.files[1].buffer, mmap.mmap)
+            os.rename(newest, os.path.join(tmp, "application.log.3"))
+            assert store.line(3) == "2025-11-26 11:28:35,000 - INFO - Engine - e\n"
+        finally:
+            store.close()
+        print("✓ test_log_store_merges_by_offset passed")
+
+
+def test_rotations_sharing_a_millisecond_stay_in_order():
+    """Test a rotation ending in the millisecond the next one starts is not interleaved with it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for station in ("bench1", "bench2"):
+            os.makedirs(os.path.join(tmp, station))
+            paths.append(_write_log(os.path.join(tmp, station), "application.log",
+                                    "2025-11-26 11:00:01,000 - INFO - Engine - new1\n"
+                                    "2025-11-26 11:00:02,000 - INFO - Engine - new2\n"))
+            paths.append(_write_log(os.path.join(tmp, station), "application.log.1",
+                                    "2025-11-26 11:00:00,000 - INFO - Engine - old1\n"
+                                    "2025-11-26 11:00:01,000 - INFO - Engine - old2\n"))
+        for stations in (None, ["bench1", "bench1", "bench2", "bench2"]):
+            # One station is chained; two overlapping stations are sorted
+            store = log_store.LogStore.open(paths[:2] if stations is None else paths, stations=stations)
+            try:
+                messages = [store.message(row) for row in range(len(store))]
+                if stations is None:
+                    assert messages == ["old1", "old2", "new1", "new2"]
+                else:
+                    assert messages == ["old1", "old1", "old2", "new1", "old2", "new1", "new2", "new2"]
+                    assert [store.station(row) for row in range(4)] == ["bench1", "bench2", "bench1", "bench1"]
+            finally:
+                store.close()
+        print("✓ test_rotations_sharing_a_millisecond_stay_in_order passed")
+
+
+def test_parsed_columns_match_line_split():
+    """Test the parsed columns and formatters agree with splitting on " - "."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_log(tmp, "application.log",
+                          "2025-11-26 11:28:31,281 - DEBUG - Ieee488Connection - "
+                          "TCPIP0::10.1.53.153::hislip0::INSTR <-- FETCh:DUT:MODem:STATe:RRC?\n"
+                          "2025-11-26 11:28:31,282 - Engine - Engine - a - b  \n"
+                          "2025-11-26 11:28:31,283 - INFO - Only source\n"
+                          "2025-11-26 11:28:31,284 no columns\n")
+        store = log_store.LogStore.open([path])
+        try:
+            assert len(store) == 4
+            assert store.timestamps[1] - store.timestamps[0] == 1
+            assert store.timestamps[0] % 86400000 == ((11 * 60 + 28) * 60 + 31) * 1000 + 281
+            assert [store.level(row) for row in range(4)] == ["DEBUG", "Engine", "INFO", ""]
+            assert [store.source(row) for row in range(4)] == ["Ieee488Connection", "Engine", "Only source", ""]
+            assert store.levels[0] != store.levels[1]
+            assert store.sources[1] == store.source_table.code("Engine")
+
+            assert store.command(0) == "TCPIP0::10.1.53.153::hislip0::INSTR <-- FETCh:DUT:MODem:STATe:RRC?"
+            assert store.command(1) == "a - b"
+            assert store.command(2) == "Only source"
+            assert store.command(3) == "2025-11-26 11:28:31,284 no columns"
+            assert store.format_row(1) == f"{'2025-11-26 11:28:31,282':<24} {'Engine':<10} {'Engine':<25} a - b"
+            assert store.format_row(2) == f"{'2025-11-26 11:28:31,283':<24} {'INFO':<10} {'Only source':<25} "
+            assert store.format_row(3) == "2025-11-26 11:28:31,284 no columns"
+
+            mask = store.code_mask(store.levels, store.level_table, [store.level_table.code("INFO")])
+            assert mask == bytes([0, 0, 1, 0])
+
+            # Offsets are kept relative to the entry start
+            columns = ("row_file", "starts", "lengths", "msg_offsets", "timestamps", "levels", "sources")
+            assert sum(getattr(store, name).itemsize for name in columns) == 28
+            assert store.msg_offsets[3] == 0 and store.lengths[0] == len(store.line_bytes(0))
+        finally:
+            store.close()
+
+        # A message column beyond the offset limit is shown like a malformed line
+        original = log_store.MAX_MESSAGE_OFFSET
+        log_store.MAX_MESSAGE_OFFSET = 50
+        try:
+            store = log_store.LogStore.open([path])
+        finally:
+            log_store.MAX_MESSAGE_OFFSET = original
+        try:
+            assert store.level(0) == "DEBUG" and store.command(0).startswith("2025-11-26 11:28:31,281 - DEBUG")
+            assert store.command(1) == "a - b"
+        finally:
+            store.close()
+        print("✓ test_parsed_columns_match_line_split passed")
+
+
+def test_compressed_rotations_are_streamed():
+    """Test .gz/.zip rotations are discovered and parse like their plain text across chunk boundaries."""
+    with tempfile.TemporaryDirectory() as tmp:
+        rotated = "".join(f"2025-11-26 10:00:{i:02d},000 - DEBUG - Engine - archived {i}\n" for i in range(40))
+        older = "".join(f"2025-11-26 09:00:{i:02d},000 - INFO - Scheduler - older {i}\n" for i in range(40))
+        current = _write_log(tmp, "application.log", "2025-11-26 11:00:00,000 - INFO - Engine - now\n")
+        with gzip.open(os.path.join(tmp, "application.log.1.gz"), 'wt', encoding='utf-8') as f:
+            f.write(rotated)
+        with zipfile.ZipFile(os.path.join(tmp, "application.log.2.zip"), 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("application.log.2", older.rstrip("\n"))
+        plain = _write_log(tmp, "plain.log", older.rstrip("\n") + "\n" + rotated)
+
+        names = log_store.find_log_files(tmp)
+        assert names == ["application.log", "application.log.1.gz", "application.log.2.zip"]
+
+        original_chunk = log_store.DECOMPRESS_CHUNK
+        log_store.DECOMPRESS_CHUNK = 100
+        try:
+            store = log_store.LogStore.open([os.path.join(tmp, name) for name in names])
+            reference = log_store.LogStore.open([plain])
+        finally:
+            log_store.DECOMPRESS_CHUNK = original_chunk
+        try:
+            assert len(store) == 81
+            assert [store.line(row).rstrip() for row in range(80)] == [reference.line(row).rstrip() for row in range(80)]
+            assert [store.format_row(row) for row in range(80)] == [reference.format_row(row) for row in range(80)]
+            assert store.line(80) == "2025-11-26 11:00:00,000 - INFO - Engine - now\n"
+            assert store.total_size == os.path.getsize(current) + len(rotated) + len(older) - 1
+        finally:
+            store.close()
+            reference.close()
+        print("✓ test_compressed_rotations_are_streamed passed")
+
+
+def test_multi_line_records():
+    """Test continuation lines stay with their entry, also when split across decompressed chunks."""
+    with tempfile.TemporaryDirectory() as tmp:
+        content = "".join(
+            f"2025-11-26 10:00:{i:02d},000 - ERROR - Engine - failure {i}\n"
+            "Traceback (most recent call last):\n"
+            f"  File \"engine.py\", line {i}, in run\n"
+            "\n"
+            f"2025-11-26 10:00:{i:02d},500 - INFO - Engine\n"
+            f"  detail {i}\n"
+            for i in range(20)
+        )
+        path = _write_log(tmp, "application.log", "orphan line before any entry\n" + content)
+        with gzip.open(os.path.join(tmp, "application.log.1.gz"), 'wt', encoding='utf-8') as f:
+            f.write(content)
+
+        original_chunk = log_store.DECOMPRESS_CHUNK
+        log_store.DECOMPRESS_CHUNK = 37
+        try:
+            store = log_store.LogStore.open([path])
+            compressed = log_store.LogStore.open([os.path.join(tmp, "application.log.1.gz")])
+        finally:
+            log_store.DECOMPRESS_CHUNK = original_chunk
+        try:
+            assert len(store) == len(compressed) == 40
+            assert store.continuation(0) == ["Traceback (most recent call last):", '  File "engine.py", line 0, in run']
+            assert store.format_row(0) == f"{'2025-11-26 10:00:00,000':<24} {'ERROR':<10} {'Engine':<25} failure 0"
+            assert store.message(0).endswith('line 0, in run')
+            assert store.command(0) == "failure 0"
+            assert store.command(1) == "Engine"
+            assert store.message(1) == "detail 0"
+            assert store.continuation(1) == ["  detail 0"]
+            assert all(store.line(row) == compressed.line(row) for row in range(40))
+        finally:
+            store.close()
+            compressed.close()
+
+        live = log_store.LiveLogFile(path)
+        levels, sources = log_store.StringTable(), log_store.StringTable()
+        continued_end, entries = live.append(b"  not attached to anything\n", levels, sources)
+        assert continued_end is None and len(entries) == 0
+        continued_end, entries = live.append(b"2025-11-26 11:00:00,000 - ERROR - Engine - boom\n", levels, sources)
+        assert continued_end is None and len(entries) == 1
+        continued_end, entries = live.append(
+            b"  at step 1\n  at step 2\n2025-11-26 11:00:01,000 - INFO - Engine - ok\n", levels, sources)
+        assert len(entries) == 1 and continued_end == entries.starts[0]
+
+        # A live log continuing the loaded file extends its last entry
+        store = log_store.LogStore.open([path])
+        try:
+            live = log_store.LiveLogFile(path)
+            live_index = store.add_file(live)
+            last_row = len(store) - 1
+            assert store.move_last_entry(0, live_index) == last_row
+            continued_end, entries = live.append(
+                b"  more detail 19\n2025-11-26 11:00:00,000 - INFO - Engine - next\n",
+                store.level_table, store.source_table)
+            assert store.extend_last_entry(live_index, continued_end) == last_row
+            assert store.append_entries(live_index, entries) is None
+            assert store.format_row(last_row) == f"{'2025-11-26 10:00:19,500':<24} {'INFO':<10} {'Engine':<25} "
+            assert store.continuation(last_row) == ["  detail 19", "  more detail 19"]
+            assert store.message(len(store) - 1) == "next"
+
+            # Older live rows are merged in by time, renumbering the rows
+            row_count = len(store)
+            _, entries = live.append(b"2025-11-26 10:00:05,100 - WARNING - Engine - late\n",
+                                     store.level_table, store.source_table)
+            order = store.append_entries(live_index, entries)
+            late_row = list(order).index(row_count)
+            assert late_row == 11 and store.message(late_row) == "late" and order[late_row + 1] == late_row
+            assert list(store.timestamps) == sorted(store.timestamps)
+            assert store.continuation(last_row + 1) == ["  detail 19", "  more detail 19"]
+        finally:
+            store.close()
+        print("✓ test_multi_line_records passed")
+
+
+def test_entries_with_impossible_dates_are_kept():
+    """Test an entry with an invalid date keeps its lines, at the time of a neighbouring entry."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_log(tmp, "application.log",
+                          "2025-13-26 10:00:00,000 - INFO - Engine - bad month\n"
+                          "2025-11-26 10:00:01,000 - INFO - Engine - first\n"
+                          "2025-02-30 10:00:02,000 - ERROR - Engine - bad day\n"
+                          "  continued\n"
+                          "2025-11-26 10:00:03,000 - INFO - Engine - last\n")
+        store = log_store.LogStore.open([path])
+        try:
+            assert [store.message(row) for row in range(len(store))] == [
+                "bad month", "first", "bad day\n  continued", "last"]
+            first = log_store.parse_time("2025-11-26 10:00:01")
+            assert list(store.timestamps) == [first, first, first, first + 2000]
+        finally:
+            store.close()
+        print("✓ test_entries_with_impossible_dates_are_kept passed")
+
+
+def test_parallel_parse_matches_sequential():
+    """Test files split into byte ranges and parsed in worker processes give the columns of one parse."""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = log_generator.generate_logs(tmp, 120_000, rotations=2, trace_ratio=1.0, seed=3)
+        # A leading orphan line, and a source first seen in a later range
+        with open(paths[-1], 'r+', encoding='utf-8') as f:
+            content = f.read()
+            f.seek(0)
+            f.write("orphan line before any entry\n" + content
+                    + "2030-01-01 00:00:00,000 - NOTICE - LateSource - last\n  continued\n")
+        cache = index_cache.IndexCache(os.path.join(tmp, "cache"))
+        sequential = log_store.LogStore.open(paths, workers=1)
+
+        original = log_store.PARSE_CHUNK_BYTES, log_store.PARALLEL_PARSE_MIN_BYTES
+        log_store.PARSE_CHUNK_BYTES, log_store.PARALLEL_PARSE_MIN_BYTES = 7_000, 0
+        progress = []
+        try:
+            parallel = log_store.LogStore.open(paths, progress=lambda *args: progress.append(args),
+                                               cache=cache, workers=2)
+            assert cache.contains(paths[0]) and not cache.contains(os.path.join(tmp, "missing.log"))
+            chunks, pool = log_store.LogStore._start_parsing(
+                paths, [os.path.getsize(path) for path in paths], [None] * len(paths), cache, 2)
+            assert chunks == [None] * len(paths) and pool is None
+        finally:
+            log_store.PARSE_CHUNK_BYTES, log_store.PARALLEL_PARSE_MIN_BYTES = original
+        try:
+            assert len(parallel) == len(sequential) > 100
+            for name in ("row_file", "starts", "lengths", "msg_offsets", "timestamps"):
+                assert getattr(parallel, name) == getattr(sequential, name), name
+            assert [parallel.level(row) for row in range(len(parallel))] == [
+                sequential.level(row) for row in range(len(sequential))]
+            assert [parallel.source(row) for row in range(len(parallel))] == [
+                sequential.source(row) for row in range(len(sequential))]
+            assert parallel.continuation(len(parallel) - 1) == ["  continued"]
+            assert progress[-1][0] == progress[-1][1] and len(progress) > len(paths)
+
+            assert log_store.split_ranges(10, 4) == [(0, 3), (3, 6), (6, 10)]
+            assert log_store.split_ranges(0, 4) == [(0, 0)]
+        finally:
+            sequential.close()
+            parallel.close()
+        print("✓ test_parallel_parse_matches_sequential passed")
+
+
+def test_station_logs_merge_by_time():
+    """Test the rotated files of several stations interleave by timestamp with a station per row."""
+    with tempfile.TemporaryDirectory() as tmp:
+        bench1, bench2 = os.path.join(tmp, "bench1"), os.path.join(tmp, "bench2")
+        os.makedirs(bench1)
+        os.makedirs(bench2)
+        paths = [
+            _write_log(bench1, "application.log", "2025-11-26 11:28:35,000 - INFO - Engine - b1 35\n"),
+            _write_log(bench1, "application.log.1", "2025-11-26 11:28:31,000 - INFO - Engine - b1 31\n"
+                                                    "2025-11-26 11:28:33,000 - INFO - Engine - b1 33\n"),
+            _write_log(bench2, "application.log", "2025-11-26 11:28:32,000 - ERROR - Engine - b2 32\n"
+                                                  "  at step 2\n"
+                                                  "2025-11-26 11:28:34,000 - INFO - Engine - b2 34\n"),
+        ]
+        stations = log_store.station_names([bench1, bench1, bench2])
+        assert stations == ["bench1", "bench1", "bench2"]
+        store = log_store.LogStore.open(paths, stations=stations)
+        try:
+            assert [store.line(row).split(" - ")[3].split("\n")[0] for row in range(len(store))] == [
+                "b1 31", "b2 32", "b1 33", "b2 34", "b1 35"]
+            assert store.has_stations
+            assert [store.station(row) for row in range(len(store))] == ["bench1", "bench2", "bench1", "bench2", "bench1"]
+            assert list(store.station_mask([store.station_table.code("bench2")])) == [0, 1, 0, 1, 0]
+            assert store.format_row(1).startswith("bench2  2025-11-26 11:28:32,000")
+            assert store.format_header().startswith("Station DateTime")
+        finally:
+            store.close()
+
+        # Stations with the same directory name are told apart by their full path
+        other = os.path.join(tmp, "lab", "bench1")
+        os.makedirs(other)
+        assert log_store.station_names([bench1, other]) == [os.path.normpath(bench1), os.path.normpath(other)]
+        assert log_store.station_names([paths[0], bench2]) == ["bench1", "bench2"]
+        print("✓ test_station_logs_merge_by_time passed")
+
+
+if __name__ == '__main__':
+    test_log_store_merges_by_offset()
+    test_rotations_sharing_a_millisecond_stay_in_order()
+    test_parsed_columns_match_line_split()
+    test_compressed_rotations_are_streamed()
+    test_multi_line_records()
+    test_entries_with_impossible_dates_are_kept()
+    test_parallel_parse_matches_sequential()
+    test_station_logs_merge_by_time()
+    print("\nAll tests passed!")
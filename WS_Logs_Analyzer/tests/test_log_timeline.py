@@ -0,0 +1,68 @@
+"""Test suite for the level/source timeline."""
+import os
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_store, log_timeline
+
+LOG_CONTENT = (
+    "2025-11-26 11:28:01,000 - INFO - Engine - a\n"
+    "2025-11-26 11:28:59,999 - ERROR - Engine - b\n"
+    "2025-11-26 11:29:00,000 - INFO - Ieee488Connection - c\n"
+    "2025-11-26 11:31:30,000 - ERROR - Ieee488Connection - d\n"
+    "2025-11-26 11:31:40,000 - ERROR - Engine - e\n"
+)
+
+
+def _open_store(tmp):
+    path = os.path.join(tmp, "application.log")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(LOG_CONTENT)
+    return log_store.LogStore.open([path])
+
+
+def _named_counts(timeline):
+    return [{timeline.names[code]: count for code, count in enumerate(counts) if count}
+            for counts in timeline.counts]
+
+
+def test_counts_per_bucket_and_level():
+    """Test entries are counted per minute bucket and level, including empty buckets."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _open_store(tmp)
+        try:
+            timeline = log_timeline.build_timeline(store, "Level", bucket_ms=60000)
+            assert log_store.format_timestamp(timeline.start) == "2025-11-26 11:28:00,000"
+            assert _named_counts(timeline) == [{"INFO": 1, "ERROR": 1}, {"INFO": 1}, {}, {"ERROR": 2}]
+            assert timeline.bucket_range(1) == (timeline.start + 60000, timeline.start + 120000)
+            assert timeline.max_bucket_total() == 2
+
+            by_source = log_timeline.build_timeline(store, "Source", bucket_ms=60000)
+            assert _named_counts(by_source)[3] == {"Ieee488Connection": 1, "Engine": 1}
+            assert by_source.totals()[store.source_table.code("Engine")] == 3
+
+            numpy = log_timeline.np
+            log_timeline.np = None
+            try:
+                assert _named_counts(log_timeline.build_timeline(store, "Level", 60000)) == _named_counts(timeline)
+            finally:
+                log_timeline.np = numpy
+        finally:
+            store.close()
+        print("✓ test_counts_per_bucket_and_level passed")
+
+
+def test_bucket_width_choice():
+    """Test the bucket width keeps the bucket count under the target."""
+    assert log_timeline.choose_bucket_ms(100000) == 1000
+    assert log_timeline.choose_bucket_ms(3600000) == 30000
+    assert log_timeline.choose_bucket_ms(400 * 86400000) == 2 * 86400000
+    assert log_timeline.format_duration(300000) == "5 min"
+    assert log_timeline.format_duration(1000) == "1 s"
+    print("✓ test_bucket_width_choice passed")
+
+
+if __name__ == '__main__':
+    test_counts_per_bucket_and_level()
+    test_bucket_width_choice()
+    print("\nAll tests passed!")
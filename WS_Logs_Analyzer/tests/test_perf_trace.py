@@ -0,0 +1,88 @@
+"""Test suite for the timing spans, trace file and profiling switch."""
+import json
+import os
+import sys
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import log_filter
+from src import log_loader
+from src import perf_trace
+
+
+def _span_elsewhere():
+    with perf_trace.span("elsewhere"):
+        pass
+
+
+def test_spans_attach_to_the_running_operation():
+    """Test spans join the operation of their thread only, and finished operations reach the trace file."""
+    with tempfile.TemporaryDirectory() as tmp:
+        trace_path = os.path.join(tmp, "trace.json")
+        tracer = perf_trace.Tracer(trace_path)
+
+        with perf_trace.span("outside"):
+            pass
+        with tracer.operation("Filter") as operation:
+            with perf_trace.span("bitmaps"):
+                pass
+            for _ in range(2):
+                with perf_trace.span("term"):
+                    pass
+            # A span on another thread belongs to no operation
+            worker = threading.Thread(target=_span_elsewhere)
+            worker.start()
+            worker.join()
+            with tracer.operation("Display"):
+                pass
+        assert [span[0] for span in operation.spans] == ["bitmaps", "term", "term", "Display"]
+        assert operation.seconds >= 0
+        summary = operation.summary()
+        assert summary.startswith("Filter ") and "term " in summary and " x2" in summary
+
+        with tracer.operation("Load"):
+            pass
+        with open(trace_path, encoding='utf-8') as f:
+            text = f.read()
+        # Trace viewers accept the array without its closing bracket; close it to parse here
+        events = json.loads(text.rstrip().rstrip(",") + "]")
+        assert [event["name"] for event in events] == ["Filter", "bitmaps", "term", "term", "Display", "Load"]
+        assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+        assert events[1]["cat"] == "Filter" and events[0]["cat"] == "operation"
+        print("✓ test_spans_attach_to_the_running_operation passed")
+
+
+def test_load_stages_and_profiling():
+    """Test a load is timed by stage and one requested operation is profiled."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "application.log")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("2025-11-26 11:28:31,000 - INFO - Engine - fetch\n" * 10)
+
+        tracer = perf_trace.Tracer()
+        profiles = os.path.join(tmp, "profiles")
+        tracer.profile_next(profiles)
+        assert tracer.profile_pending
+        loader = log_loader.LogLoader([path], build_index=True, tracer=tracer)
+        loader.start()
+        loader.join()
+        events = dict(loader.poll())
+        try:
+            assert not tracer.profile_pending
+            assert [span[0] for span in loader.operation.spans] == ["parse", "merge"]
+            assert loader.operation.profile_path is not None and os.path.exists(loader.operation.profile_path)
+            assert os.path.exists(loader.operation.profile_path[:-len(".prof")] + ".txt")
+            assert loader.index_operation.profile_path is None
+
+            with tracer.operation("Filter") as operation:
+                log_filter.LogFilter(events["done"]).rows(log_filter.FilterSpec(term="fetch"))
+            assert [span[0] for span in operation.spans] == ["bitmaps", "term"]
+        finally:
+            events["done"].close()
+        print("✓ test_load_stages_and_profiling passed")
+
+
+if __name__ == '__main__':
+    test_spans_attach_to_the_running_operation()
+    test_load_stages_and_profiling()
+    print("\nAll tests passed!")